@@ -47,24 +47,39 @@ def create_app(config_name=None):
     from routes.api_watchlist import api_watchlist
     from routes.api_trades import api_trades
     from routes.api_stats import api_stats
+    from routes.api_catalysts import api_catalysts
 
     app.register_blueprint(views)
     app.register_blueprint(api_scanner, url_prefix='/api/scanner')
     app.register_blueprint(api_watchlist, url_prefix='/api/watchlist')
     app.register_blueprint(api_trades, url_prefix='/api/trades')
     app.register_blueprint(api_stats, url_prefix='/api/stats')
+    app.register_blueprint(api_catalysts, url_prefix='/api/catalysts')
+
+    from cli import register_commands
+    register_commands(app)
 
     with app.app_context():
         # Ensure instance directory exists for SQLite
         db_uri = app.config.get('SQLALCHEMY_DATABASE_URI', '')
         if db_uri.startswith('sqlite:///'):
-            db_path = db_uri.replace('sqlite:///', '')
-            os.makedirs(os.path.dirname(db_path), exist_ok=True)
-        db.create_all()
+            db_dir = os.path.dirname(db_uri.replace('sqlite:///', ''))
+            if db_dir:  # empty for sqlite:///:memory:
+                os.makedirs(db_dir, exist_ok=True)
+
+        from migrations import upgrade
+        upgrade()  # creates missing tables too, under the migration lock
 
     return app
 
 
+def start_background_jobs(app):
+    """Start the scheduler; called by server entrypoints only, never by CLI commands or scripts."""
+    from services.scheduler import start_scheduler
+    start_scheduler(app)
+
+
 if __name__ == '__main__':
     app = create_app()
+    start_background_jobs(app)
     app.run(debug=True, port=5001)
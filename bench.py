@@ -0,0 +1,413 @@
+"""Micro-benchmarks for hot paths.
+
+Usage:
+    python bench.py gaps [--sizes 70,500,1000,5000]
+    python bench.py scan [--symbols 10000] [--provider replay]
+    python bench.py summary [--trades 1000000]
+    python bench.py serialize [--rows 10000]
+    python bench.py backtest [--symbols 1000] [--years 5]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from services import gap_engine
+
+
+def _synthetic_bars(n_symbols: int, n_days: int = 6, seed: int = 0) -> tuple[list[str], dict]:
+    """Random-walk daily bars with scattered missing days and NaN prices."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2024-01-02', periods=n_days).values.astype('datetime64[D]')
+    symbols = [f'S{i:05d}' for i in range(n_symbols)]
+
+    bars = {}
+    for symbol in symbols:
+        close = 50 + rng.normal(0, 1, n_days).cumsum()
+        opens = close * (1 + rng.normal(0, 0.03, n_days))
+        keep = rng.random(n_days) > 0.1  # holidays / halted days
+        opens[rng.random(n_days) < 0.05] = np.nan
+        bars[symbol] = {
+            'date': dates[keep],
+            'open': opens[keep],
+            'high': np.maximum(opens, close)[keep] + 0.5,
+            'low': np.minimum(opens, close)[keep] - 0.5,
+            'close': close[keep],
+            'volume': rng.integers(1e5, 1e7, n_days).astype(np.float64)[keep],
+        }
+    return symbols, bars
+
+
+def _to_download_frame(symbols: list[str], bars: dict) -> pd.DataFrame:
+    """Shape bars like ``yf.download(..., group_by='ticker')`` output."""
+    frames = {}
+    for symbol in symbols:
+        b = bars[symbol]
+        frames[symbol] = pd.DataFrame({
+            'Open': b['open'], 'High': b['high'], 'Low': b['low'],
+            'Close': b['close'], 'Volume': b['volume'],
+        }, index=pd.DatetimeIndex(b['date']))
+    return pd.concat(frames, axis=1, sort=True)
+
+
+def _legacy_scan(data: pd.DataFrame, symbols: list[str], min_gap: float, direction: str) -> list[dict]:
+    """The original per-symbol loop from gap_scanner.scan_gaps."""
+    results = []
+    for symbol in symbols:
+        try:
+            df = data if len(symbols) == 1 else data[symbol]
+            df = df.dropna(subset=['Close', 'Open'])
+            if len(df) < 2:
+                continue
+
+            yesterday = df.iloc[-2]
+            today = df.iloc[-1]
+
+            prev_close = float(yesterday['Close'])
+            today_open = float(today['Open'])
+            current_price = float(today['Close'])
+            volume = int(today['Volume'])
+
+            if prev_close == 0:
+                continue
+
+            gap_percent = ((today_open - prev_close) / prev_close) * 100
+            gap_amount = today_open - prev_close
+
+            if direction == 'up' and gap_percent <= 0:
+                continue
+            if direction == 'down' and gap_percent >= 0:
+                continue
+            if abs(gap_percent) < min_gap:
+                continue
+
+            results.append({
+                'symbol': symbol,
+                'prev_close': round(prev_close, 2),
+                'open': round(today_open, 2),
+                'current': round(current_price, 2),
+                'gap_percent': round(gap_percent, 2),
+                'gap_amount': round(gap_amount, 2),
+                'direction': 'up' if gap_percent > 0 else 'down',
+                'volume': volume,
+                'sector': None
+            })
+        except Exception:
+            continue
+
+    results.sort(key=lambda x: abs(x['gap_percent']), reverse=True)
+    return results
+
+
+def _batched_scan(bars: dict, symbols: list[str], min_gap: float, direction: str) -> list[dict]:
+    _, matrices = gap_engine.align(bars, symbols)
+    table = gap_engine.compute_gaps(symbols, matrices)
+    mask = gap_engine.filter_mask(table, min_gap, direction)
+    return gap_engine.to_rows(table, mask)
+
+
+def _isolated_workdir(prefix: str):
+    """Point the database and every instance file the app writes at a fresh temp dir.
+
+    Must run before config is imported, since it reads the environment once.
+    """
+    workdir = tempfile.mkdtemp(prefix=prefix)
+    os.environ.update({
+        'DATABASE_URL': f'sqlite:///{os.path.join(workdir, "bench.db")}',
+        'BAR_STORE_DIR': os.path.join(workdir, 'bars'),
+        'REPLAY_DATA_DIR': os.path.join(workdir, 'replay'),
+        'CACHE_PATH': os.path.join(workdir, 'cache.db'),
+        'SCAN_SNAPSHOT_PATH': os.path.join(workdir, 'scan_snapshot.npz'),
+        'GAP_STATS_DIR': os.path.join(workdir, 'gap_stats'),
+        'SCHEDULER_ENABLED': 'false',
+    })
+
+
+def _timed(fn, repeat: int = 3) -> tuple[float, object]:
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def bench_gaps(sizes: list[int]):
+    print(f'{"symbols":>8} {"legacy ms":>10} {"batched ms":>11} {"speedup":>8}  match')
+    for n in sizes:
+        symbols, bars = _synthetic_bars(n)
+        data = _to_download_frame(symbols, bars)
+        for min_gap, direction in ((2.0, 'both'), (0.0, 'up')):
+            legacy_t, legacy = _timed(lambda: _legacy_scan(data, symbols, min_gap, direction))
+            batched_t, batched = _timed(lambda: _batched_scan(bars, symbols, min_gap, direction))
+            print(f'{n:>8} {legacy_t * 1e3:>10.1f} {batched_t * 1e3:>11.1f} '
+                  f'{legacy_t / batched_t:>7.1f}x  {legacy == batched}')
+
+
+def bench_scan(n_symbols: int, provider: str):
+    """End-to-end scan_gaps throughput against an offline replay dataset."""
+    _isolated_workdir('bench-scan-')
+    os.environ['MARKET_DATA_PROVIDER'] = provider
+
+    from app import create_app
+    from services import gap_scanner, symbol_meta
+    from services.market_data import generate_synthetic
+
+    symbols = [f'S{i:05d}' for i in range(n_symbols)]
+    if provider == 'replay':
+        end = date.today()
+        generate_synthetic(os.environ['REPLAY_DATA_DIR'], symbols, end - timedelta(days=60), end)
+
+    app = create_app()
+    with app.app_context():
+        symbol_meta.refresh(symbols)  # keep background metadata refreshes out of the timings
+        cache = gap_scanner.get_scan_cache()
+        for label in ('cold (provider -> store)', 'warm (store only)', 'cached table'):
+            if label != 'cached table':
+                cache.clear()
+            start = time.perf_counter()
+            result = gap_scanner.scan_gaps(symbols=symbols, min_gap=2.0)
+            elapsed = time.perf_counter() - start
+            print(f'{label:<26} {elapsed * 1e3:>9.1f} ms  '
+                  f'{n_symbols / elapsed:>10.0f} symbols/s  {result["total_found"]} gaps')
+
+
+def _legacy_summary() -> dict:
+    """The original get_summary: hydrate every Trade and aggregate in Python."""
+    from models import Trade
+
+    trades = Trade.query.all()
+    closed = [t for t in trades if t.status == 'closed']
+    open_trades = [t for t in trades if t.status == 'open']
+
+    winners = [t for t in closed if t.pnl and t.pnl > 0]
+    losers = [t for t in closed if t.pnl and t.pnl < 0]
+    pnls = [t.pnl for t in closed if t.pnl is not None]
+
+    total_pnl = sum(pnls)
+    total_wins = sum(t.pnl for t in winners)
+    total_losses = abs(sum(t.pnl for t in losers)) if losers else 0
+
+    sorted_closed = sorted(closed, key=lambda t: t.exit_date or t.entry_date)
+    max_wins, max_losses, cur_wins, cur_losses = 0, 0, 0, 0
+    for t in sorted_closed:
+        if t.pnl and t.pnl > 0:
+            cur_wins += 1
+            cur_losses = 0
+            max_wins = max(max_wins, cur_wins)
+        elif t.pnl and t.pnl < 0:
+            cur_losses += 1
+            cur_wins = 0
+            max_losses = max(max_losses, cur_losses)
+
+    return {
+        'total_trades': len(trades),
+        'open_trades': len(open_trades),
+        'closed_trades': len(closed),
+        'win_rate': round(len(winners) / len(closed) * 100, 1) if closed else 0,
+        'total_pnl': round(total_pnl, 2),
+        'avg_pnl': round(total_pnl / len(closed), 2) if closed else 0,
+        'best_trade': round(max(pnls), 2) if pnls else 0,
+        'worst_trade': round(min(pnls), 2) if pnls else 0,
+        'avg_winner': round(total_wins / len(winners), 2) if winners else 0,
+        'avg_loser': round(-total_losses / len(losers), 2) if losers else 0,
+        'profit_factor': round(total_wins / total_losses, 2) if total_losses > 0 else 0,
+        'max_consecutive_wins': max_wins,
+        'max_consecutive_losses': max_losses
+    }
+
+
+def _seed_trades(n_trades: int, seed: int = 0):
+    """Bulk-insert a synthetic journal: mostly closed trades, some open/cancelled/breakeven."""
+    from models import db, Trade
+
+    rng = np.random.default_rng(seed)
+    start = datetime(2020, 1, 1)
+    entry_offsets = rng.integers(0, 5 * 365 * 24 * 60, n_trades)
+    hold = rng.integers(1, 3 * 24 * 60, n_trades)
+    status = rng.choice(['closed', 'open', 'cancelled'], n_trades, p=[0.9, 0.07, 0.03])
+    pnl = np.round(rng.normal(20, 150, n_trades), 2)
+    pnl[rng.random(n_trades) < 0.02] = 0
+
+    batch = 50_000
+    for lo in range(0, n_trades, batch):
+        rows = []
+        for i in range(lo, min(lo + batch, n_trades)):
+            closed = status[i] == 'closed'
+            entry = start + timedelta(minutes=int(entry_offsets[i]))
+            rows.append({
+                'symbol': 'SYM', 'direction': 'long', 'entry_price': 100.0, 'quantity': 10,
+                'entry_date': entry,
+                'exit_date': entry + timedelta(minutes=int(hold[i])) if closed else None,
+                'exit_price': 100.0 + pnl[i] / 10 if closed else None,
+                'status': str(status[i]),
+                'pnl': float(pnl[i]) if closed else None,
+                'gap_type': 'gap_up' if i % 2 else 'gap_down',
+                'source': 'manual', 'trading_mode': 'paper',
+            })
+        db.session.execute(db.insert(Trade), rows)
+    db.session.commit()
+
+
+def bench_summary(n_trades: int):
+    """ORM-hydrating get_summary vs SQL aggregates over a synthetic journal."""
+    _isolated_workdir('bench-summary-')
+
+    from app import create_app
+    from models import TradeAggregate
+    from services import stats_service, trade_aggregates
+
+    app = create_app()
+    with app.app_context():
+        start = time.perf_counter()
+        _seed_trades(n_trades)
+        print(f'seeded {n_trades} trades in {time.perf_counter() - start:.1f} s')
+
+        def from_sql():
+            return stats_service.summarize(TradeAggregate(scope='all', **trade_aggregates.compute('all')))
+
+        legacy_t, legacy = _timed(_legacy_summary, repeat=1)
+        print(f'{"legacy (ORM)":<16} {legacy_t * 1e3:>10.1f} ms')
+        stats_service.get_summary()  # builds the materialized rows
+        for label, fn in (('SQL aggregate', from_sql), ('materialized row', stats_service.get_summary)):
+            elapsed, summary = _timed(fn)
+            print(f'{label:<16} {elapsed * 1e3:>10.1f} ms  {legacy_t / elapsed:>8.1f}x  match={legacy == summary}')
+
+
+def bench_serialize(n_rows: int):
+    """Trade and watchlist list payloads: ORM objects + to_dict vs column tuples, both through Flask's provider."""
+    _isolated_workdir('bench-serialize-')
+
+    from app import create_app
+    from models import db, column_dicts, Trade, Watchlist
+
+    app = create_app()
+    with app.app_context(), app.test_request_context():
+        _seed_trades(n_rows)
+        db.session.execute(db.update(Trade).where(Trade.id % 7 == 0).values(notes='gap & go \u2713 caf\u00e9 "quoted"'))
+        db.session.execute(db.insert(Watchlist), [
+            {'symbol': f'W{i:05d}', 'added_date': datetime(2024, 1, 1) + timedelta(minutes=i),
+             'notes': 'earnings \u2191' if i % 3 else None, 'target_price': 10 + i / 7, 'is_active': True}
+            for i in range(n_rows)
+        ])
+        db.session.commit()
+
+        for model in (Trade, Watchlist):
+            query = model.query.order_by(model.id.desc())
+
+            def legacy():
+                return app.json.response({'data': [m.to_dict() for m in query.all()]}).get_data()
+
+            def projected():
+                return app.json.response({'data': column_dicts(query, model)}).get_data()
+
+            legacy_t, old = _timed(legacy)
+            new_t, new = _timed(projected)
+            print(f'{model.__tablename__:<10} {n_rows:>7} rows  legacy {legacy_t * 1e3:>7.1f} ms  '
+                  f'projected {new_t * 1e3:>7.1f} ms  {legacy_t / new_t:>5.1f}x  identical={old == new}')
+
+
+def _legacy_backtest(symbols: list[str], bars: dict, rule: dict) -> list[tuple]:
+    """Per-gap, per-bar Python loop with the same rules as services.backtest.run."""
+    from services.trade_service import compute_pnl
+
+    hold, trades = rule['hold_days'], []
+    for position, symbol in enumerate(symbols):
+        b = bars[symbol]
+        opens, highs, lows, closes = (b[name].tolist() for name in ('open', 'high', 'low', 'close'))
+        for i in range(1, len(opens) - hold):
+            gap = (opens[i] - closes[i - 1]) / closes[i - 1] * 100
+            if not np.isfinite(gap) or not np.isfinite(closes[i + hold]) or abs(gap) < rule['min_gap']:
+                continue
+            if rule['gap_type'] != 'both' and (gap > 0) != (rule['gap_type'] == 'gap_up'):
+                continue
+            short = (gap > 0) == (rule['side'] == 'fade')
+            sign = -1.0 if short else 1.0
+            entry = round(opens[i], 2)
+            if entry <= 0:
+                continue
+            stop = round(entry * (1 - sign * rule['stop_pct'] / 100), 2) if rule['stop_pct'] is not None else None
+            target = round(entry * (1 + sign * rule['target_pct'] / 100), 2) if rule['target_pct'] is not None else None
+
+            exit_price, exit_k = closes[i + hold], hold
+            for k in range(hold + 1):
+                o = opens[i + k]
+                adverse, favorable = (highs[i + k], lows[i + k]) if short else (lows[i + k], highs[i + k])
+                if stop is not None and sign * (adverse - stop) <= 0:
+                    exit_price, exit_k = (o if k > 0 and sign * (o - stop) <= 0 else stop), k
+                    break
+                if target is not None and sign * (favorable - target) >= 0:
+                    exit_price, exit_k = (o if k > 0 and sign * (o - target) >= 0 else target), k
+                    break
+            exit_price = round(exit_price, 2)
+            direction = 'short' if short else 'long'
+            pnl, _ = compute_pnl(direction, entry, exit_price, rule['quantity'])
+            trades.append((b['date'][i], position, symbol, direction, entry, exit_price,
+                           b['date'][i + exit_k], pnl))
+    trades.sort(key=lambda t: (t[0], t[1]))
+    return [(symbol, str(entered), str(exited), direction, entry, exit_, pnl)
+            for entered, _, symbol, direction, entry, exit_, exited, pnl in trades]
+
+
+def bench_backtest(n_symbols: int, years: int):
+    """Per-bar Python loop vs the vectorized backtester on random-walk bars, across a few rules."""
+    from services import backtest
+
+    symbols, bars = _synthetic_bars(n_symbols, n_days=252 * years)
+    dates = np.concatenate([b['date'] for b in bars.values()])
+    flat = backtest.flatten(symbols, bars, dates.min(), dates.max())
+    print(f'{n_symbols} symbols x {252 * years} days')
+    for overrides in ({}, {'stop_pct': 2.0, 'target_pct': 3.0, 'hold_days': 3}, {'gap_type': 'both', 'side': 'follow',
+                                                                                   'stop_pct': None, 'hold_days': 1}):
+        rule = backtest.validate_rule(overrides)
+        legacy_t, legacy = _timed(lambda: _legacy_backtest(symbols, bars, rule), repeat=1)
+        vector_t, result = _timed(lambda: backtest.run(rule, flat))
+        summary_t, _ = _timed(lambda: backtest.run(rule, flat, with_trades=False))
+        vector = [(t['symbol'], t['entry_date'][:10], t['exit_date'][:10], t['direction'], t['entry_price'],
+                   t['exit_price'], t['pnl']) for t in result['trades']]
+        print(f'{overrides or "defaults"}')
+        print(f'  {len(vector):>7} trades  legacy {legacy_t * 1e3:>8.1f} ms  vectorized {vector_t * 1e3:>7.1f} ms '
+              f'({legacy_t / vector_t:.1f}x)  summary only {summary_t * 1e3:>7.1f} ms ({legacy_t / summary_t:.1f}x)  '
+              f'match={legacy == vector}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    gaps = sub.add_parser('gaps', help='per-symbol loop vs batched NumPy gap engine')
+    gaps.add_argument('--sizes', default='70,500,1000,5000')
+
+    scan = sub.add_parser('scan', help='end-to-end scan_gaps throughput with a given provider')
+    scan.add_argument('--symbols', type=int, default=10000)
+    scan.add_argument('--provider', default='replay')
+
+    summary = sub.add_parser('summary', help='get_summary: ORM loop vs SQL aggregates vs materialized row')
+    summary.add_argument('--trades', type=int, default=1_000_000)
+
+    serialize = sub.add_parser('serialize', help='list endpoint payloads: ORM + to_dict vs column tuples')
+    serialize.add_argument('--rows', type=int, default=10_000)
+
+    backtest = sub.add_parser('backtest', help='per-bar Python loop vs vectorized gap-rule backtester')
+    backtest.add_argument('--symbols', type=int, default=1000)
+    backtest.add_argument('--years', type=int, default=5)
+
+    args = parser.parse_args()
+    if args.command == 'gaps':
+        bench_gaps([int(n) for n in args.sizes.split(',')])
+    elif args.command == 'scan':
+        bench_scan(args.symbols, args.provider)
+    elif args.command == 'summary':
+        bench_summary(args.trades)
+    elif args.command == 'serialize':
+        bench_serialize(args.rows)
+    elif args.command == 'backtest':
+        bench_backtest(args.symbols, args.years)
+
+
+if __name__ == '__main__':
+    main()
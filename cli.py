@@ -0,0 +1,148 @@
+"""Flask CLI commands (``flask --app wsgi <command>``)."""
+import click
+
+
+def register_commands(app):
+    @app.cli.command('refresh-symbol-meta')
+    @click.argument('symbols', nargs=-1)
+    def refresh_symbol_meta(symbols):
+        """Bulk-fetch sector/industry metadata (defaults to the scanner universe)."""
+        from services import symbol_meta
+        from services.symbols import DEFAULT_SYMBOLS
+
+        symbols = [s.upper() for s in symbols] or DEFAULT_SYMBOLS
+        fetched = symbol_meta.refresh(symbols)
+        click.echo(f'Refreshed metadata for {len(fetched)} symbols')
+
+    @app.cli.command('scan-snapshot')
+    def scan_snapshot():
+        """Run the scheduled default-universe gap scan once."""
+        from services.scheduler import run_snapshot_scan
+
+        if run_snapshot_scan(app):
+            click.echo(f'Wrote {app.config["SCAN_SNAPSHOT_PATH"]}')
+        else:
+            click.echo('Snapshot is fresh or being refreshed by another process')
+
+    @app.cli.command('update-gap-stats')
+    @click.argument('symbols', nargs=-1)
+    @click.option('--rebuild', is_flag=True, help='Discard the table and recompute it from scratch.')
+    def update_gap_stats(symbols, rebuild):
+        """Add newly completed gaps to the fill statistics (symbols are added to the table)."""
+        from services import gap_stats
+
+        result = gap_stats.update([s.upper() for s in symbols] or None, rebuild=rebuild)
+        click.echo(f'Added {result["gaps_added"]} gaps for {result["symbols"]} symbols '
+                   f'({len(result["failed"])} failed) in {result["elapsed_s"]}s')
+
+    @app.cli.command('ingest-catalysts')
+    @click.argument('symbols', nargs=-1)
+    def ingest_catalysts(symbols):
+        """Fetch Finnhub catalysts (defaults to today's gappers and the watchlist)."""
+        from services.scheduler import run_catalyst_ingest
+
+        run = run_catalyst_ingest(app, [s.upper() for s in symbols] or None)
+        if run is None:
+            raise click.ClickException('Catalyst ingest failed or is running in another process')
+        limiter = run['limiter']
+        click.echo(f'{run["symbols"]} symbols: {run["requests"]} requests ({run["cached"]} cached, '
+                   f'{run["error_count"]} failed), {run["inserted"]} new and {run["updated"]} updated catalysts '
+                   f'in {run["elapsed_s"]}s')
+        click.echo(f'Rate limit: {limiter["max_in_window"]}/{limiter["quota"]} calls in the busiest minute, '
+                   f'sustained {limiter["sustained_rate"]}/min ({limiter["utilization"]}% of quota)')
+
+    @app.cli.command('backtest')
+    @click.argument('symbols', nargs=-1)
+    @click.option('--start', help='First entry date, YYYY-MM-DD (default: BACKTEST_YEARS ago).')
+    @click.option('--end', help='Last entry date, YYYY-MM-DD (default: today).')
+    @click.option('--set', 'settings', multiple=True, metavar='KEY=VALUE', help='Rule setting, e.g. stop_pct=1.')
+    @click.option('--sweep', 'sweeps', multiple=True, metavar='KEY=V1,V2',
+                  help='Run every combination of these values in parallel.')
+    @click.option('--workers', type=int, help='Sweep processes (default: BACKTEST_WORKERS).')
+    @click.option('--top', default=10, help='Sweep results to print.')
+    @click.option('--output', type=click.File('w'), help='Write the full result as JSON.')
+    def backtest(symbols, start, end, settings, sweeps, workers, top, output):
+        """Backtest a gap rule (default: fade gap-ups over 3% with a 1% stop) on daily bars."""
+        import json
+        from services import backtest as engine
+
+        symbols = [s.upper() for s in symbols] or None
+        try:
+            rule = dict(_parse_setting(s) for s in settings)
+            if sweeps:
+                grid = {key: values for key, values in (_parse_setting(s, many=True) for s in sweeps)}
+                result = engine.sweep(rule, grid, symbols, start, end, max_workers=workers)
+            else:
+                result = engine.backtest(rule, symbols, start, end)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+
+        if output:
+            json.dump(result, output, indent=2)
+        if sweeps:
+            for run in result['runs'][:top]:
+                summary = run['summary']
+                click.echo(f'{run["params"]}: {summary["closed_trades"]} trades, win rate {summary["win_rate"]}%, '
+                           f'P&L {summary["total_pnl"]}, profit factor {summary["profit_factor"]}')
+        else:
+            click.echo(json.dumps(result['summary'], indent=2))
+        if result['failed']:
+            click.echo(f'{len(result["failed"])} symbols had no bars')
+
+    @app.cli.command('rebuild-aggregates')
+    def rebuild_aggregates():
+        """Recompute the performance aggregates table from trades and verify it."""
+        from models import db
+        from services import data_version, trade_aggregates
+
+        for scope, diffs in trade_aggregates.verify().items():
+            click.echo(f'{scope}: ' + ('missing' if 'scope' in diffs else f'drifted in {", ".join(diffs)}'))
+
+        trade_aggregates.rebuild()
+        data_version.bump('trades')  # repaired totals change the stats responses
+        db.session.commit()
+
+        drift = trade_aggregates.verify()
+        if drift:
+            raise click.ClickException(f'Aggregates still differ after rebuild: {drift}')
+        click.echo(f'Rebuilt and verified {len(trade_aggregates.SCOPES)} aggregate scopes')
+
+    @app.cli.command('migrate')
+    def migrate():
+        """Apply pending schema migrations."""
+        import migrations
+
+        applied = migrations.upgrade()
+        click.echo(f'Applied {applied or "no"} migrations; schema at version {migrations.current_version()}')
+
+    @app.cli.command('check-query-plans')
+    def check_query_plans():
+        """Fail if any hot-path query falls back to a full table scan."""
+        import migrations
+
+        failures = migrations.full_scans()
+        for name, plan in failures.items():
+            click.echo(f'{name}:\n    ' + '\n    '.join(plan))
+        if failures:
+            raise click.ClickException(f'{len(failures)} hot-path queries do a full table scan')
+        click.echo(f'All {len(migrations.hot_queries())} hot-path queries use an index')
+
+
+def _parse_setting(text: str, many: bool = False):
+    """Parse KEY=VALUE (or KEY=V1,V2,... with many) into (key, value(s)); numbers and none are converted."""
+    key, sep, value = text.partition('=')
+    if not sep or not key:
+        raise ValueError(f'Expected KEY=VALUE, got {text!r}')
+
+    def convert(v):
+        v = v.strip()
+        if v.lower() == 'none':
+            return None
+        for cast in (int, float):
+            try:
+                return cast(v)
+            except ValueError:
+                pass
+        return v
+
+    return key.strip(), [convert(v) for v in value.split(',')] if many else convert(value)
@@ -11,10 +11,81 @@ class Config:
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Market data provider: 'yfinance' (live) or 'replay' (local files)
+    MARKET_DATA_PROVIDER = os.getenv('MARKET_DATA_PROVIDER', 'yfinance')
+    REPLAY_DATA_DIR = os.getenv('REPLAY_DATA_DIR', os.path.join(basedir, 'instance', 'replay'))
+
+    # Local daily bar store
+    BAR_STORE_DIR = os.getenv('BAR_STORE_DIR', os.path.join(basedir, 'instance', 'bars'))
+    BAR_STORE_LIVE_TTL = 60  # seconds before today's partial bar is refetched during the session
+
+    # Chunked bar fetching for large universes
+    SCAN_CHUNK_SIZE = int(os.getenv('SCAN_CHUNK_SIZE', '200'))  # symbols per provider request
+    SCAN_MAX_WORKERS = int(os.getenv('SCAN_MAX_WORKERS', '4'))  # concurrent chunk fetches
+    SCAN_CHUNK_RETRIES = 2  # retries per chunk before its symbols are reported as failed
+    SCAN_CHUNK_TIMEOUT = 30  # seconds per provider request
+
+    # Cache backend shared by scanner and stats caches: 'sqlite' (a file shared by
+    # all workers on the host), 'redis' (any Redis-protocol server) or 'memory'
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'sqlite')
+    CACHE_PATH = os.getenv('CACHE_PATH', os.path.join(basedir, 'instance', 'cache.db'))
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_MAX_BYTES = int(os.getenv('CACHE_MAX_BYTES', str(256 * 2**20)))  # sqlite backend, all namespaces
+
+    # Gap scan result cache
+    SCAN_CACHE_TTL = 60  # seconds, current session only; past dates never expire
+    SCAN_CACHE_SIZE = 128
+    SCAN_COALESCE_TIMEOUT = 120  # seconds a request waits on an identical in-flight scan before running its own
+
+    # Scheduled scans of the default universe, shared with all workers as a snapshot
+    SCHEDULER_ENABLED = os.getenv('SCHEDULER_ENABLED', 'true').lower() == 'true'
+    SCHEDULER_TIMEZONE = 'America/New_York'
+    SCHEDULER_PREMARKET_TIME = os.getenv('SCHEDULER_PREMARKET_TIME', '09:00')
+    SCHEDULER_INTERVAL_MINUTES = int(os.getenv('SCHEDULER_INTERVAL_MINUTES', '5'))  # during market hours
+    SCAN_SNAPSHOT_PATH = os.getenv('SCAN_SNAPSHOT_PATH', os.path.join(basedir, 'instance', 'scan_snapshot.npz'))
+    SCAN_SNAPSHOT_MAX_AGE = 900  # seconds before default scans stop using the snapshot
+
+    # Historical gap-fill statistics, attached to scan results
+    GAP_STATS_DIR = os.getenv('GAP_STATS_DIR', os.path.join(basedir, 'instance', 'gap_stats'))
+    GAP_STATS_YEARS = 5  # years of bars behind a freshly built table
+    GAP_STATS_BUCKETS = (0.5, 1, 2, 3, 5, 10)  # lower edges of the |gap %| buckets
+    SCHEDULER_GAP_STATS_TIME = os.getenv('SCHEDULER_GAP_STATS_TIME', '08:30')
+
+    # Backtests
+    BACKTEST_YEARS = 5  # default history when no start date is given
+    BACKTEST_WORKERS = int(os.getenv('BACKTEST_WORKERS', '0')) or None  # sweep processes, None for one per CPU
+
+    # Performance stats
+    STATS_CACHE_SIZE = 64  # cached P&L series
+
+    # Bulk trade import / export
+    IMPORT_BATCH_SIZE = 5000  # rows validated and inserted per executemany
+    IMPORT_MAX_ERRORS = 1000  # per-row errors listed in the response
+    EXPORT_CHUNK_SIZE = 1000  # rows fetched per server-side cursor round-trip
+    TRADE_BATCH_MAX = 5000  # trades per PUT /api/trades/batch
+
+    # Symbol metadata (sector, industry, market cap)
+    SYMBOL_META_WORKERS = 8  # concurrent metadata fetches
+    SYMBOL_META_MAX_AGE = 86400  # seconds before a symbol's metadata is refreshed
+    SYMBOL_META_RELOAD = 300  # seconds between reloads of the in-memory sector map
+    SCHEDULER_SYMBOL_META_HOURS = int(os.getenv('SCHEDULER_SYMBOL_META_HOURS', '6'))  # default universe prefetch
+
     # Finnhub
     FINNHUB_API_KEY = os.getenv('FINNHUB_API_KEY', '')
-    FINNHUB_CALLS_PER_MINUTE = 60
+    FINNHUB_BASE_URL = os.getenv('FINNHUB_BASE_URL', 'https://api.finnhub.io/api/v1')
+    FINNHUB_CALLS_PER_MINUTE = int(os.getenv('FINNHUB_CALLS_PER_MINUTE', '60'))
     FINNHUB_CACHE_TTL = 300  # seconds
+    FINNHUB_CACHE_SIZE = 2048  # cached responses
+    FINNHUB_WORKERS = 4  # concurrent requests, all drawing on the same per-minute budget
+
+    # Catalyst ingestion
+    CATALYST_MIN_GAP = 2.0  # gap % for a scanned symbol to have its catalysts fetched
+    CATALYST_NEWS_DAYS = 3  # days of news and filings fetched per symbol
+    CATALYST_EARNINGS_DAYS = 14  # days ahead on the earnings calendar
+    CATALYST_BATCH_SIZE = 500  # rows per upsert round-trip
+    CATALYST_WINDOW_DAYS = 3  # days before a gap or trade entry whose catalysts are attached to it
+    CATALYST_TOP_N = 3  # catalysts attached per gap or trade row
+    SCHEDULER_CATALYST_TIME = os.getenv('SCHEDULER_CATALYST_TIME', '09:10')
 
     # Interactive Brokers
     IB_HOST = os.getenv('IB_HOST', '127.0.0.1')
@@ -35,6 +106,8 @@ class DevelopmentConfig(Config):
 class TestConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SCHEDULER_ENABLED = False
+    CACHE_BACKEND = 'memory'
 
 
 class ProductionConfig(Config):
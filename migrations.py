@@ -0,0 +1,199 @@
+"""Schema migrations and query-plan checks.
+
+``db.create_all()`` only creates missing tables, so changes to existing
+tables (new indexes or columns) are applied here. MIGRATIONS is an ordered
+list of (version, description, statements), where a statement is SQL or a
+callable; ``upgrade()`` runs the ones not yet recorded in
+schema_migrations. Statements must be idempotent because fresh databases
+already get every index and column from the model definitions. Indexes
+are declared only in the models' ``__table_args__``: a migration names
+them and ``create_index`` builds them from that declaration.
+"""
+import json
+import os
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+
+from sqlalchemy import func, inspect, select, text, update
+
+from models import db, Catalyst, SchemaMigration, Trade, Watchlist
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, fine for a single dev server
+    fcntl = None
+
+# pg_advisory_lock key held while migrating (any constant unique to this app)
+PG_LOCK_KEY = 0x6761705f6d6967  # 'gap_mig'
+
+MIGRATIONS = [
+    (1, 'Hot-path indexes for trades and watchlist', [
+        lambda: create_index('ix_trades_entry_date'),
+        lambda: create_index('ix_trades_status_entry_date'),
+        lambda: create_index('ix_trades_status_exit_date'),
+        lambda: create_index('ix_trades_status_gap_type'),
+        lambda: create_index('ix_trades_symbol_entry_date'),
+        lambda: create_index('ix_watchlist_is_active_added_date'),
+    ]),
+    (2, 'Data version counters', [
+        f"INSERT INTO data_versions (name, version, updated_at) SELECT '{name}', 0, CURRENT_TIMESTAMP "
+        f"WHERE NOT EXISTS (SELECT 1 FROM data_versions WHERE name = '{name}')"
+        for name in ('trades', 'watchlist')
+    ]),
+    (3, 'Catalyst external ids', [
+        lambda: add_column('catalysts', 'external_id', 'VARCHAR(100)'),
+        lambda: create_index('ux_catalysts_symbol_source_external_id'),
+        "INSERT INTO data_versions (name, version, updated_at) SELECT 'catalysts', 0, CURRENT_TIMESTAMP "
+        "WHERE NOT EXISTS (SELECT 1 FROM data_versions WHERE name = 'catalysts')",
+    ]),
+    (4, 'Catalyst time-window index and parsed raw_data columns', [
+        lambda: create_index('ix_catalysts_symbol_event_date'),
+        lambda: add_column('catalysts', 'url', 'VARCHAR(500)'),
+        lambda: add_column('catalysts', 'summary', 'TEXT'),
+        lambda: _backfill_catalyst_fields(),
+    ]),
+]
+
+
+def upgrade() -> list[int]:
+    """Create missing tables, then apply pending migrations in order, each in its own transaction.
+
+    Holds a lock for the whole run (a PostgreSQL advisory lock, or a file
+    lock next to a SQLite database), so workers starting together migrate
+    one at a time and the others find the migrations recorded. Returns the
+    versions applied here.
+    """
+    with migration_lock():
+        db.create_all()
+        applied = []
+        for version, description, statements in MIGRATIONS:
+            if db.session.get(SchemaMigration, version) is not None:
+                continue
+            for statement in statements:
+                if callable(statement):
+                    statement()
+                else:
+                    db.session.execute(text(statement))
+            db.session.add(SchemaMigration(version=version, description=description))
+            db.session.commit()
+            applied.append(version)
+        return applied
+
+
+def migration_lock():
+    """Context manager serializing migrations across processes sharing the database."""
+    engine = db.engine
+    if engine.dialect.name == 'postgresql':
+        return _advisory_lock(engine)
+    database = engine.url.database
+    if engine.dialect.name == 'sqlite' and database and database != ':memory:' and fcntl is not None:
+        return _file_lock(f'{database}.migrate.lock')
+    return nullcontext()
+
+
+@contextmanager
+def _advisory_lock(engine):
+    with engine.connect() as conn:
+        conn.execute(text('SELECT pg_advisory_lock(:key)'), {'key': PG_LOCK_KEY})
+        conn.commit()  # the lock is session-level; don't sit idle in a transaction
+        try:
+            yield
+        finally:
+            conn.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': PG_LOCK_KEY})
+            conn.commit()
+
+
+@contextmanager
+def _file_lock(path: str):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+def create_index(name: str):
+    """Create the index declared under name in a model's __table_args__, unless it exists."""
+    for table in db.metadata.tables.values():
+        for index in table.indexes:
+            if index.name == name:
+                index.create(db.session.connection(), checkfirst=True)
+                return
+    raise KeyError(f'No model declares index {name!r}')
+
+
+def add_column(table: str, column: str, ddl: str):
+    """ALTER TABLE ... ADD COLUMN unless the column already exists."""
+    existing = {c['name'] for c in inspect(db.session.connection()).get_columns(table)}
+    if column not in existing:
+        db.session.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}'))
+
+
+def current_version() -> int:
+    return db.session.query(func.max(SchemaMigration.version)).scalar() or 0
+
+
+def hot_queries() -> dict:
+    """Representative statements for the journal, stats, watchlist and catalyst lookups."""
+    from services.catalysts import window_filter
+
+    since = datetime(2000, 1, 1, tzinfo=timezone.utc)
+    closed = Trade.status == 'closed'
+    return {
+        'journal, newest first': select(Trade).order_by(Trade.entry_date.desc()).limit(50),
+        'journal by status': select(Trade).where(Trade.status == 'open').order_by(Trade.entry_date.desc()).limit(50),
+        'journal by symbol': select(Trade).where(Trade.symbol == 'AAPL').order_by(Trade.entry_date.desc()).limit(50),
+        'P&L series': select(func.date(Trade.exit_date), func.sum(Trade.pnl)).where(
+            closed, Trade.exit_date >= since, Trade.pnl.isnot(None)
+        ).group_by(func.date(Trade.exit_date)),
+        'breakdown by gap type': select(Trade.gap_type, func.count(Trade.id)).where(closed).group_by(Trade.gap_type),
+        'closed trades by gap type': select(Trade).where(closed, Trade.gap_type == 'gap_up'),
+        'active watchlist': select(Watchlist).where(Watchlist.is_active.is_(True)).order_by(Watchlist.added_date.desc()),
+        'watchlist by symbol': select(Watchlist).where(Watchlist.symbol == 'AAPL'),
+        'catalysts attached to rows': select(Catalyst.id).where(window_filter({
+            'AAPL': [(datetime(2024, 1, 2), datetime(2024, 1, 10)), (datetime(2024, 2, 1), datetime(2024, 2, 9))],
+            'MSFT': [(datetime(2024, 3, 1), datetime(2024, 3, 9))],
+        }, ids={1, 2})),
+    }
+
+
+def full_scans() -> dict:
+    """EXPLAIN every hot query and return {name: plan} for those that scan a whole table.
+
+    An index scan that only provides ordering (SQLite ``SCAN ... USING
+    INDEX``) is fine. On PostgreSQL sequential scans are disabled for the
+    check, so a ``Seq Scan`` in the plan means no usable index exists.
+    """
+    dialect = db.session.get_bind().dialect
+    failures = {}
+    for name, stmt in hot_queries().items():
+        sql = str(stmt.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+        if dialect.name == 'postgresql':
+            db.session.execute(text('SET LOCAL enable_seqscan = off'))
+            plan = [row[0] for row in db.session.execute(text(f'EXPLAIN {sql}'))]
+            bad = [line for line in plan if 'Seq Scan' in line]
+        else:
+            plan = [row[-1] for row in db.session.execute(text(f'EXPLAIN QUERY PLAN {sql}'))]
+            bad = [line for line in plan if line.startswith('SCAN ') and ' USING ' not in line]
+        if bad:
+            failures[name] = plan
+    db.session.rollback()
+    return failures
+
+
+def _backfill_catalyst_fields():
+    """Copy url and summary out of raw_data for catalysts ingested before those columns existed."""
+    from services.catalysts import fields_from_raw
+
+    pending = db.session.execute(select(Catalyst.id, Catalyst.source, Catalyst.raw_data).where(
+        Catalyst.raw_data.isnot(None), Catalyst.url.is_(None), Catalyst.summary.is_(None)
+    ))
+    updates = []
+    for id_, source, raw in pending:
+        try:
+            fields = fields_from_raw(source, json.loads(raw))
+        except (ValueError, AttributeError):  # not a JSON object
+            continue
+        if fields['url'] or fields['summary']:
+            updates.append({'id': id_, **fields})
+    if updates:
+        db.session.execute(update(Catalyst), updates)
@@ -6,6 +6,9 @@ db = SQLAlchemy()
 
 class Watchlist(db.Model):
     __tablename__ = 'watchlist'
+    __table_args__ = (
+        db.Index('ix_watchlist_is_active_added_date', 'is_active', 'added_date'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     symbol = db.Column(db.String(10), nullable=False, unique=True)
@@ -29,6 +32,13 @@ class Watchlist(db.Model):
 
 class Trade(db.Model):
     __tablename__ = 'trades'
+    __table_args__ = (
+        db.Index('ix_trades_entry_date', 'entry_date'),
+        db.Index('ix_trades_status_entry_date', 'status', 'entry_date'),
+        db.Index('ix_trades_status_exit_date', 'status', 'exit_date'),
+        db.Index('ix_trades_status_gap_type', 'status', 'gap_type'),
+        db.Index('ix_trades_symbol_entry_date', 'symbol', 'entry_date'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     symbol = db.Column(db.String(10), nullable=False)
@@ -95,6 +105,14 @@ class Catalyst(db.Model):
     event_date = db.Column(db.DateTime, nullable=True)
     raw_data = db.Column(db.Text, nullable=True)  # JSON blob
     catalyst_score = db.Column(db.Float, nullable=True)  # 0-100
+    external_id = db.Column(db.String(100), nullable=True)  # provider's id, unique per (symbol, source)
+    url = db.Column(db.String(500), nullable=True)  # parsed from raw_data at ingest
+    summary = db.Column(db.Text, nullable=True)
+
+    __table_args__ = (
+        db.Index('ux_catalysts_symbol_source_external_id', 'symbol', 'source', 'external_id', unique=True),
+        db.Index('ix_catalysts_symbol_event_date', 'symbol', 'event_date'),
+    )
 
     def to_dict(self):
         return {
@@ -103,6 +121,8 @@ class Catalyst(db.Model):
             'catalyst_type': self.catalyst_type,
             'headline': self.headline,
             'source': self.source,
+            'url': self.url,
+            'summary': self.summary,
             'sentiment_score': self.sentiment_score,
             'detected_date': self.detected_date.isoformat(),
             'event_date': self.event_date.isoformat() if self.event_date else None,
@@ -170,3 +190,132 @@ class RiskConfig(db.Model):
             'max_open_positions': self.max_open_positions,
             'updated_at': self.updated_at.isoformat(),
         }
+
+
+class SymbolMeta(db.Model):
+    __tablename__ = 'symbol_meta'
+
+    id = db.Column(db.Integer, primary_key=True)
+    symbol = db.Column(db.String(10), nullable=False, unique=True)
+    sector = db.Column(db.String(50), nullable=True)
+    industry = db.Column(db.String(100), nullable=True)
+    market_cap = db.Column(db.BigInteger, nullable=True)
+    avg_volume = db.Column(db.BigInteger, nullable=True)
+    updated_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'symbol': self.symbol,
+            'sector': self.sector,
+            'industry': self.industry,
+            'market_cap': self.market_cap,
+            'avg_volume': self.avg_volume,
+            'updated_at': self.updated_at.isoformat(),
+        }
+
+
+class TradeAggregate(db.Model):
+    """Materialized performance totals for one scope: 'all', 'gap_up' or 'gap_down'."""
+    __tablename__ = 'trade_aggregates'
+
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(10), nullable=False, unique=True)
+    trade_count = db.Column(db.Integer, nullable=False, default=0)
+    open_count = db.Column(db.Integer, nullable=False, default=0)
+    closed_count = db.Column(db.Integer, nullable=False, default=0)
+    winner_count = db.Column(db.Integer, nullable=False, default=0)
+    loser_count = db.Column(db.Integer, nullable=False, default=0)
+    pnl_count = db.Column(db.Integer, nullable=False, default=0)  # closed trades with a P&L
+    total_pnl = db.Column(db.Float, nullable=False, default=0.0)
+    total_wins = db.Column(db.Float, nullable=False, default=0.0)
+    total_losses = db.Column(db.Float, nullable=False, default=0.0)  # sum of losing P&L (negative)
+    best_pnl = db.Column(db.Float, nullable=True)
+    worst_pnl = db.Column(db.Float, nullable=True)
+
+    # Streak state; breakeven trades neither extend nor break a streak
+    max_wins = db.Column(db.Integer, nullable=False, default=0)
+    max_losses = db.Column(db.Integer, nullable=False, default=0)
+    current_wins = db.Column(db.Integer, nullable=False, default=0)
+    current_losses = db.Column(db.Integer, nullable=False, default=0)
+    last_decided_at = db.Column(db.DateTime, nullable=True)  # close date of the latest win/loss
+    last_decided_id = db.Column(db.Integer, nullable=True)
+
+    version = db.Column(db.Integer, nullable=False, default=0)  # bumped on every change
+    updated_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+
+    def to_dict(self):
+        return {
+            'scope': self.scope,
+            'trade_count': self.trade_count,
+            'open_count': self.open_count,
+            'closed_count': self.closed_count,
+            'winner_count': self.winner_count,
+            'loser_count': self.loser_count,
+            'pnl_count': self.pnl_count,
+            'total_pnl': self.total_pnl,
+            'total_wins': self.total_wins,
+            'total_losses': self.total_losses,
+            'best_pnl': self.best_pnl,
+            'worst_pnl': self.worst_pnl,
+            'max_wins': self.max_wins,
+            'max_losses': self.max_losses,
+            'current_wins': self.current_wins,
+            'current_losses': self.current_losses,
+            'last_decided_at': self.last_decided_at.isoformat() if self.last_decided_at else None,
+            'last_decided_id': self.last_decided_id,
+            'version': self.version,
+            'updated_at': self.updated_at.isoformat(),
+        }
+
+
+class DataVersion(db.Model):
+    """Write counter for one table ('trades', 'watchlist'), behind ETags and cache keys."""
+    __tablename__ = 'data_versions'
+
+    name = db.Column(db.String(30), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+
+
+class SchemaMigration(db.Model):
+    __tablename__ = 'schema_migrations'
+
+    version = db.Column(db.Integer, primary_key=True)
+    description = db.Column(db.String(200), nullable=False)
+    applied_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+
+
+def list_columns(model) -> list:
+    """Model attributes read by ``column_dicts``, in sorted key order."""
+    return [getattr(model, name) for name in sorted(c.key for c in model.__table__.columns)]
+
+
+def row_dicts(model, rows) -> list[dict]:
+    """Turn ``list_columns(model)`` tuples into the same dicts ``to_dict()`` returns.
+
+    Only valid for models whose to_dict is every column with datetimes as
+    ISO strings (Trade, Watchlist). Keys come out already sorted, so the
+    sorted-keys JSON encoder has nothing to reorder.
+    """
+    columns = model.__table__.columns
+    names = sorted(c.key for c in columns)
+    datetimes = [n for n in names if isinstance(columns[n].type, db.DateTime)]
+
+    dicts = []
+    for row in rows:
+        d = dict(zip(names, row))
+        for name in datetimes:
+            value = d[name]
+            if value is not None:
+                d[name] = value.isoformat()
+        dicts.append(d)
+    return dicts
+
+
+def column_dicts(query, model) -> list[dict]:
+    """Run an ORM query as column tuples and return to_dict()-equivalent dicts.
+
+    Skips hydrating model instances, which dominates list endpoints.
+    """
+    return row_dicts(model, query.with_entities(*list_columns(model)).all())
@@ -0,0 +1,32 @@
+from datetime import datetime, timedelta, timezone
+from flask import Blueprint, jsonify, request
+from models import Catalyst
+from services import catalysts, data_version
+
+api_catalysts = Blueprint('api_catalysts', __name__)
+
+
+@api_catalysts.route('/')
+@data_version.conditional('catalysts', daily=True)
+def list_catalysts():
+    symbols = [s.strip().upper() for s in request.args.get('symbols', '').split(',') if s.strip()]
+    days = request.args.get('days', 7, type=int)
+    if days < 1:
+        return jsonify({'error': 'validation_error', 'message': 'days must be at least 1'}), 400
+
+    query = Catalyst.query.filter(Catalyst.event_date >= datetime.now(timezone.utc) - timedelta(days=days))
+    if symbols:
+        query = query.filter(Catalyst.symbol.in_(symbols))
+    items = [c.to_dict() for c in query.order_by(Catalyst.event_date.desc()).limit(500)]
+    return jsonify({
+        'data': items,
+        'message': f'{len(items)} catalysts'
+    })
+
+
+@api_catalysts.route('/ingest')
+def ingest_stats():
+    return jsonify({
+        'data': {'last_run': catalysts.last_run(), 'limiter': catalysts.get_limiter().stats()},
+        'message': 'Catalyst ingest stats; limiter is this worker\'s'
+    })
@@ -1,25 +1,62 @@
-from flask import Blueprint, jsonify, request
-from services.gap_scanner import scan_gaps as do_scan
+from datetime import datetime
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from services import gap_stats
+from services.gap_scanner import (
+    scan_gaps as do_scan, iter_scan_gaps, scan_history as do_history, get_flights, get_scan_cache
+)
 
 api_scanner = Blueprint('api_scanner', __name__)
 
 
+def _stream_frames(frames, fmt: str) -> Response:
+    """Stream scan frames as NDJSON lines or Server-Sent Events."""
+    dumps = current_app.json.dumps
+
+    def generate():
+        for frame in frames:
+            if fmt == 'sse':
+                yield f'event: {frame["type"]}\ndata: {dumps(frame["data"])}\n\n'
+            else:
+                yield dumps(frame) + '\n'
+
+    mimetype = 'text/event-stream' if fmt == 'sse' else 'application/x-ndjson'
+    return Response(stream_with_context(generate()), mimetype=mimetype, headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+
+def _parse_symbols():
+    """Parse comma-separated symbols, or None to use the defaults."""
+    symbols_str = request.args.get('symbols', '')
+    if not symbols_str.strip():
+        return None
+    return [s.strip().upper() for s in symbols_str.split(',') if s.strip()]
+
+
 @api_scanner.route('/gaps')
 def scan_gaps():
     min_gap = request.args.get('min_gap', 2.0, type=float)
     direction = request.args.get('direction', 'both')
-    symbols_str = request.args.get('symbols', '')
     date = request.args.get('date', None)
-
-    # Parse comma-separated symbols or use defaults
-    symbols = None
-    if symbols_str.strip():
-        symbols = [s.strip().upper() for s in symbols_str.split(',') if s.strip()]
+    symbols = _parse_symbols()
 
     if min_gap < 0:
         return jsonify({'error': 'validation_error', 'message': 'min_gap must be a positive number'}), 400
     if direction not in ('up', 'down', 'both'):
         return jsonify({'error': 'validation_error', 'message': 'direction must be "up", "down", or "both"'}), 400
+    if date:
+        try:
+            datetime.strptime(date, '%Y-%m-%d')
+        except ValueError:
+            return jsonify({'error': 'validation_error', 'message': 'date must be YYYY-MM-DD'}), 400
+
+    stream = request.args.get('stream')
+    if stream in ('ndjson', 'sse'):
+        frames = iter_scan_gaps(symbols=symbols, min_gap=min_gap, direction=direction, date=date)
+        return _stream_frames(frames, stream)
+    if stream:
+        return jsonify({'error': 'validation_error', 'message': 'stream must be "ndjson" or "sse"'}), 400
 
     result = do_scan(symbols=symbols, min_gap=min_gap, direction=direction, date=date)
 
@@ -27,3 +64,61 @@ def scan_gaps():
         'data': result,
         'message': f'Found {result["total_found"]} gaps'
     })
+
+
+@api_scanner.route('/history')
+def scan_history():
+    min_gap = request.args.get('min_gap', 2.0, type=float)
+    direction = request.args.get('direction', 'both')
+    start = request.args.get('start', None)
+    end = request.args.get('end', None)
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 500, type=int)
+    symbols = _parse_symbols()
+
+    if min_gap < 0:
+        return jsonify({'error': 'validation_error', 'message': 'min_gap must be a positive number'}), 400
+    if direction not in ('up', 'down', 'both'):
+        return jsonify({'error': 'validation_error', 'message': 'direction must be "up", "down", or "both"'}), 400
+    for name, value in (('start', start), ('end', end)):
+        if value:
+            try:
+                datetime.strptime(value, '%Y-%m-%d')
+            except ValueError:
+                return jsonify({'error': 'validation_error', 'message': f'{name} must be YYYY-MM-DD'}), 400
+    if start and end and start > end:
+        return jsonify({'error': 'validation_error', 'message': 'start must be before end'}), 400
+    if page < 1 or not 1 <= per_page <= 5000:
+        return jsonify({'error': 'validation_error', 'message': 'page must be >= 1 and per_page 1-5000'}), 400
+
+    result = do_history(symbols=symbols, start=start, end=end, min_gap=min_gap,
+                        direction=direction, page=page, per_page=per_page)
+
+    return jsonify({
+        'data': result,
+        'message': f'Found {result["total_found"]} gaps'
+    })
+
+
+@api_scanner.route('/cache')
+def cache_stats():
+    return jsonify({
+        'data': get_scan_cache().stats(),
+        'message': 'Scan cache stats'
+    })
+
+
+@api_scanner.route('/flights')
+def flight_stats():
+    return jsonify({
+        'data': get_flights().stats(),
+        'message': 'Scan coalescing stats for this worker'
+    })
+
+
+@api_scanner.route('/gap-stats')
+def gap_stats_info():
+    return jsonify({
+        'data': gap_stats.info(),
+        'message': 'Historical gap-fill statistics table'
+    })
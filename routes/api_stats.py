@@ -1,24 +1,47 @@
 from flask import Blueprint, jsonify, request
-from services.stats_service import get_summary, get_pnl_series, get_by_gap_type
+from services import data_version
+from services.stats_service import DIMENSIONS, PERIODS, get_summary, get_pnl_series, get_by_gap_type, get_breakdown
 
 api_stats = Blueprint('api_stats', __name__)
 
 
 @api_stats.route('/summary')
+@data_version.conditional('trades')
 def summary():
     data = get_summary()
     return jsonify({'data': data, 'message': 'Performance summary'})
 
 
 @api_stats.route('/pnl-series')
+@data_version.conditional('trades', daily=True)
 def pnl_series():
     period = request.args.get('period', 'daily')
     days = request.args.get('days', 30, type=int)
+    if period not in PERIODS:
+        return jsonify({'error': 'validation_error', 'message': f'period must be one of: {", ".join(PERIODS)}'}), 400
+    if days < 1:
+        return jsonify({'error': 'validation_error', 'message': 'days must be at least 1'}), 400
+
     data = get_pnl_series(period=period, days=days)
     return jsonify({'data': data, 'message': f'P&L series for {days} days'})
 
 
 @api_stats.route('/by-gap-type')
+@data_version.conditional('trades')
 def by_gap_type():
     data = get_by_gap_type()
     return jsonify({'data': data, 'message': 'Stats by gap type'})
+
+
+@api_stats.route('/breakdown')
+@data_version.conditional('trades')
+def breakdown():
+    dims = [d.strip() for d in request.args.get('dims', 'gap_type').split(',') if d.strip()]
+    unknown = [d for d in dims if d not in DIMENSIONS]
+    if unknown:
+        return jsonify({'error': 'validation_error', 'message': f'Unknown dims: {", ".join(unknown)}. '
+                                                                f'Valid dims: {", ".join(DIMENSIONS)}'}), 400
+
+    dims = list(dict.fromkeys(dims))
+    data = get_breakdown(dims)
+    return jsonify({'data': {'dims': dims, 'rows': data}, 'message': f'Breakdown by {", ".join(dims) or "nothing"}'})
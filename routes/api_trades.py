@@ -1,35 +1,55 @@
+import csv
 from datetime import datetime
-from flask import Blueprint, jsonify, request
-from models import db, Trade
-from services.trade_service import close_trade
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from models import db, column_dicts, Trade
+from services import catalysts, data_version, trade_io
+from services.trade_service import (
+    add_trade, cancel_trade, close_trade, close_trades, count_trades, remove_trade, trades_after, update_trades
+)
 
 api_trades = Blueprint('api_trades', __name__)
 
 
 @api_trades.route('/')
+@data_version.conditional('trades', 'catalysts')
 def list_trades():
     status = request.args.get('status', 'all')
     symbol = request.args.get('symbol')
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 50, type=int)
 
-    query = Trade.query
-    if status != 'all':
-        query = query.filter_by(status=status)
-    if symbol:
-        query = query.filter_by(symbol=symbol.upper())
+    query = _filtered_query(status, symbol)
 
-    query = query.order_by(Trade.entry_date.desc())
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    # Cursor mode: keyset pagination on (entry_date, id), no COUNT or OFFSET
+    if 'cursor' in request.args:
+        if not 1 <= per_page <= 500:
+            return jsonify({'error': 'validation_error', 'message': 'per_page must be between 1 and 500'}), 400
+        try:
+            trades, next_cursor = trades_after(query, request.args['cursor'], per_page)
+        except ValueError:
+            return jsonify({'error': 'validation_error', 'message': 'Invalid cursor'}), 400
+
+        catalysts.attach(trades, date_key='entry_date')
+        data = {'trades': trades, 'next_cursor': next_cursor, 'per_page': per_page}
+        if request.args.get('include_total', 'false').lower() == 'true':
+            data['total'] = count_trades(query, status, symbol)
+        return jsonify({'data': data, 'message': f'{len(trades)} trades returned'})
+
+    # Same clamping as paginate(error_out=False)
+    limit = per_page if per_page >= 1 else 20
+    offset = (max(page, 1) - 1) * limit
+    trades = column_dicts(query.order_by(Trade.entry_date.desc()).limit(limit).offset(offset), Trade)
+    catalysts.attach(trades, date_key='entry_date')
+    total = query.order_by(None).count()
 
     return jsonify({
         'data': {
-            'trades': [t.to_dict() for t in pagination.items],
-            'total': pagination.total,
+            'trades': trades,
+            'total': total,
             'page': page,
             'per_page': per_page
         },
-        'message': f'{len(pagination.items)} trades returned'
+        'message': f'{len(trades)} trades returned'
     })
 
 
@@ -71,7 +91,8 @@ def create_trade():
         notes=data.get('notes'),
         setup_rating=data.get('setup_rating')
     )
-    db.session.add(trade)
+    add_trade(trade)
+    data_version.bump('trades')
     db.session.commit()
 
     return jsonify({
@@ -80,6 +101,102 @@ def create_trade():
     }), 201
 
 
+@api_trades.route('/import', methods=['POST'])
+def import_trades():
+    fmt = request.args.get('format') or _format_from_mimetype(request.mimetype)
+    if fmt not in trade_io.FORMATS:
+        return jsonify({'error': 'validation_error', 'message': f'format must be one of: {", ".join(trade_io.FORMATS)}'}), 400
+    dry_run = request.args.get('dry_run', 'false').lower() == 'true'
+
+    try:
+        result = trade_io.import_trades(trade_io.read_rows(request.stream, fmt), dry_run=dry_run)
+    except (ValueError, KeyError, TypeError, csv.Error) as e:
+        db.session.rollback()
+        return jsonify({'error': 'validation_error', 'message': f'Could not parse {fmt} body: {e}'}), 400
+
+    verb = 'Validated' if dry_run else 'Imported'
+    return jsonify({
+        'data': result,
+        'message': f'{verb} {result["imported"]} trades, {result["failed"]} rows rejected'
+    }), 201 if result['imported'] and not dry_run else 200
+
+
+@api_trades.route('/export')
+def export_trades():
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'error': 'validation_error', 'message': 'format must be "csv" or "ndjson"'}), 400
+
+    query = _filtered_query(request.args.get('status', 'all'), request.args.get('symbol'))
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    return Response(stream_with_context(trade_io.export_rows(query, fmt)), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename=trades.{fmt}',
+    })
+
+
+def _filtered_query(status: str, symbol: str | None):
+    query = Trade.query
+    if status != 'all':
+        query = query.filter_by(status=status)
+    if symbol:
+        query = query.filter_by(symbol=symbol.upper())
+    return query
+
+
+def _format_from_mimetype(mimetype: str) -> str | None:
+    return {
+        'text/csv': 'csv',
+        'application/x-ndjson': 'ndjson',
+        'application/json': 'json',
+    }.get(mimetype)
+
+
+@api_trades.route('/batch', methods=['PUT'])
+def batch_update():
+    data = request.get_json(silent=True)
+    items = data.get('trades') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'validation_error', 'message': 'trades must be a non-empty list'}), 400
+    limit = current_app.config['TRADE_BATCH_MAX']
+    if len(items) > limit:
+        return jsonify({'error': 'validation_error', 'message': f'At most {limit} trades per batch'}), 400
+
+    to_close, to_update, errors = [], [], []
+    for item in items:
+        if not isinstance(item, dict) or not isinstance(item.get('id'), int):
+            errors.append({'id': item.get('id') if isinstance(item, dict) else None, 'error': 'id must be an integer'})
+            continue
+        if 'exit_price' in item:
+            try:
+                exit_price = float(item['exit_price'])
+                exit_date = datetime.fromisoformat(item['exit_date']) if item.get('exit_date') else None
+            except (TypeError, ValueError):
+                errors.append({'id': item['id'], 'error': 'exit_price must be a number and exit_date ISO format'})
+                continue
+            if exit_price <= 0:
+                errors.append({'id': item['id'], 'error': 'exit_price must be positive'})
+                continue
+            to_close.append({'id': item['id'], 'exit_price': exit_price, 'exit_date': exit_date})
+        to_update.append(item)
+
+    closed, close_errors = close_trades(to_close) if to_close else ([], [])
+    rejected = {error['id'] for error in close_errors}
+    updated = update_trades([item for item in to_update if item['id'] not in rejected])
+    if closed or updated:
+        data_version.bump('trades')
+    db.session.commit()
+
+    errors += close_errors
+    return jsonify({
+        'data': {
+            'closed': [{**row, 'exit_date': row['exit_date'].isoformat()} for row in closed],
+            'updated': updated,
+            'errors': errors
+        },
+        'message': f'Closed {len(closed)} trades, updated {updated}, {len(errors)} errors'
+    })
+
+
 @api_trades.route('/<int:trade_id>', methods=['PUT'])
 def update_trade(trade_id):
     trade = db.session.get(Trade, trade_id)
@@ -100,6 +217,7 @@ def update_trade(trade_id):
                 return jsonify({'error': 'validation_error', 'message': 'exit_date must be ISO format'}), 400
 
         close_trade(trade, float(data['exit_price']), exit_date)
+        data_version.bump('trades')
         db.session.commit()
         pnl_str = f'+${trade.pnl:.2f}' if trade.pnl >= 0 else f'-${abs(trade.pnl):.2f}'
         return jsonify({
@@ -112,9 +230,10 @@ def update_trade(trade_id):
         trade.notes = data['notes']
     if 'setup_rating' in data:
         trade.setup_rating = data['setup_rating']
-    if 'status' in data and data['status'] == 'cancelled':
-        trade.status = 'cancelled'
+    if 'status' in data and data['status'] == 'cancelled' and trade.status != 'cancelled':
+        cancel_trade(trade)
 
+    data_version.bump('trades')
     db.session.commit()
     return jsonify({
         'data': trade.to_dict(),
@@ -128,7 +247,8 @@ def delete_trade(trade_id):
     if not trade:
         return jsonify({'error': 'not_found', 'message': f'Trade {trade_id} not found'}), 404
 
-    db.session.delete(trade)
+    remove_trade(trade)
+    data_version.bump('trades')
     db.session.commit()
     return jsonify({
         'data': None,
@@ -1,18 +1,20 @@
 from flask import Blueprint, jsonify, request
-from models import db, Watchlist
+from models import db, column_dicts, Watchlist
+from services import data_version
 
 api_watchlist = Blueprint('api_watchlist', __name__)
 
 
 @api_watchlist.route('/')
+@data_version.conditional('watchlist')
 def list_watchlist():
     active_only = request.args.get('active_only', 'true').lower() == 'true'
     query = Watchlist.query
     if active_only:
         query = query.filter_by(is_active=True)
-    items = query.order_by(Watchlist.added_date.desc()).all()
+    items = column_dicts(query.order_by(Watchlist.added_date.desc()), Watchlist)
     return jsonify({
-        'data': [item.to_dict() for item in items],
+        'data': items,
         'message': f'{len(items)} watchlist items'
     })
 
@@ -36,6 +38,7 @@ def add_to_watchlist():
         sector=data.get('sector')
     )
     db.session.add(item)
+    data_version.bump('watchlist')
     db.session.commit()
 
     return jsonify({
@@ -63,6 +66,7 @@ def update_watchlist(item_id):
     if 'sector' in data:
         item.sector = data['sector']
 
+    data_version.bump('watchlist')
     db.session.commit()
     return jsonify({
         'data': item.to_dict(),
@@ -78,6 +82,7 @@ def delete_from_watchlist(item_id):
 
     symbol = item.symbol
     db.session.delete(item)
+    data_version.bump('watchlist')
     db.session.commit()
     return jsonify({
         'data': None,
@@ -2,6 +2,7 @@
 from datetime import datetime, timedelta, timezone
 from app import create_app
 from models import db, Watchlist, Trade
+from services import data_version, trade_aggregates
 
 app = create_app()
 
@@ -86,6 +87,8 @@ def seed():
 
             db.session.add(trade)
 
+        trade_aggregates.rebuild()
+        data_version.bump('trades', 'watchlist')
         db.session.commit()
         print(f'Seeded {len(SAMPLE_WATCHLIST)} watchlist items and {len(SAMPLE_TRADES)} trades')
 
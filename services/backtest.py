@@ -0,0 +1,269 @@
+"""Vectorized backtests of gap rules over daily bars.
+
+A rule enters at the open of every qualifying gap day and exits at the
+first of its stop, its target or the close ``hold_days`` sessions later.
+Every bar of every symbol lives in flat NumPy arrays, so each step of the
+holding period is one array operation over all open positions at once,
+however many symbols and years are tested.
+
+Results are trade dicts shaped like Trade rows: ``compute_pnl`` on their
+prices reproduces their pnl, and ``summary`` is what ``get_summary``
+would report if they were in the journal. ``sweep`` runs a grid of rules
+over the same bars on a process pool.
+"""
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+from flask import current_app
+from services.bar_store import get_store
+from services.stats_service import summarize
+from services.trade_service import compute_pnl_bulk
+
+RULE_DEFAULTS = {
+    'gap_type': 'gap_up',  # gap_up, gap_down or both
+    'min_gap': 3.0,  # |gap %| to enter
+    'max_gap': None,
+    'side': 'fade',  # fade: trade against the gap; follow: with it
+    'stop_pct': 1.0,  # % from entry, None for no stop
+    'target_pct': None,  # % from entry, None for no target
+    'hold_days': 0,  # 0 exits at the gap day's close
+    'quantity': 100,  # shares per trade, unless capital is set
+    'capital': None,  # dollars per trade; quantity = capital // entry price
+}
+
+# Bars shared with sweep worker processes, set once per process by _init_worker
+_worker_bars = None
+
+
+def validate_rule(rule: dict) -> dict:
+    """Return rule merged over RULE_DEFAULTS. Raises ValueError for unknown keys or bad values."""
+    unknown = set(rule) - set(RULE_DEFAULTS)
+    if unknown:
+        raise ValueError(f'Unknown rule keys: {", ".join(sorted(unknown))}')
+    rule = {**RULE_DEFAULTS, **rule}
+    if rule['gap_type'] not in ('gap_up', 'gap_down', 'both'):
+        raise ValueError('gap_type must be "gap_up", "gap_down" or "both"')
+    if rule['side'] not in ('fade', 'follow'):
+        raise ValueError('side must be "fade" or "follow"')
+    for name in ('min_gap', 'max_gap', 'stop_pct', 'target_pct', 'capital'):
+        if rule[name] is not None and rule[name] < 0:
+            raise ValueError(f'{name} must not be negative')
+    if rule['hold_days'] < 0 or rule['quantity'] < 1:
+        raise ValueError('hold_days must be >= 0 and quantity >= 1')
+    return rule
+
+
+def load_bars(symbols: list[str], start: date, end: date, hold_days: int = 0) -> dict:
+    """Sync and read bars for symbols into flat arrays for ``run``.
+
+    A week before start supplies the first previous close, and bars after
+    end (up to hold_days sessions, plus weekends) let late entries exit.
+    Returns {'symbols', 'seg', 'date', 'open', 'high', 'low', 'close', 'start', 'end', 'failed'}.
+    """
+    store = get_store()
+    lo, hi = start - timedelta(days=7), min(end + timedelta(days=hold_days * 2 + 7), date.today())
+    failed = store.sync(symbols, lo, hi)
+    bars_by_symbol = {s: store.read(s, lo, hi) for s in symbols if s not in failed}
+    return {**flatten(symbols, bars_by_symbol, start, end), 'failed': failed}
+
+
+def flatten(symbols: list[str], bars_by_symbol: dict, start: date, end: date) -> dict:
+    """Concatenate per-symbol bars into flat arrays, with each bar's symbol index in ``seg``."""
+    parts = [(i, bars_by_symbol.get(s)) for i, s in enumerate(symbols)]
+    parts = [(i, b) for i, b in parts if b is not None and len(b['date'])]
+    bars = {
+        'symbols': list(symbols),
+        'seg': np.repeat([i for i, _ in parts], [len(b['date']) for _, b in parts]).astype(np.intp),
+        'start': np.datetime64(start, 'D'),
+        'end': np.datetime64(end, 'D'),
+        'failed': {},
+    }
+    for name in ('date', 'open', 'high', 'low', 'close'):
+        bars[name] = np.concatenate([np.asarray(b[name]) for _, b in parts]) if parts else np.empty(0)
+    bars['date'] = bars['date'].astype('datetime64[D]')
+    return bars
+
+
+def run(rule: dict, bars: dict, with_trades: bool = True) -> dict:
+    """Simulate rule over bars from ``load_bars``. Returns {'rule', 'summary', 'trades'}."""
+    rule = validate_rule(rule)
+    dates, opens, highs, lows, closes, seg = (bars[n] for n in ('date', 'open', 'high', 'low', 'close', 'seg'))
+    n, hold = len(dates), rule['hold_days']
+
+    # Entries: gap days in [start, end] whose holding period is inside the symbol's bars
+    idx = np.arange(n)
+    same_prev = np.zeros(n, dtype=bool)
+    same_prev[1:] = seg[1:] == seg[:-1]
+    prev_close = np.full(n, np.nan)
+    prev_close[1:] = closes[:-1]
+    exit_idx = np.minimum(idx + hold, max(n - 1, 0))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        gap = (opens - prev_close) / prev_close * 100
+        ok = same_prev & (dates >= bars['start']) & (dates <= bars['end']) & np.isfinite(gap)
+        ok &= (idx + hold < n) & (seg[exit_idx] == seg) & np.isfinite(closes[exit_idx])
+        ok &= np.abs(gap) >= rule['min_gap']
+        if rule['max_gap'] is not None:
+            ok &= np.abs(gap) <= rule['max_gap']
+        if rule['gap_type'] != 'both':
+            ok &= (gap > 0) if rule['gap_type'] == 'gap_up' else (gap < 0)
+    entry_i = np.flatnonzero(ok)
+    entry_i = entry_i[np.lexsort((seg[entry_i], dates[entry_i]))]  # chronological, then symbol order
+    entry = _round2(opens[entry_i])
+    entry_i, entry = entry_i[entry > 0], entry[entry > 0]  # sub-cent opens can't be priced
+    up = gap[entry_i] > 0
+    short = up if rule['side'] == 'fade' else ~up
+
+    sign = np.where(short, -1.0, 1.0)  # +1 long, -1 short
+    stop = _round2(entry * (1 - sign * rule['stop_pct'] / 100)) if rule['stop_pct'] is not None else None
+    target = _round2(entry * (1 + sign * rule['target_pct'] / 100)) if rule['target_pct'] is not None else None
+
+    exit_price = np.full(len(entry_i), np.nan)
+    exit_k = np.full(len(entry_i), hold)
+    reason = np.full(len(entry_i), 'close', dtype=object)
+    open_ = np.ones(len(entry_i), dtype=bool)
+    for k in range(hold + 1):
+        j = entry_i + k
+        # A later session opening beyond a level fills at that open; the stop wins if both are touched
+        o, adverse, favorable = opens[j], np.where(short, highs[j], lows[j]), np.where(short, lows[j], highs[j])
+        if stop is not None:
+            hit = open_ & (sign * (adverse - stop) <= 0)
+            fill = np.where((k > 0) & (sign * (o - stop) <= 0), o, stop)
+            exit_price[hit], exit_k[hit], reason[hit] = fill[hit], k, 'stop'
+            open_ &= ~hit
+        if target is not None:
+            hit = open_ & (sign * (favorable - target) >= 0)
+            fill = np.where((k > 0) & (sign * (o - target) >= 0), o, target)
+            exit_price[hit], exit_k[hit], reason[hit] = fill[hit], k, 'target'
+            open_ &= ~hit
+    exit_price[open_] = closes[entry_i[open_] + hold]
+    exit_price = _round2(exit_price)
+
+    if rule['capital'] is not None:
+        quantity = np.maximum(np.floor(rule['capital'] / entry), 1).astype(np.int64)
+    else:
+        quantity = np.full(len(entry_i), rule['quantity'], dtype=np.int64)
+    directions = np.where(short, 'short', 'long')
+    pnls, pnl_percents = compute_pnl_bulk(directions, entry, exit_price, quantity)
+
+    exit_dates = dates[entry_i + exit_k]
+    result = {'rule': rule, 'summary': _summary(np.array(pnls), exit_dates)}
+    if with_trades:
+        result['trades'] = _records(
+            bars, rule, entry_i, up, directions, entry, exit_price, quantity, exit_dates, reason,
+            gap[entry_i], stop, target, pnls, pnl_percents
+        )
+    return result
+
+
+def backtest(rule: dict, symbols: list[str] = None, start: str = None, end: str = None) -> dict:
+    """Load bars for symbols (default: the scanner universe) and run rule over [start, end]."""
+    rule = validate_rule(rule)
+    symbols, start_date, end_date = _range(symbols, start, end)
+    bars = load_bars(symbols, start_date, end_date, rule['hold_days'])
+    return {**run(rule, bars), 'failed': _failures(bars['failed'])}
+
+
+def sweep(rule: dict, grid: dict, symbols: list[str] = None, start: str = None, end: str = None,
+          max_workers: int = None) -> dict:
+    """Run rule with every combination of the values in grid, in parallel processes.
+
+    Bars are loaded once and sent to each worker process once. Returns
+    {'runs': [{'params', 'summary'}], 'failed'} with runs ordered by total P&L.
+    """
+    combos = [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+    rules = [validate_rule({**rule, **combo}) for combo in combos]
+    symbols, start_date, end_date = _range(symbols, start, end)
+    bars = load_bars(symbols, start_date, end_date, max(r['hold_days'] for r in rules))
+
+    max_workers = max_workers or current_app.config['BACKTEST_WORKERS'] or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(rules)), initializer=_init_worker,
+                             initargs=(bars,)) as pool:
+        summaries = list(pool.map(_run_summary, rules))
+
+    runs = [{'params': combo, 'summary': summary} for combo, summary in zip(combos, summaries)]
+    runs.sort(key=lambda r: r['summary']['total_pnl'], reverse=True)
+    return {'runs': runs, 'failed': _failures(bars['failed'])}
+
+
+def _init_worker(bars: dict):
+    global _worker_bars
+    _worker_bars = bars
+
+
+def _run_summary(rule: dict) -> dict:
+    return run(rule, _worker_bars, with_trades=False)['summary']
+
+
+def _range(symbols, start, end) -> tuple[list[str], date, date]:
+    from services.symbols import DEFAULT_SYMBOLS
+
+    end_date = datetime.strptime(end, '%Y-%m-%d').date() if end else date.today()
+    start_date = (datetime.strptime(start, '%Y-%m-%d').date() if start
+                  else end_date - timedelta(days=365 * current_app.config['BACKTEST_YEARS']))
+    return list(dict.fromkeys(symbols)) if symbols else DEFAULT_SYMBOLS, start_date, end_date
+
+
+def _summary(pnls: np.ndarray, exit_dates: np.ndarray) -> dict:
+    """get_summary's metrics for closed trades given in entry order, via the same ``summarize``."""
+    won, lost = pnls > 0, pnls < 0
+    # Streaks run in close-date order, ties in entry order, like the journal's
+    decided = np.argsort(exit_dates, kind='stable')
+    outcome = won[decided][(won | lost)[decided]]
+    max_wins = max_losses = 0
+    if len(outcome):
+        starts = np.flatnonzero(np.r_[True, outcome[1:] != outcome[:-1]])
+        lengths = np.diff(np.r_[starts, len(outcome)])
+        run_won = outcome[starts]
+        max_wins = int(lengths[run_won].max(initial=0))
+        max_losses = int(lengths[~run_won].max(initial=0))
+
+    agg = SimpleNamespace(
+        trade_count=len(pnls), open_count=0, closed_count=len(pnls), pnl_count=len(pnls),
+        total_pnl=float(pnls.sum()), winner_count=int(won.sum()), loser_count=int(lost.sum()),
+        total_wins=float(pnls[won].sum()), total_losses=float(pnls[lost].sum()),
+        best_pnl=float(pnls.max()) if len(pnls) else None, worst_pnl=float(pnls.min()) if len(pnls) else None,
+        max_wins=max_wins, max_losses=max_losses,
+    )
+    return summarize(agg)
+
+
+def _records(bars, rule, entry_i, up, directions, entry, exit_price, quantity, exit_dates, reason,
+             gap, stop, target, pnls, pnl_percents) -> list[dict]:
+    """Trade dicts with the Trade columns a journal entry would have."""
+    symbols = np.asarray(bars['symbols'], dtype=object)[bars['seg'][entry_i]]
+    columns = zip(
+        symbols.tolist(), directions.tolist(), entry.tolist(), exit_price.tolist(), quantity.tolist(),
+        _isoformat(bars['date'][entry_i]), _isoformat(exit_dates), up.tolist(), _round2(gap).tolist(),
+        stop.tolist() if stop is not None else itertools.repeat(None),
+        target.tolist() if target is not None else itertools.repeat(None),
+        reason.tolist(), pnls, pnl_percents,
+    )
+    return [
+        {
+            'symbol': symbol, 'direction': direction, 'entry_price': entry_price, 'exit_price': exit_,
+            'quantity': qty, 'entry_date': entered, 'exit_date': exited, 'status': 'closed',
+            'gap_type': 'gap_up' if is_up else 'gap_down', 'gap_percent': gap_percent,
+            'stop_loss': stop_loss, 'take_profit': take_profit, 'exit_reason': why,
+            'pnl': pnl, 'pnl_percent': pnl_percent, 'source': 'backtest',
+        }
+        for (symbol, direction, entry_price, exit_, qty, entered, exited, is_up, gap_percent,
+             stop_loss, take_profit, why, pnl, pnl_percent) in columns
+    ]
+
+
+def _isoformat(days: np.ndarray) -> list[str]:
+    """Midnight datetimes as ``datetime.isoformat`` writes them, like Trade.to_dict's dates."""
+    return [f'{day}T00:00:00' for day in np.datetime_as_string(days, unit='D').tolist()]
+
+
+def _round2(values: np.ndarray) -> np.ndarray:
+    """Round to cents with Python's ``round``, as prices entered in the journal are."""
+    return np.array([round(v, 2) for v in values.tolist()], dtype=np.float64)
+
+
+def _failures(failed: dict) -> list[dict]:
+    return [{'symbol': symbol, 'error': error} for symbol, error in failed.items()]
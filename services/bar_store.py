@@ -0,0 +1,312 @@
+"""On-disk daily OHLCV bar store.
+
+Each symbol is stored as a single ``.npy`` file holding a (column x bar)
+float64 matrix, so every column is contiguous and the file can be
+memory-mapped. A small JSON sidecar records which date range has been
+fetched, which lets the scanner top up only the bars it is missing.
+Writes hold a per-symbol file lock, so pool threads, other workers and the
+CLI can sync the same symbol at once without dropping each other's bars.
+"""
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
+from contextlib import contextmanager
+from datetime import date, datetime, time as dtime, timedelta
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from flask import current_app
+from services.market_data import BAR_COLUMNS as COLUMNS, empty_bars, get_provider
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, fine for a single dev server
+    fcntl = None
+
+# Regular US equity session; a daily bar is final once its session has closed
+MARKET_TZ = ZoneInfo('America/New_York')
+SESSION_OPEN = dtime(9, 30)
+SESSION_CLOSE = dtime(16, 0)
+
+_COL = {name: i for i, name in enumerate(COLUMNS)}
+
+_SYMBOL_RE = re.compile(r'^[A-Z0-9.\-^=]{1,15}$')
+
+_stores = {}
+
+
+def get_store() -> 'BarStore':
+    """Return the bar store for the current app and market data provider.
+
+    Each provider gets its own subdirectory so replayed and live bars
+    never mix.
+    """
+    provider = get_provider()
+    root = os.path.join(current_app.config['BAR_STORE_DIR'], provider.name)
+    store = _stores.get(root)
+    if store is None:
+        config = current_app.config
+        store = BarStore(
+            root, provider,
+            live_ttl=config['BAR_STORE_LIVE_TTL'],
+            chunk_size=config['SCAN_CHUNK_SIZE'],
+            max_workers=config['SCAN_MAX_WORKERS'],
+            retries=config['SCAN_CHUNK_RETRIES'],
+            timeout=config['SCAN_CHUNK_TIMEOUT'],
+        )
+        _stores[root] = store
+    return store
+
+
+def _to_day(d: date) -> int:
+    return int(np.datetime64(d, 'D').astype(np.int64))
+
+
+def _settled_through(at: datetime) -> date:
+    """The last day whose session had closed at ``at``; its bars and all earlier ones are final."""
+    at = at.astimezone(MARKET_TZ)
+    if at.weekday() < 5 and at.time() < SESSION_CLOSE:
+        return at.date() - timedelta(days=1)
+    return at.date()
+
+
+def _in_session(at: datetime) -> bool:
+    """Whether a regular session is under way at ``at`` (holidays count as sessions)."""
+    at = at.astimezone(MARKET_TZ)
+    return at.weekday() < 5 and SESSION_OPEN <= at.time() < SESSION_CLOSE
+
+
+class BarStore:
+    """Per-symbol, column-oriented store of daily bars."""
+
+    def __init__(self, root: str, provider, live_ttl: int = 60, chunk_size: int = 200,
+                 max_workers: int = 4, retries: int = 2, timeout: float = 30):
+        self.root = root
+        self.provider = provider
+        self.live_ttl = live_ttl
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.retries = retries
+        self.timeout = timeout
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, symbol: str, ext: str) -> str:
+        if not _SYMBOL_RE.match(symbol):
+            raise ValueError(f'Invalid symbol: {symbol!r}')
+        return os.path.join(self.root, f'{symbol}.{ext}')
+
+    def _data_path(self, symbol: str) -> str:
+        return self._path(symbol, 'npy')
+
+    def _meta_path(self, symbol: str) -> str:
+        return self._path(symbol, 'json')
+
+    @contextmanager
+    def _locked(self, symbol: str):
+        with open(self._path(symbol, 'lock'), 'w') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def coverage(self, symbol: str) -> dict | None:
+        """Return the fetched date range for a symbol, or None if never fetched."""
+        path = self._meta_path(symbol)
+        try:
+            with open(path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return {
+            'first': date.fromisoformat(meta['first']),
+            'last': date.fromisoformat(meta['last']),
+            'synced_at': meta['synced_at'],
+        }
+
+    def read(self, symbol: str, start: date = None, end: date = None) -> dict | None:
+        """Read bars for a symbol within [start, end] as a dict of column arrays.
+
+        Price columns are memory-mapped views; ``date`` is datetime64[D].
+        """
+        path = self._data_path(symbol)
+        try:
+            # Plain ndarray view over the mapping; slicing np.memmap is slow
+            matrix = np.asarray(np.load(path, mmap_mode='r'))
+        except (OSError, ValueError):
+            return None
+
+        days = matrix[_COL['date']]
+        lo = np.searchsorted(days, _to_day(start)) if start else 0
+        hi = np.searchsorted(days, _to_day(end), side='right') if end else len(days)
+
+        bars = {name: matrix[i, lo:hi] for i, name in enumerate(COLUMNS)}
+        bars['date'] = bars['date'].astype(np.int64).astype('datetime64[D]')
+        return bars
+
+    def write(self, symbol: str, bars: dict, start: date, end: date):
+        """Merge fetched bars for [start, end] into the store.
+
+        Fetched bars replace stored bars on the same date. The stored bars
+        and coverage are read under the symbol's lock, so a concurrent write
+        is merged in rather than overwritten.
+        """
+        new = np.vstack([np.asarray(bars[name], dtype=np.float64) for name in COLUMNS])
+        with self._locked(symbol):
+            try:
+                old = np.load(self._data_path(symbol))
+            except (OSError, ValueError):
+                old = np.empty((len(COLUMNS), 0))
+
+            keep = ~np.isin(old[_COL['date']], new[_COL['date']])
+            merged = np.hstack([old[:, keep], new])
+            merged = merged[:, np.argsort(merged[_COL['date']], kind='stable')]
+
+            _atomic_save(self._data_path(symbol), lambda f: np.save(f, merged))
+
+            meta = self.coverage(symbol)
+            if meta is None:
+                meta = {'first': start, 'last': end, 'synced_at': time.time()}
+            else:
+                # Only a fetch reaching the stored tail refreshes possibly-partial bars
+                if end >= meta['last']:
+                    meta['synced_at'] = time.time()
+                meta['first'] = min(meta['first'], start)
+                meta['last'] = max(meta['last'], end)
+
+            payload = json.dumps({
+                'first': meta['first'].isoformat(),
+                'last': meta['last'].isoformat(),
+                'synced_at': meta['synced_at'],
+            })
+            _atomic_save(self._meta_path(symbol), lambda f: f.write(payload.encode()))
+
+    def missing_range(self, symbol: str, start: date, end: date,
+                      now: datetime = None) -> tuple[date, date] | None:
+        """Return the (start, end) range that must be fetched for a symbol, if any.
+
+        Bars synced before their session closed may be partial. While a
+        session is under way they are refetched once the live TTL expires,
+        and once after the close; coverage synced after the close (or on a
+        weekend) is final and never refetched.
+        """
+        now = now or datetime.now(MARKET_TZ)
+        end = min(end, now.astimezone(MARKET_TZ).date())
+        meta = self.coverage(symbol)
+        if meta is None:
+            return start, end
+
+        synced_at = datetime.fromtimestamp(meta['synced_at'], MARKET_TZ)
+        stable = min(meta['last'], _settled_through(synced_at))
+
+        live_fresh = (
+            end <= meta['last']
+            and _in_session(now)
+            and _in_session(synced_at)
+            and now.timestamp() - meta['synced_at'] < self.live_ttl
+        )
+        need_head = start < meta['first']
+        need_tail = end > stable and not live_fresh
+        if not need_head and not need_tail:
+            return None
+
+        lo = start if need_head else stable + timedelta(days=1)
+        hi = end if need_tail else meta['first'] - timedelta(days=1)
+        return lo, hi
+
+    def sync(self, symbols: list[str], start: date, end: date) -> dict:
+        """Fetch and store any bars missing for symbols within [start, end].
+
+        Returns {symbol: error message} for symbols that could not be fetched.
+        """
+        failed = {}
+        for _, errors in self.iter_sync(symbols, start, end):
+            failed.update(errors)
+        return failed
+
+    def iter_sync(self, symbols: list[str], start: date, end: date):
+        """Sync symbols chunk by chunk, yielding (chunk, errors) as each is ready.
+
+        Symbols already up to date are yielded first. The rest are split
+        into chunks of chunk_size and fetched through a bounded worker pool.
+        Each chunk is retried on failure and written to the store as soon as
+        it completes, so one bad chunk or ticker does not fail the others.
+        Chunks still running when the pool's time budget runs out are
+        reported as failed instead of holding up the sync.
+        """
+        ready, invalid, groups = [], {}, {}
+        for symbol in symbols:
+            try:
+                rng = self.missing_range(symbol, start, end)
+            except ValueError as e:
+                invalid[symbol] = str(e)
+                continue
+            if rng is None:
+                ready.append(symbol)
+            else:
+                groups.setdefault(rng, []).append(symbol)
+
+        if invalid:
+            yield [], invalid
+        for i in range(0, len(ready), self.chunk_size):
+            yield ready[i:i + self.chunk_size], {}
+
+        jobs = [
+            (group[i:i + self.chunk_size], lo, hi)
+            for (lo, hi), group in groups.items()
+            for i in range(0, len(group), self.chunk_size)
+        ]
+        if not jobs:
+            return
+
+        # Each chunk gets retries + 1 attempts plus backoff, and the pool runs the
+        # chunks in ceil(jobs / max_workers) waves. Providers enforce timeout per
+        # attempt themselves; twice that is the backstop for one that hangs anyway.
+        per_chunk = (self.retries + 1) * 2 * self.timeout + sum(0.5 * 2 ** a for a in range(self.retries))
+        budget = -(-len(jobs) // self.max_workers) * per_chunk
+        pool = ThreadPoolExecutor(max_workers=min(self.max_workers, len(jobs)))
+        futures = {pool.submit(self._sync_chunk, *job): job[0] for job in jobs}
+        try:
+            try:
+                for future in as_completed(futures, timeout=budget):
+                    chunk = futures.pop(future)
+                    yield chunk, _chunk_errors(future, chunk)
+            except TimeoutError:
+                for future, chunk in futures.items():
+                    if future.done():
+                        yield chunk, _chunk_errors(future, chunk)
+                    else:
+                        yield chunk, {symbol: f'Timed out after {budget:g}s' for symbol in chunk}
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)  # don't wait on hung fetches
+
+    def _sync_chunk(self, chunk: list[str], lo: date, hi: date) -> dict:
+        """Fetch one chunk with retries and write it. Returns per-symbol errors."""
+        for attempt in range(self.retries + 1):
+            try:
+                fetched, errors = self.provider.get_bars(chunk, lo, hi, timeout=self.timeout)
+                break
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                time.sleep(0.5 * 2 ** attempt)
+
+        for symbol in chunk:
+            if symbol not in errors:
+                self.write(symbol, fetched.get(symbol, empty_bars()), lo, hi)
+        return errors
+
+
+def _chunk_errors(future, chunk: list[str]) -> dict:
+    try:
+        return future.result()
+    except Exception as e:
+        return {symbol: str(e) for symbol in chunk}
+
+
+def _atomic_save(path: str, write):
+    tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp, 'wb') as f:
+        write(f)
+    os.replace(tmp, path)
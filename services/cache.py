@@ -0,0 +1,444 @@
+"""Caches with TTL expiry, size-based eviction and hit/miss counters.
+
+``LRUCache`` lives in one process. ``SQLiteCache`` (a file shared by every
+worker on the host) and ``RedisCache`` (any Redis-protocol server) are
+shared between workers, so a gunicorn restart or a second worker does not
+start cold. ``make_cache`` picks the backend from CACHE_BACKEND; all three
+expose get/set/add/delete/clear/stats.
+
+Shared backends pickle their values, so the cache file or server must be
+as trusted as the app itself. Backend errors are logged and treated as
+misses: a broken cache slows requests down but never fails them.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def make_cache(namespace: str, maxsize: int, pinned: bool = False):
+    """Return a cache for namespace on the configured CACHE_BACKEND.
+
+    ``pinned`` entries are exempt from the SQLite backend's shared byte
+    budget, for small namespaces whose entries must live out their TTL.
+    """
+    config = current_app.config
+    backend = config['CACHE_BACKEND']
+    if backend == 'memory':
+        return LRUCache(maxsize=maxsize)
+    if backend == 'sqlite':
+        return SQLiteCache(config['CACHE_PATH'], namespace, maxsize=maxsize, max_bytes=config['CACHE_MAX_BYTES'],
+                           pinned=pinned)
+    if backend == 'redis':
+        return RedisCache(config['CACHE_REDIS_URL'], namespace)
+    raise ValueError(f'Unknown CACHE_BACKEND: {backend!r}')
+
+
+class LRUCache:
+    """A size-bounded LRU cache whose entries may carry a TTL.
+
+    Entries stored with ``ttl=None`` never expire and only leave the cache
+    through LRU eviction.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self._data = OrderedDict()  # key -> (expires_at | None, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl: float = None):
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def add(self, key, value, ttl: float = None) -> bool:
+        """Set key only if it is absent or expired. Returns True if it was set."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and (entry[0] is None or entry[0] > time.monotonic()):
+                return False
+        self.set(key, value, ttl)
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups * 100, 1) if lookups else 0,
+            }
+
+
+class _SharedStats:
+    """Hit/miss and backend error counters kept by this process for a shared cache.
+
+    ``errors`` counts failed backend calls, which callers otherwise only see
+    as misses or refused writes.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def counters(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'errors': self.errors,
+            'hit_rate': round(self.hits / lookups * 100, 1) if lookups else 0,
+        }
+
+
+def _digest(key) -> str:
+    """Stable cross-process key; ``hash()`` is salted per process."""
+    return hashlib.sha1(repr(key).encode()).hexdigest()
+
+
+class SQLiteCache(_SharedStats):
+    """A cache namespace in a SQLite file shared by every worker on the host.
+
+    Each namespace keeps at most ``maxsize`` entries and the whole file at
+    most ``max_bytes`` of values; the least recently read entries go first.
+    Entries written with ``pinned`` neither count toward nor are evicted for
+    ``max_bytes``. Expiry uses wall-clock time so all processes agree on it.
+    """
+
+    def __init__(self, path: str, namespace: str, maxsize: int = 128, max_bytes: int = 256 * 2**20,
+                 pinned: bool = False):
+        super().__init__()
+        self.path = path
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.pinned = pinned
+        self._local = threading.local()
+
+    def get(self, key, default=None):
+        now = time.time()
+        try:
+            db = self._db()
+            digest = _digest(key)
+            row = db.execute(
+                'SELECT value, expires_at, accessed_at FROM cache_entries WHERE namespace = ? AND key = ?',
+                (self.namespace, digest)
+            ).fetchone()
+            if row is not None and (row[1] is None or row[1] > now):
+                if now - row[2] > 1:  # recency only needs to be roughly right; spare the write lock
+                    with db:
+                        db.execute('UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?',
+                                   (now, self.namespace, digest))
+                self.hits += 1
+                return pickle.loads(row[0])
+        except (sqlite3.Error, pickle.UnpicklingError) as e:
+            logger.warning('Shared cache read failed: %s', e)
+            self.errors += 1
+        self.misses += 1
+        return default
+
+    def set(self, key, value, ttl: float = None):
+        self._write('INSERT OR REPLACE', key, value, ttl)
+
+    def add(self, key, value, ttl: float = None) -> bool:
+        """Set key only if it is absent or expired, atomically across processes."""
+        return self._write('INSERT OR IGNORE', key, value, ttl)
+
+    def delete(self, key):
+        try:
+            with self._db() as db:
+                db.execute('DELETE FROM cache_entries WHERE namespace = ? AND key = ?', (self.namespace, _digest(key)))
+        except sqlite3.Error as e:
+            logger.warning('Shared cache write failed: %s', e)
+            self.errors += 1
+
+    def clear(self):
+        try:
+            with self._db() as db:
+                db.execute('DELETE FROM cache_entries WHERE namespace = ?', (self.namespace,))
+        except sqlite3.Error as e:
+            logger.warning('Shared cache write failed: %s', e)
+            self.errors += 1
+
+    def stats(self) -> dict:
+        try:
+            size, nbytes = self._db().execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries WHERE namespace = ?', (self.namespace,)
+            ).fetchone()
+        except sqlite3.Error:
+            size = nbytes = None
+        return {'backend': 'sqlite', 'size': size, 'maxsize': self.maxsize, 'bytes': nbytes, **self.counters()}
+
+    def _write(self, verb: str, key, value, ttl: float | None) -> bool:
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        digest = _digest(key)
+        try:
+            with self._db() as db:
+                db.execute('BEGIN IMMEDIATE')
+                now = time.time()  # once the write lock is held, so a TTL runs from when the write lands
+                db.execute('DELETE FROM cache_entries WHERE namespace = ? AND key = ? AND expires_at <= ?',
+                           (self.namespace, digest, now))
+                cursor = db.execute(
+                    f'{verb} INTO cache_entries (namespace, key, value, size, expires_at, accessed_at, pinned) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (self.namespace, digest, blob, len(blob), now + ttl if ttl is not None else None, now,
+                     self.pinned)
+                )
+                if cursor.rowcount:
+                    self._evict(db, now)
+                return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            logger.warning('Shared cache write failed: %s', e)
+            self.errors += 1
+            return False
+
+    def _evict(self, db, now: float):
+        evicted = db.execute('DELETE FROM cache_entries WHERE expires_at <= ?', (now,)).rowcount
+        evicted += db.execute(
+            'DELETE FROM cache_entries WHERE namespace = ? AND id NOT IN ('
+            'SELECT id FROM cache_entries WHERE namespace = ? ORDER BY accessed_at DESC LIMIT ?)',
+            (self.namespace, self.namespace, self.maxsize)
+        ).rowcount
+
+        total = db.execute('SELECT COALESCE(SUM(size), 0) FROM cache_entries WHERE NOT pinned').fetchone()[0]
+        if total > self.max_bytes:
+            doomed = []
+            unpinned = db.execute('SELECT id, size FROM cache_entries WHERE NOT pinned ORDER BY accessed_at')
+            for entry_id, size in unpinned:
+                if total <= self.max_bytes:
+                    break
+                doomed.append((entry_id,))
+                total -= size
+            db.executemany('DELETE FROM cache_entries WHERE id = ?', doomed)
+            evicted += len(doomed)
+        self.evictions += evicted
+
+    def _db(self) -> sqlite3.Connection:
+        """Per-thread connection, reopened after a fork."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5)
+            # Switching a new file to WAL skips the busy timeout, so workers starting together retry it
+            for attempt in range(100):
+                try:
+                    conn.execute('PRAGMA journal_mode=WAL')
+                    break
+                except sqlite3.OperationalError:
+                    if attempt == 99:
+                        raise
+                    time.sleep(0.01)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    id INTEGER PRIMARY KEY,
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL,
+                    accessed_at REAL NOT NULL,
+                    pinned INTEGER NOT NULL DEFAULT 0,
+                    UNIQUE (namespace, key)
+                );
+                CREATE INDEX IF NOT EXISTS ix_cache_entries_accessed_at ON cache_entries (accessed_at);
+            """)
+            if 'pinned' not in {row[1] for row in conn.execute('PRAGMA table_info(cache_entries)')}:
+                try:  # a cache file from before pinned entries
+                    conn.execute('ALTER TABLE cache_entries ADD COLUMN pinned INTEGER NOT NULL DEFAULT 0')
+                except sqlite3.OperationalError as e:
+                    if 'duplicate column' not in str(e):  # another worker added it first
+                        raise
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+
+class RedisError(Exception):
+    """An error reply from a Redis-protocol server."""
+
+
+class RedisCache(_SharedStats):
+    """A cache namespace on a Redis-protocol server (Redis, Valkey, KeyDB...).
+
+    Speaks just enough RESP for GET/SET/DEL/SCAN, so there is no client
+    library to install. TTLs map to PX; size-based eviction is the
+    server's job (``maxmemory`` with ``maxmemory-policy allkeys-lru``).
+    """
+
+    def __init__(self, url: str, namespace: str, timeout: float = 2.0):
+        super().__init__()
+        parsed = urlparse(url)
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.timeout = timeout
+        self.namespace = namespace
+        self.prefix = f'gapcache:{namespace}:'
+        self._local = threading.local()
+        self._down_until = 0.0  # skip the server for a while after a failed connect
+
+    def get(self, key, default=None):
+        try:
+            blob = self.execute('GET', self.prefix + _digest(key))
+            if blob is not None:
+                self.hits += 1
+                return pickle.loads(blob)
+        except (OSError, RedisError, pickle.UnpicklingError) as e:
+            logger.warning('Shared cache read failed: %s', e)
+            self.errors += 1
+        self.misses += 1
+        return default
+
+    def set(self, key, value, ttl: float = None):
+        self._set(key, value, ttl)
+
+    def add(self, key, value, ttl: float = None) -> bool:
+        """Set key only if it is absent (SET NX). Returns True if it was set."""
+        return self._set(key, value, ttl, 'NX')
+
+    def delete(self, key):
+        try:
+            self.execute('DEL', self.prefix + _digest(key))
+        except (OSError, RedisError) as e:
+            logger.warning('Shared cache write failed: %s', e)
+            self.errors += 1
+
+    def clear(self):
+        try:
+            cursor = '0'
+            while True:
+                cursor, keys = self.execute('SCAN', cursor, 'MATCH', self.prefix + '*', 'COUNT', 500)
+                if keys:
+                    self.execute('DEL', *keys)
+                if cursor in (b'0', '0'):
+                    break
+        except (OSError, RedisError) as e:
+            logger.warning('Shared cache write failed: %s', e)
+            self.errors += 1
+
+    def stats(self) -> dict:
+        return {'backend': 'redis', 'size': None, 'maxsize': None, 'bytes': None, **self.counters()}
+
+    def execute(self, *args):
+        """Send one command and return its decoded reply, reconnecting once on a dropped connection."""
+        for attempt in (0, 1):
+            try:
+                sock, reader = self._connection()
+                sock.sendall(_encode(args))
+                return _read_reply(reader)
+            except (OSError, EOFError):
+                self._local.conn = None
+                if attempt:
+                    raise
+        return None
+
+    def _set(self, key, value, ttl: float | None, *flags) -> bool:
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        args = ['SET', self.prefix + _digest(key), blob]
+        if ttl is not None:
+            args += ['PX', max(int(ttl * 1000), 1)]
+        try:
+            return self.execute(*args, *flags) is not None
+        except (OSError, RedisError) as e:
+            logger.warning('Shared cache write failed: %s', e)
+            self.errors += 1
+            return False
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            if time.monotonic() < self._down_until:
+                raise ConnectionError('cache server unavailable')
+            try:
+                sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            except OSError:
+                self._down_until = time.monotonic() + 5
+                raise
+            conn = (sock, sock.makefile('rb'))
+            self._local.conn, self._local.pid = conn, os.getpid()
+            if self.password:
+                self.execute('AUTH', self.password)
+            if self.db:
+                self.execute('SELECT', self.db)
+        return conn
+
+
+def _encode(args) -> bytes:
+    out = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode()
+        out.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+    return b''.join(out)
+
+
+def _read_reply(reader):
+    line = reader.readline()
+    if not line.endswith(b'\r\n'):
+        raise EOFError('connection closed')
+    kind, body = line[:1], line[1:-2]
+    if kind == b'+':
+        return body.decode()
+    if kind == b'-':
+        raise RedisError(body.decode())
+    if kind == b':':
+        return int(body)
+    if kind == b'$':
+        length = int(body)
+        if length < 0:
+            return None
+        data = reader.read(length + 2)
+        if len(data) != length + 2:
+            raise EOFError('connection closed')
+        return data[:-2]
+    if kind == b'*':
+        length = int(body)
+        return None if length < 0 else [_read_reply(reader) for _ in range(length)]
+    raise RedisError(f'unexpected reply: {line!r}')
@@ -0,0 +1,366 @@
+"""Catalyst ingestion from Finnhub: company news, earnings dates and SEC filings.
+
+Symbols come from the current gap scan and the active watchlist. The
+earnings calendar is fetched once for the whole batch; news and filings
+take one call per symbol. Every call takes a slot of a ``SharedQuota`` of
+FINNHUB_CALLS_PER_MINUTE kept in the shared cache backend, so all workers
+and CLI runs together stay within the quota. Responses are kept in the
+shared cache for FINNHUB_CACHE_TTL seconds, so a rerun within the TTL (by
+any worker) costs no quota. Rows are keyed by (symbol, source,
+external_id) and bulk-upserted, so re-fetched items update their row
+instead of adding duplicates. The url and summary in ``raw_data`` are
+copied into columns at ingest, so readers never parse the JSON.
+
+``attach`` adds the top-scored catalysts to gap and trade rows with one
+query on the (symbol, event_date) index, however many rows there are.
+"""
+import json
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+
+import finnhub
+from flask import current_app
+from sqlalchemy import and_, insert, or_, select, update
+
+from models import db, Catalyst, Watchlist
+from services import data_version
+from services.cache import make_cache
+from services.rate_limit import SharedQuota
+
+# Base catalyst_score by type, and by form for filings; offerings move a stock most
+TYPE_SCORES = {'earnings': 70, 'news': 40, 'filing': 30}
+FORM_SCORES = {'8-K': 60, 'S-1': 75, 'S-3': 75, '424B4': 75, '424B5': 75, 'SC 13D': 55, 'SC 13G': 45}
+
+# Columns returned with attached catalysts (summaries are left to /api/catalysts)
+ATTACH_COLUMNS = (
+    Catalyst.id, Catalyst.symbol, Catalyst.catalyst_type, Catalyst.headline, Catalyst.source, Catalyst.url,
+    Catalyst.event_date, Catalyst.catalyst_score, Catalyst.sentiment_score,
+)
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+# Finnhub responses and the last run's metrics, shared by all workers
+_responses = None
+_runs = None
+
+# One finnhub.Client (and HTTP session) per fetch thread
+_local = threading.local()
+
+
+def ingest_symbols(min_gap: float = None) -> list[str]:
+    """Symbols gapping at least CATALYST_MIN_GAP in today's default scan, then the active watchlist."""
+    from services import gap_scanner
+
+    if min_gap is None:
+        min_gap = current_app.config['CATALYST_MIN_GAP']
+    scan = gap_scanner.scan_gaps(min_gap=min_gap)
+    watched = [s for (s,) in db.session.query(Watchlist.symbol).filter(Watchlist.is_active.is_(True))]
+    return list(dict.fromkeys([g['symbol'] for g in scan['gaps']] + watched))
+
+
+def ingest(symbols: list[str], today: date = None) -> dict:
+    """Fetch catalysts for symbols and upsert them. Returns run metrics."""
+    config = current_app.config
+    started = time.perf_counter()
+    symbols = list(dict.fromkeys(s.strip().upper() for s in symbols if s.strip()))
+    today = today or datetime.now(timezone.utc).date()
+    since = (today - timedelta(days=config['CATALYST_NEWS_DAYS'])).isoformat()
+    until = (today + timedelta(days=config['CATALYST_EARNINGS_DAYS'])).isoformat()
+
+    calls = [(None, 'earnings_calendar', {'_from': since, 'to': until, 'symbol': ''})]
+    for symbol in symbols:
+        calls.append((symbol, 'company_news', {'symbol': symbol, '_from': since, 'to': today.isoformat()}))
+        calls.append((symbol, 'filings', {'symbol': symbol, '_from': since, 'to': today.isoformat()}))
+
+    limiter, cache = get_limiter(), _get_responses()
+    limiter_before = limiter.acquired
+    fetch = _fetcher(config['FINNHUB_API_KEY'], config['FINNHUB_BASE_URL'], limiter, cache, config['FINNHUB_CACHE_TTL'])
+    with ThreadPoolExecutor(max_workers=config['FINNHUB_WORKERS']) as pool:
+        results = list(pool.map(lambda call: fetch(call[1], call[2]), calls))
+
+    rows, errors, cached = [], [], 0
+    wanted = set(symbols)
+    for (symbol, method, _), (payload, hit, error) in zip(calls, results):
+        cached += hit
+        if error is not None:
+            errors.append({'symbol': symbol, 'endpoint': method, 'error': error})
+        elif method == 'earnings_calendar':
+            rows.extend(_earnings_rows(payload, wanted))
+        elif method == 'company_news':
+            rows.extend(_news_rows(symbol, payload))
+        else:
+            rows.extend(_filing_rows(symbol, payload))
+
+    inserted, updated = upsert(rows)
+    run = {
+        'symbols': len(symbols),
+        'requests': len(calls),
+        'cached': cached,
+        'fetched': limiter.acquired - limiter_before,
+        'errors': errors[:50],
+        'error_count': len(errors),
+        'rows': len(rows),
+        'inserted': inserted,
+        'updated': updated,
+        'elapsed_s': round(time.perf_counter() - started, 2),
+        'finished_at': time.time(),
+        'limiter': limiter.stats(),
+    }
+    _get_runs().set('last', run)
+    return run
+
+
+def upsert(rows: list[dict]) -> tuple[int, int]:
+    """Insert new catalysts and update known ones in bulk. Returns (inserted, updated).
+
+    Rows are keyed by (symbol, source, external_id); the last of any
+    duplicates wins. An update keeps the row's original detected_date.
+    """
+    rows = list({(r['symbol'], r['source'], r['external_id']): r for r in rows}.values())
+    batch_size = current_app.config['CATALYST_BATCH_SIZE']
+    now = datetime.now(timezone.utc)
+    inserted = updated = 0
+    for i in range(0, len(rows), batch_size):
+        batch = rows[i:i + batch_size]
+        existing = {
+            (symbol, source, external_id): id_
+            for symbol, source, external_id, id_ in db.session.query(
+                Catalyst.symbol, Catalyst.source, Catalyst.external_id, Catalyst.id
+            ).filter(
+                Catalyst.symbol.in_({r['symbol'] for r in batch}),
+                Catalyst.external_id.in_({r['external_id'] for r in batch}),
+            )
+        }
+        new, changed = [], []
+        for row in batch:
+            id_ = existing.get((row['symbol'], row['source'], row['external_id']))
+            if id_ is None:
+                new.append({**row, 'detected_date': now})
+            else:
+                changed.append({**row, 'id': id_})
+        if new:
+            db.session.execute(insert(Catalyst), new)
+        if changed:
+            db.session.execute(update(Catalyst), changed)
+        inserted += len(new)
+        updated += len(changed)
+    if rows:
+        data_version.bump('catalysts')
+    db.session.commit()
+    return inserted, updated
+
+
+def attach(rows: list[dict], date_key: str = None, default_date: datetime = None, limit: int = None) -> list[dict]:
+    """Add a 'catalysts' list to each row and return rows.
+
+    Each row gets the top-scored catalysts for its symbol dated within
+    CATALYST_WINDOW_DAYS before its day (``row[date_key]``, else
+    ``default_date``) or on it, at most ``limit`` (CATALYST_TOP_N). A row
+    with a ``catalyst_id`` gets that catalyst first wherever it is dated.
+    All rows are served by one query.
+    """
+    if not rows:
+        return rows
+    config = current_app.config
+    limit = limit or config['CATALYST_TOP_N']
+    window = timedelta(days=config['CATALYST_WINDOW_DAYS'])
+    spans = []
+    for row in rows:
+        day = _day(row.get(date_key) if date_key else None) or _day(default_date) or _day(datetime.now(timezone.utc))
+        spans.append((day - window, day + timedelta(days=1)))
+
+    windows = defaultdict(list)
+    for row, span in zip(rows, spans):
+        windows[row['symbol']].append(span)
+    ids = {row['catalyst_id'] for row in rows if row.get('catalyst_id')}
+    stmt = select(*ATTACH_COLUMNS).where(window_filter(windows, ids)).order_by(
+        Catalyst.catalyst_score.desc().nulls_last(), Catalyst.event_date.desc()
+    )
+
+    by_symbol, by_id = defaultdict(list), {}
+    for found in db.session.execute(stmt):
+        event_date = found.event_date.replace(tzinfo=None) if found.event_date else None
+        item = {
+            'id': found.id,
+            'catalyst_type': found.catalyst_type,
+            'headline': found.headline,
+            'source': found.source,
+            'url': found.url,
+            'event_date': event_date.isoformat() if event_date else None,
+            'catalyst_score': found.catalyst_score,
+            'sentiment_score': found.sentiment_score,
+        }
+        by_id[found.id] = item
+        by_symbol[found.symbol].append((event_date, item))
+
+    for row, (lo, hi) in zip(rows, spans):
+        linked = by_id.get(row.get('catalyst_id'))
+        picked = [linked] if linked else []
+        for event_date, item in by_symbol.get(row['symbol'], ()):
+            if len(picked) >= limit:
+                break
+            if item is not linked and event_date is not None and lo <= event_date < hi:
+                picked.append(item)
+        row['catalysts'] = picked
+    return rows
+
+
+def window_filter(windows: dict, ids=()):
+    """WHERE clause for catalysts of each symbol within its [lo, hi) windows, or with an id in ``ids``.
+
+    Overlapping windows of a symbol are merged and each remaining one gets
+    its own (symbol, event_date range) term, so every term is a range on
+    ix_catalysts_symbol_event_date rather than one range spanning all rows.
+    """
+    terms = []
+    for symbol, spans in windows.items():
+        merged = []
+        for lo, hi in sorted(spans):
+            if merged and lo <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], hi)
+            else:
+                merged.append([lo, hi])
+        terms += [and_(Catalyst.symbol == symbol, Catalyst.event_date >= lo, Catalyst.event_date < hi)
+                  for lo, hi in merged]
+    if ids:
+        terms.append(Catalyst.id.in_(ids))
+    return or_(*terms)
+
+
+def fields_from_raw(source: str, raw: dict) -> dict:
+    """The url and summary columns parsed from a provider item."""
+    if source == 'finnhub_news':
+        url, summary = raw.get('url'), raw.get('summary')
+    elif source == 'finnhub_filings':
+        url, summary = raw.get('reportUrl') or raw.get('filingUrl'), None
+    else:
+        url = summary = None
+    return {'url': url[:500] if url else None, 'summary': summary or None}
+
+
+def last_run() -> dict | None:
+    """Metrics of the most recent ingest by any worker."""
+    return _get_runs().get('last')
+
+
+def get_limiter() -> SharedQuota:
+    """The Finnhub rate limiter, sized from FINNHUB_CALLS_PER_MINUTE and shared by all processes."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            calls = current_app.config['FINNHUB_CALLS_PER_MINUTE']
+            _limiter = SharedQuota(make_cache('finnhub_quota', maxsize=calls, pinned=True), calls)
+        return _limiter
+
+
+def _get_responses():
+    global _responses
+    if _responses is None:
+        _responses = make_cache('finnhub', current_app.config['FINNHUB_CACHE_SIZE'])
+    return _responses
+
+
+def _get_runs():
+    global _runs
+    if _runs is None:
+        _runs = make_cache('catalyst_runs', 4)
+    return _runs
+
+
+def _fetcher(api_key: str, base_url: str, limiter: SharedQuota, cache, ttl: float):
+    """Return fetch(method, params) -> (payload, cached, error) for use from worker threads."""
+    def fetch(method: str, params: dict):
+        key = (method, tuple(sorted(params.items())))
+        payload = cache.get(key)
+        if payload is not None:
+            return payload, True, None
+
+        client = getattr(_local, 'client', None)
+        if client is None or client.API_URL != base_url:
+            client = _local.client = finnhub.Client(api_key=api_key)
+            client.API_URL = base_url
+        limiter.acquire()
+        try:
+            payload = getattr(client, method)(**params)
+        except Exception as e:
+            return None, False, str(e)[:200]
+        cache.set(key, payload, ttl=ttl)
+        return payload, False, None
+    return fetch
+
+
+def _news_rows(symbol: str, items: list) -> list[dict]:
+    rows = []
+    for item in items or []:
+        external_id = item.get('id') or item.get('url')
+        if not external_id or not item.get('datetime'):
+            continue
+        rows.append(_row(
+            symbol, 'news', 'finnhub_news', str(external_id), item.get('headline'),
+            datetime.fromtimestamp(item['datetime'], timezone.utc), item, TYPE_SCORES['news']
+        ))
+    return rows
+
+
+def _earnings_rows(payload: dict, wanted: set) -> list[dict]:
+    rows = []
+    for item in (payload or {}).get('earningsCalendar') or []:
+        symbol = item.get('symbol')
+        if symbol not in wanted or not item.get('date'):
+            continue
+        quarter, year = item.get('quarter'), item.get('year')
+        period = f'Q{quarter} {year}' if quarter and year else None
+        headline = f'{period} earnings' if period else 'Earnings'
+        headline += {'bmo': ' before the open', 'amc': ' after the close'}.get(item.get('hour'), '')
+        if item.get('epsEstimate') is not None:
+            headline += f', EPS estimate {item["epsEstimate"]:.2f}'
+        rows.append(_row(
+            symbol, 'earnings', 'finnhub_earnings', f'{year}Q{quarter}' if period else item['date'], headline,
+            datetime.strptime(item['date'], '%Y-%m-%d').replace(tzinfo=timezone.utc), item, TYPE_SCORES['earnings']
+        ))
+    return rows
+
+
+def _filing_rows(symbol: str, items: list) -> list[dict]:
+    rows = []
+    for item in items or []:
+        filed = item.get('filedDate') or item.get('acceptedDate')
+        if not item.get('accessNumber') or not filed:
+            continue
+        form = item.get('form') or 'Filing'
+        rows.append(_row(
+            symbol, 'filing', 'finnhub_filings', item['accessNumber'], f'{form} filed',
+            datetime.strptime(filed[:10], '%Y-%m-%d').replace(tzinfo=timezone.utc), item,
+            FORM_SCORES.get(form, TYPE_SCORES['filing'])
+        ))
+    return rows
+
+
+def _day(value) -> datetime | None:
+    """Midnight (naive UTC) of a datetime, date or ISO string."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        value = value.astimezone(timezone.utc) if value.tzinfo else value
+        value = value.date()
+    return datetime(value.year, value.month, value.day)
+
+
+def _row(symbol, catalyst_type, source, external_id, headline, event_date, raw, score) -> dict:
+    return {
+        'symbol': symbol,
+        'catalyst_type': catalyst_type,
+        'source': source,
+        'external_id': external_id[:100],
+        'headline': headline,
+        'event_date': event_date,
+        'raw_data': json.dumps(raw, sort_keys=True),
+        'catalyst_score': score,
+        **fields_from_raw(source, raw),
+    }
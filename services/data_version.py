@@ -0,0 +1,69 @@
+"""Per-table data versions for conditional GETs and cache invalidation.
+
+Every write to trades, the watchlist or catalysts bumps that table's counter in the
+same transaction as the write. GET endpoints derive their ETag from the
+counters they depend on, so a client revalidating with If-None-Match gets
+a 304 after one primary-key lookup, without running the endpoint's query
+or serializing anything. Server-side caches key on the same counters.
+"""
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import make_response, request
+from models import db, DataVersion
+
+TABLES = ('trades', 'watchlist', 'catalysts')
+
+
+def get(name: str) -> int:
+    """Current version of a table (0 before its first write)."""
+    return db.session.query(DataVersion.version).filter_by(name=name).scalar() or 0
+
+
+def bump(*names: str):
+    """Increment table versions in the caller's transaction. The caller commits."""
+    now = datetime.now(timezone.utc)
+    for name in names:
+        result = db.session.execute(
+            db.update(DataVersion).where(DataVersion.name == name)
+            .values(version=DataVersion.version + 1, updated_at=now)
+        )
+        if not result.rowcount:
+            db.session.add(DataVersion(name=name, version=1, updated_at=now))
+
+
+def etag(*names: str, daily: bool = False) -> str:
+    """ETag value for a response built from the given tables.
+
+    ``daily`` adds the UTC date for responses whose window moves with the
+    day (the P&L series), so they change at midnight without a write.
+    """
+    versions = dict(db.session.query(DataVersion.name, DataVersion.version).filter(DataVersion.name.in_(names)).all())
+    parts = [f'{name}.{versions.get(name, 0)}' for name in names]
+    if daily:
+        parts.append(datetime.now(timezone.utc).date().isoformat())
+    return '-'.join(parts)
+
+
+def conditional(*names: str, daily: bool = False):
+    """Decorate a GET view with an ETag from ``names`` and answer If-None-Match with 304.
+
+    Responses get ``Cache-Control: no-cache``: browsers may keep them but
+    revalidate on every use, which is what makes the 304 path kick in for
+    plain ``fetch()`` calls.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            tag = etag(*names, daily=daily)
+            if request.if_none_match.contains(tag):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(tag)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
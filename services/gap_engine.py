@@ -0,0 +1,171 @@
+"""Batched gap computation over a (symbol x day) price matrix.
+
+Instead of walking symbols one by one, bars for the whole universe are
+aligned onto a shared date axis and every gap is computed with NumPy
+array operations in a single pass.
+"""
+import numpy as np
+
+GAP_FIELDS = ('prev_close', 'open', 'current', 'volume', 'gap_percent', 'gap_amount')
+
+
+def align(bars_by_symbol: dict, symbols: list[str]) -> tuple[np.ndarray, dict]:
+    """Align per-symbol bars onto a shared date axis.
+
+    Returns (dates, matrices) where each matrix is (len(symbols) x len(dates))
+    and days a symbol has no bar for are NaN.
+    """
+    present = [(row, bars_by_symbol[s]) for row, s in enumerate(symbols)
+               if bars_by_symbol.get(s) is not None]
+
+    if present:
+        all_dates = np.concatenate([np.asarray(b['date']) for _, b in present])
+        dates = np.unique(all_dates)
+        rows = np.repeat([row for row, _ in present], [len(b['date']) for _, b in present])
+        cols = np.searchsorted(dates, all_dates)
+    else:
+        dates = np.empty(0, dtype='datetime64[D]')
+        rows = cols = np.empty(0, dtype=np.intp)
+
+    matrices = {}
+    for name in ('open', 'high', 'low', 'close', 'volume'):
+        mat = np.full((len(symbols), len(dates)), np.nan)
+        if present:
+            mat[rows, cols] = np.concatenate([np.asarray(b[name]) for _, b in present])
+        matrices[name] = mat
+    return dates, matrices
+
+
+def _last_valid(valid: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Index of the last True per row, and whether the row has one."""
+    flipped = valid[:, ::-1]
+    return valid.shape[1] - 1 - flipped.argmax(axis=1), flipped.any(axis=1)
+
+
+def compute_gaps(symbols: list[str], matrices: dict) -> dict:
+    """Compute the unfiltered gap table from aligned price matrices.
+
+    Each symbol's gap uses its last two bars with a valid open and close,
+    so holidays and missing days are skipped per symbol. Returns a dict of
+    column arrays, one entry per symbol with a computable gap.
+    """
+    opens, closes, volumes = matrices['open'], matrices['close'], matrices['volume']
+    if opens.shape[1] == 0:
+        return empty_table()
+
+    valid = ~(np.isnan(opens) | np.isnan(closes))
+    rows = np.arange(len(symbols))
+
+    today, has_today = _last_valid(valid)
+    valid[rows, today] = False
+    yesterday, has_yesterday = _last_valid(valid)
+
+    prev_close = closes[rows, yesterday]
+    today_open = opens[rows, today]
+    current = closes[rows, today]
+    volume = volumes[rows, today]
+
+    ok = has_today & has_yesterday & ~np.isnan(volume) & (prev_close != 0)
+    prev_close, today_open = prev_close[ok], today_open[ok]
+
+    return {
+        'symbol': np.asarray(symbols, dtype=object)[ok],
+        'prev_close': prev_close,
+        'open': today_open,
+        'current': current[ok],
+        'volume': volume[ok],
+        'gap_percent': ((today_open - prev_close) / prev_close) * 100,
+        'gap_amount': today_open - prev_close,
+    }
+
+
+def compute_gap_history(symbols: list[str], dates: np.ndarray, matrices: dict, start) -> dict:
+    """Compute every (symbol, day) gap on or after ``start`` in one pass.
+
+    Each valid bar is compared with the symbol's previous valid bar, the
+    same rule ``compute_gaps`` applies to the latest bar. The returned
+    table has one entry per gap plus a ``date`` column.
+    """
+    opens, closes, volumes = matrices['open'], matrices['close'], matrices['volume']
+    valid = ~(np.isnan(opens) | np.isnan(closes))
+    n_days = valid.shape[1]
+
+    # Index of the most recent valid bar strictly before each day
+    last_valid = np.maximum.accumulate(np.where(valid, np.arange(n_days), -1), axis=1)
+    prev_idx = np.full_like(last_valid, -1)
+    prev_idx[:, 1:] = last_valid[:, :-1]
+
+    rows = np.arange(len(symbols))[:, None]
+    prev_close = closes[rows, np.maximum(prev_idx, 0)]
+
+    ok = valid & (prev_idx >= 0) & ~np.isnan(volumes) & (prev_close != 0)
+    ok &= (dates >= np.datetime64(start, 'D'))[None, :]
+    sym_i, day_i = np.nonzero(ok)
+
+    prev_close = prev_close[sym_i, day_i]
+    today_open = opens[sym_i, day_i]
+    return {
+        'date': dates[day_i],
+        'symbol': np.asarray(symbols, dtype=object)[sym_i],
+        'prev_close': prev_close,
+        'open': today_open,
+        'current': closes[sym_i, day_i],
+        'volume': volumes[sym_i, day_i],
+        'gap_percent': ((today_open - prev_close) / prev_close) * 100,
+        'gap_amount': today_open - prev_close,
+    }
+
+
+def empty_table() -> dict:
+    table = {name: np.empty(0) for name in GAP_FIELDS}
+    table['symbol'] = np.empty(0, dtype=object)
+    return table
+
+
+def concat_tables(tables: list[dict], symbols: list[str]) -> dict:
+    """Merge per-chunk gap tables into one, ordered like ``symbols``."""
+    if not tables:
+        return empty_table()
+    merged = {name: np.concatenate([t[name] for t in tables]) for name in tables[0]}
+    position = {s: i for i, s in enumerate(symbols)}
+    order = np.argsort([position[s] for s in merged['symbol']], kind='stable')
+    return {name: col[order] for name, col in merged.items()}
+
+
+def filter_mask(table: dict, min_gap: float, direction: str) -> np.ndarray:
+    """Boolean mask selecting gaps that pass the min_gap/direction filters."""
+    gap = table['gap_percent']
+    mask = np.abs(gap) >= min_gap
+    if direction == 'up':
+        mask &= gap > 0
+    elif direction == 'down':
+        mask &= gap < 0
+    return mask
+
+
+def row(table: dict, i: int, sector_for=None) -> dict:
+    """Build the result dict for entry ``i`` of a gap table."""
+    gap_percent = float(table['gap_percent'][i])
+    symbol = table['symbol'][i]
+    result = {'date': str(table['date'][i])} if 'date' in table else {}
+    result.update({
+        'symbol': symbol,
+        'prev_close': round(float(table['prev_close'][i]), 2),
+        'open': round(float(table['open'][i]), 2),
+        'current': round(float(table['current'][i]), 2),
+        'gap_percent': round(gap_percent, 2),
+        'gap_amount': round(float(table['gap_amount'][i]), 2),
+        'direction': 'up' if gap_percent > 0 else 'down',
+        'volume': int(table['volume'][i]),
+        'sector': sector_for(symbol) if sector_for else None
+    })
+    return result
+
+
+def to_rows(table: dict, mask: np.ndarray, sector_for=None) -> list[dict]:
+    """Build result dicts for masked gaps, sorted by absolute gap descending."""
+    rows = [row(table, i, sector_for) for i in np.flatnonzero(mask)]
+
+    # Sort by absolute gap percentage descending
+    rows.sort(key=lambda x: abs(x['gap_percent']), reverse=True)
+    return rows
@@ -1,9 +1,29 @@
-import yfinance as yf
+import hashlib
+import os
+import threading
+import time
 from datetime import datetime, timedelta
+import numpy as np
+from flask import current_app
+from services import catalysts, gap_engine, gap_stats, symbol_meta
+from services.bar_store import get_store
+from services.cache import make_cache
+from services.single_flight import SingleFlight
 from services.symbols import DEFAULT_SYMBOLS
 
-# Simple cache for sector lookups
+# In-memory symbol -> sector join, bulk-loaded from SymbolMeta
 _sector_cache = {}
+_sector_cache_loaded_at = None
+_sector_lock = threading.Lock()
+
+# Unfiltered gap tables keyed by (symbols, scan date), shared by all workers
+_scan_cache = None
+
+# Last loaded scheduled snapshot: (file mtime, table, info)
+_snapshot = None
+
+# Scans currently being computed in this worker, shared by identical concurrent requests
+_flights = None
 
 
 def scan_gaps(
@@ -14,105 +34,376 @@ def scan_gaps(
 ) -> dict:
     """Scan for gap openings in US stocks.
 
-    Returns dict with scan_date, total_found, and gaps list.
+    Returns dict with scan_date, total_found, gaps and failed lists. Each
+    gap carries its top catalysts, looked up for all gaps in one query,
+    and the symbol's historical fill rates for gaps of its size.
     """
-    if symbols is None:
-        symbols = DEFAULT_SYMBOLS
+    symbols = _universe(symbols)
+    end_date = datetime.strptime(date, '%Y-%m-%d') if date else datetime.now()
+    scan_date = end_date.strftime('%Y-%m-%d')
+
+    # The unfiltered gap table is cached per (universe, trading date);
+    # min_gap/direction are applied as cheap filters on top of it
+    key = (tuple(symbols), scan_date)
+    table, snapshot = _lookup_table(key, default_scan=symbols is DEFAULT_SYMBOLS and date is None)
+    failed = {}
+    if table is None:
+        try:
+            tables = []
+            for _, chunk_table, chunk_failed in _iter_shared_chunks(key, symbols, end_date):
+                tables.append(chunk_table)
+                failed.update(chunk_failed)
+        except Exception as e:
+            return {
+                'scan_date': scan_date,
+                'total_found': 0,
+                'gaps': [],
+                'failed': [],
+                'error': str(e)
+            }
+        table = gap_engine.concat_tables(tables, symbols)
+        _cache_table(key, table, failed, end_date)
+
+    _prepare_sectors(symbols)
+    mask = gap_engine.filter_mask(table, min_gap, direction)
+    results = gap_engine.to_rows(table, mask, sector_for=_get_sector)
+    catalysts.attach(results, default_date=end_date)
+    gap_stats.attach(results)
+
+    return {
+        'scan_date': scan_date,
+        'total_found': len(results),
+        'gaps': results,
+        'failed': _failures(failed),
+        **snapshot
+    }
+
 
+def iter_scan_gaps(
+    symbols: list[str] = None,
+    min_gap: float = 2.0,
+    direction: str = 'both',
+    date: str = None
+):
+    """Streaming variant of ``scan_gaps``.
+
+    Yields ``{'type': 'gap', 'data': row}`` frames as soon as each chunk of
+    the universe is computed (sorted within the chunk), then one
+    ``{'type': 'summary', 'data': {...}}`` frame with the scan totals.
+    """
+    symbols = _universe(symbols)
     end_date = datetime.strptime(date, '%Y-%m-%d') if date else datetime.now()
+    scan_date = end_date.strftime('%Y-%m-%d')
+    _prepare_sectors(symbols)
+
+    key = (tuple(symbols), scan_date)
+    table, snapshot = _lookup_table(key, default_scan=symbols is DEFAULT_SYMBOLS and date is None)
+    failed, total = {}, 0
+    try:
+        if table is not None:
+            rows = gap_engine.to_rows(table, gap_engine.filter_mask(table, min_gap, direction), _get_sector)
+            catalysts.attach(rows, default_date=end_date)
+            gap_stats.attach(rows)
+            total = len(rows)
+            for row in rows:
+                yield {'type': 'gap', 'data': row}
+        else:
+            tables = []
+            for _, chunk_table, chunk_failed in _iter_shared_chunks(key, symbols, end_date):
+                tables.append(chunk_table)
+                failed.update(chunk_failed)
+                mask = gap_engine.filter_mask(chunk_table, min_gap, direction)
+                rows = gap_engine.to_rows(chunk_table, mask, _get_sector)
+                catalysts.attach(rows, default_date=end_date)
+                gap_stats.attach(rows)
+                total += len(rows)
+                for row in rows:
+                    yield {'type': 'gap', 'data': row}
+            _cache_table(key, gap_engine.concat_tables(tables, symbols), failed, end_date)
+    except Exception as e:
+        yield {'type': 'error', 'data': {'scan_date': scan_date, 'error': str(e)}}
+        return
+
+    yield {'type': 'summary', 'data': {
+        'scan_date': scan_date,
+        'total_found': total,
+        'failed': _failures(failed),
+        **snapshot
+    }}
+
+
+def scan_history(
+    symbols: list[str] = None,
+    start: str = None,
+    end: str = None,
+    min_gap: float = 2.0,
+    direction: str = 'both',
+    page: int = 1,
+    per_page: int = 500
+) -> dict:
+    """Scan every trading day in [start, end] for gap openings in one pass.
+
+    Returns dict with start, end, total_found, page, per_page and a page of
+    gaps ordered by date descending, then absolute gap descending.
+    """
+    symbols = _universe(symbols)
+    end_date = datetime.strptime(end, '%Y-%m-%d') if end else datetime.now()
+    start_date = datetime.strptime(start, '%Y-%m-%d') if start else end_date - timedelta(days=365)
+    result = {
+        'start': start_date.strftime('%Y-%m-%d'),
+        'end': end_date.strftime('%Y-%m-%d'),
+        'page': page,
+        'per_page': per_page,
+    }
+
+    key = ('history', tuple(symbols), result['start'], result['end'])
+    table, failed = get_scan_cache().get(key), {}
+    if table is None:
+        try:
+            table, failed = get_flights().do(
+                key, lambda: _compute_history(symbols, start_date, end_date), label=_flight_label(key)
+            )
+        except Exception as e:
+            return {**result, 'total_found': 0, 'gaps': [], 'failed': [], 'error': str(e)}
+        _cache_table(key, table, failed, end_date)
+
+    idx = np.flatnonzero(gap_engine.filter_mask(table, min_gap, direction))
+    order = np.lexsort((
+        -np.abs(table['gap_percent'][idx]),
+        -table['date'][idx].astype(np.int64),
+    ))
+    idx = idx[order]
+    page_idx = idx[(page - 1) * per_page:page * per_page]
+
+    _prepare_sectors(symbols)
+    gaps = [gap_engine.row(table, i, sector_for=_get_sector) for i in page_idx]
+    return {
+        **result,
+        'total_found': len(idx),
+        'gaps': catalysts.attach(gaps, date_key='date'),
+        'failed': _failures(failed)
+    }
+
+
+def refresh_snapshot() -> dict:
+    """Scan the default universe now and persist the unfiltered table as a snapshot.
+
+    The snapshot file is shared by all worker processes, so default-parameter
+    scans can be answered without computing anything. Returns snapshot info.
+    """
+    end_date = datetime.now()
+    tables, failed = [], {}
+    for _, chunk_table, chunk_failed in _iter_chunk_tables(DEFAULT_SYMBOLS, end_date):
+        tables.append(chunk_table)
+        failed.update(chunk_failed)
+    table = gap_engine.concat_tables(tables, DEFAULT_SYMBOLS)
+
+    scan_date = end_date.strftime('%Y-%m-%d')
+    path = current_app.config['SCAN_SNAPSHOT_PATH']
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        np.savez(
+            f,
+            scan_date=np.array(scan_date),
+            generated_at=np.array(time.time()),
+            **{name: (col.astype(str) if name == 'symbol' else col) for name, col in table.items()}
+        )
+    os.replace(tmp, path)
+
+    _cache_table((tuple(DEFAULT_SYMBOLS), scan_date), table, failed, end_date)
+    return {'scan_date': scan_date, 'total_found': len(table['symbol']), 'failed': _failures(failed)}
+
+
+def load_snapshot() -> tuple[dict, dict] | None:
+    """Return (table, info) for today's scheduled snapshot if it is fresh enough."""
+    global _snapshot
+    path = current_app.config['SCAN_SNAPSHOT_PATH']
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return None
+
+    if _snapshot is None or _snapshot[0] != mtime:
+        with np.load(path) as data:
+            table = {name: data[name] for name in data.files if name not in ('scan_date', 'generated_at')}
+            table['symbol'] = table['symbol'].astype(object)
+            info = {'scan_date': str(data['scan_date']), 'generated_at': float(data['generated_at'])}
+        _snapshot = (mtime, table, info)
+
+    _, table, info = _snapshot
+    age = time.time() - info['generated_at']
+    if info['scan_date'] != datetime.now().strftime('%Y-%m-%d') or age > current_app.config['SCAN_SNAPSHOT_MAX_AGE']:
+        return None
+    return table, {'snapshot_age': round(age, 1)}
+
+
+def get_scan_cache():
+    """Return the scan table cache on the configured backend, sized from app config."""
+    global _scan_cache
+    if _scan_cache is None:
+        _scan_cache = make_cache('scan', current_app.config['SCAN_CACHE_SIZE'])
+    return _scan_cache
+
+
+def get_flights() -> SingleFlight:
+    """Return this worker's table of in-flight scans."""
+    global _flights
+    if _flights is None:
+        _flights = SingleFlight(timeout=current_app.config['SCAN_COALESCE_TIMEOUT'])
+    return _flights
+
+
+def _universe(symbols: list[str] | None) -> list[str]:
+    """Default universe, or the given symbols with duplicates dropped."""
+    return DEFAULT_SYMBOLS if symbols is None else list(dict.fromkeys(symbols))
+
+
+def _iter_chunk_tables(symbols: list[str], end_date: datetime):
+    """Yield (chunk symbols, gap table, failed) for each chunk of the universe as it becomes available.
+
+    failed maps symbols whose bars could not be fetched to an error message.
+    """
     start_date = end_date - timedelta(days=7)  # 7 days to handle weekends/holidays
+    store = get_store()
 
-    results = []
+    # Top up the local bar store chunk by chunk; only missing bars hit the network
+    for chunk, failed in store.iter_sync(symbols, start_date.date(), end_date.date()):
+        chunk = [s for s in chunk if s not in failed]
+        bars_by_symbol = {s: store.read(s, start_date.date(), end_date.date()) for s in chunk}
+        _, matrices = gap_engine.align(bars_by_symbol, chunk)
+        yield chunk, gap_engine.compute_gaps(chunk, matrices), failed
+
+
+def _iter_shared_chunks(key: tuple, symbols: list[str], end_date: datetime):
+    """``_iter_chunk_tables`` with identical concurrent scans coalesced.
+
+    The first request for key fetches and publishes each chunk; requests
+    arriving meanwhile replay the published chunks and then follow the
+    rest, so upstream calls do not grow with concurrent users.
+    """
+    flights = get_flights()
+    flight, leader = flights.join(key, label=_flight_label(key))
+    if not leader:
+        covered = set()
+        for chunk, table, failed in flights.follow(flight):
+            covered.update(chunk)
+            covered.update(failed)
+            yield chunk, table, failed
+        remaining = [s for s in symbols if s not in covered]
+        if remaining:  # the leader's client went away, or we timed out waiting
+            yield from _iter_chunk_tables(remaining, end_date)
+        return
 
-    # Batch download for performance
     try:
-        data = yf.download(
-            tickers=symbols,
-            start=start_date.strftime('%Y-%m-%d'),
-            end=(end_date + timedelta(days=1)).strftime('%Y-%m-%d'),
-            group_by='ticker',
-            progress=False
-        )
+        for part in _iter_chunk_tables(symbols, end_date):
+            flight.publish(part)
+            yield part
+    except GeneratorExit:
+        flights.finish(key, flight, abandoned=True)
+        raise
     except Exception as e:
-        return {
-            'scan_date': end_date.strftime('%Y-%m-%d'),
-            'total_found': 0,
-            'gaps': [],
-            'error': str(e)
-        }
+        flights.finish(key, flight, error=e)
+        raise
+    flights.finish(key, flight)
+
+
+def _flight_label(key: tuple) -> str:
+    """Short, readable metrics label for a scan key."""
+    symbols = next(part for part in key if isinstance(part, tuple))
+    digest = hashlib.sha1(','.join(symbols).encode()).hexdigest()[:8]
+    dates = [part for part in key if isinstance(part, str) and part != 'history']
+    kind = 'history ' if key[0] == 'history' else ''
+    return f'{kind}{"..".join(dates)} {len(symbols)} symbols {digest}'
+
+
+def _lookup_table(key: tuple, default_scan: bool) -> tuple[dict | None, dict]:
+    """Find a precomputed gap table: the scheduled snapshot, then the scan cache.
+
+    Returns (table or None, extra response fields).
+    """
+    if default_scan:
+        snapshot = load_snapshot()
+        if snapshot is not None:
+            return snapshot
+    return get_scan_cache().get(key), {}
 
+
+def _cache_table(key: tuple, table: dict, failed: dict, end_date: datetime):
+    """Cache a gap table; past sessions are final, the current one gets a TTL.
+
+    Partial results are not cached so failed symbols are retried.
+    """
+    if failed:
+        return
+    live = end_date.date() >= datetime.now().date()
+    get_scan_cache().set(key, table, ttl=current_app.config['SCAN_CACHE_TTL'] if live else None)
+
+
+def _compute_history(symbols: list[str], start_date: datetime, end_date: datetime) -> tuple[dict, dict]:
+    """Compute the unfiltered gap table for every day in [start_date, end_date].
+
+    Returns (table, failed) where failed maps symbols whose bars could not
+    be fetched to an error message.
+    """
+    # Load a week before start so the first day has a previous close
+    load_start = (start_date - timedelta(days=7)).date()
+    store = get_store()
+    failed = store.sync(symbols, load_start, end_date.date())
+
+    bars_by_symbol = {}
     for symbol in symbols:
         try:
-            if len(symbols) == 1:
-                df = data
-            else:
-                df = data[symbol]
-
-            # Drop rows with NaN close/open
-            df = df.dropna(subset=['Close', 'Open'])
-            if len(df) < 2:
-                continue
-
-            yesterday = df.iloc[-2]
-            today = df.iloc[-1]
-
-            prev_close = float(yesterday['Close'])
-            today_open = float(today['Open'])
-            current_price = float(today['Close'])
-            volume = int(today['Volume'])
-
-            if prev_close == 0:
-                continue
-
-            gap_percent = ((today_open - prev_close) / prev_close) * 100
-            gap_amount = today_open - prev_close
-
-            # Direction filter
-            if direction == 'up' and gap_percent <= 0:
-                continue
-            if direction == 'down' and gap_percent >= 0:
-                continue
-
-            # Min gap filter
-            if abs(gap_percent) < min_gap:
-                continue
-
-            gap_direction = 'up' if gap_percent > 0 else 'down'
-
-            results.append({
-                'symbol': symbol,
-                'prev_close': round(prev_close, 2),
-                'open': round(today_open, 2),
-                'current': round(current_price, 2),
-                'gap_percent': round(gap_percent, 2),
-                'gap_amount': round(gap_amount, 2),
-                'direction': gap_direction,
-                'volume': volume,
-                'sector': _get_sector(symbol)
-            })
-        except Exception:
+            bars_by_symbol[symbol] = store.read(symbol, load_start, end_date.date())
+        except ValueError:
             continue
 
-    # Sort by absolute gap percentage descending
-    results.sort(key=lambda x: abs(x['gap_percent']), reverse=True)
+    dates, matrices = gap_engine.align(bars_by_symbol, symbols)
+    return gap_engine.compute_gap_history(symbols, dates, matrices, start_date.date()), failed
 
-    return {
-        'scan_date': end_date.strftime('%Y-%m-%d'),
-        'total_found': len(results),
-        'gaps': results
-    }
 
+def _failures(failed: dict) -> list[dict]:
+    return [{'symbol': symbol, 'error': error} for symbol, error in failed.items()]
 
-def _get_sector(symbol: str) -> str:
-    """Get sector for a symbol with caching."""
-    if symbol in _sector_cache:
-        return _sector_cache[symbol]
 
-    try:
-        info = yf.Ticker(symbol).info
-        sector = info.get('sector', 'Unknown')
-        _sector_cache[symbol] = sector
-        return sector
-    except Exception:
-        _sector_cache[symbol] = 'Unknown'
-        return 'Unknown'
+def _prepare_sectors(symbols: list[str]):
+    """Bulk-load the sector map and refresh missing/stale metadata in the background."""
+    global _sector_cache_loaded_at
+    with _sector_lock:  # concurrent requests on a cold worker share one load
+        now = time.monotonic()
+        if _sector_cache_loaded_at is None or now - _sector_cache_loaded_at > current_app.config['SYMBOL_META_RELOAD']:
+            sectors, stale = symbol_meta.load_sectors(symbols)
+            _sector_cache.update(sectors)
+            _sector_cache_loaded_at = now
+        else:
+            stale = [s for s in symbols if s not in _sector_cache]
+
+    if stale:
+        symbol_meta.refresh_in_background(stale, on_done=_on_meta_refreshed)
+
+
+def warm_sectors(symbols: list[str]) -> dict:
+    """Fetch missing or stale metadata for symbols now and load the sector map.
+
+    Run by the scheduler at startup and periodically, so scans find sectors
+    already loaded instead of refreshing them in the background.
+    Returns {'symbols', 'refreshed'}.
+    """
+    global _sector_cache_loaded_at
+    sectors, stale = symbol_meta.load_sectors(symbols)
+    if stale:
+        symbol_meta.refresh(stale)
+        sectors, _ = symbol_meta.load_sectors()
+    with _sector_lock:
+        _sector_cache.update(sectors)
+        _sector_cache_loaded_at = time.monotonic()
+    return {'symbols': len(symbols), 'refreshed': len(stale)}
+
+
+def _on_meta_refreshed(fetched: dict):
+    _sector_cache.update({s: fields['sector'] or 'Unknown' for s, fields in fetched.items()})
+
+
+def _get_sector(symbol: str) -> str:
+    """Get sector for a symbol from the in-memory metadata join."""
+    return _sector_cache.get(symbol, 'Unknown')
@@ -0,0 +1,276 @@
+"""Historical gap-fill statistics per symbol, bucketed by gap size and direction.
+
+For every past gap we record whether price traded back through the
+previous close on the gap day itself or within each of HORIZONS trading
+days, and how far the gap day's close ran from its open in the gap's
+direction (continuation). Sums are kept in (symbol x direction x bucket)
+arrays computed in a few NumPy passes over all symbols' bars at once,
+and saved as one .npz file per market data provider.
+
+The sums are additive, so ``update`` only reads bars after each symbol's
+``through`` day and adds the gaps found there. A gap is counted once its
+longest horizon has closed on a finished trading day, so partial bars
+never enter the table.
+"""
+import os
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from flask import current_app
+from services.bar_store import get_store
+from services.market_data import get_provider
+
+DIRECTIONS = ('up', 'down')
+HORIZONS = (1, 3, 5)  # trading days after the gap day
+
+# Last loaded table: (path, file mtime, table, symbol -> row)
+_loaded = None
+
+
+def compute(bars_by_symbol: dict, symbols: list[str], after: np.ndarray, until: int,
+            edges: np.ndarray, horizons: tuple = HORIZONS) -> dict:
+    """Sum gap outcomes for symbols from their daily bars.
+
+    Only gap days later than ``after[i]`` (a day number) are counted for
+    symbol i, and only if the bar ``max(horizons)`` trading days later is
+    dated before ``until`` (today's day number). Returns count, fill
+    (same day, then each horizon), continuation sums and the new
+    ``through`` day per symbol.
+    """
+    n_sym, n_bucket = len(symbols), len(edges)
+    parts = [bars_by_symbol.get(s) for s in symbols]
+    lengths = np.array([len(b['date']) if b is not None else 0 for b in parts])
+    present = [b for b in parts if b is not None]
+
+    def column(name, dtype=np.float64):
+        if not present:
+            return np.empty(0, dtype=dtype)
+        return np.concatenate([np.asarray(b[name]).astype(dtype) for b in present])
+
+    day = column('date', np.int64)  # datetime64[D] -> day number
+    opens, highs, lows, closes = column('open'), column('high'), column('low'), column('close')
+
+    # Each bar's symbol, and the bounds of that symbol's run of bars in the flat arrays
+    seg = np.repeat(np.arange(n_sym), lengths)
+    seg_start = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    seg_end = seg_start + np.repeat(lengths, lengths)
+    idx = np.arange(len(day))
+
+    hmax = max(horizons)
+    last = np.minimum(idx + hmax, max(len(day) - 1, 0))
+    complete = (idx + hmax < seg_end) & (day[last] < until) & (day > after[seg])
+
+    prev_close = np.full(len(day), np.nan)
+    prev_close[1:] = closes[:-1]
+    prev_close[idx == seg_start] = np.nan
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        gap = (opens - prev_close) / prev_close * 100
+        up = gap > 0
+        bucket = np.searchsorted(edges, np.abs(gap), side='right') - 1
+        counted = complete & np.isfinite(gap) & (bucket >= 0)
+
+        # Running extremes from the gap day through each horizon
+        run_low, run_high = lows.copy(), highs.copy()
+        fills = [np.where(up, run_low <= prev_close, run_high >= prev_close)]
+        for k in range(1, hmax + 1):
+            ahead = np.minimum(idx + k, max(len(day) - 1, 0))
+            run_low = np.fmin(run_low, lows[ahead])
+            run_high = np.fmax(run_high, highs[ahead])
+            if k in horizons:
+                fills.append(np.where(up, run_low <= prev_close, run_high >= prev_close))
+
+        continuation = np.where(up, 1, -1) * (closes - opens) / opens * 100
+
+    cell = (seg * 2 + ~up) * n_bucket + bucket
+    cell, size = cell[counted], n_sym * 2 * n_bucket
+    shape = (n_sym, 2, n_bucket)
+    result = {
+        'count': np.bincount(cell, minlength=size).reshape(shape).astype(np.int64),
+        'fill': np.stack([
+            np.bincount(cell, weights=f[counted], minlength=size).reshape(shape) for f in fills
+        ], axis=-1).astype(np.int64),
+        'continuation': np.bincount(
+            cell, weights=np.nan_to_num(continuation[counted]), minlength=size
+        ).reshape(shape),
+    }
+
+    through = np.asarray(after, dtype=np.int64).copy()
+    np.maximum.at(through, seg[complete], day[complete])
+    result['through'] = through
+    return result
+
+
+def update(symbols: list[str] = None, rebuild: bool = False) -> dict:
+    """Add gaps from bars that arrived since the last update, then save the table.
+
+    Defaults to the symbols already in the table plus the scanner's
+    default universe. ``rebuild`` starts over from GAP_STATS_YEARS of
+    bars. Returns {'symbols', 'gaps_added', 'failed', 'elapsed_s'}.
+    """
+    from services.symbols import DEFAULT_SYMBOLS
+
+    started = time.perf_counter()
+    config = current_app.config
+    edges = np.asarray(config['GAP_STATS_BUCKETS'], dtype=np.float64)
+    table = None if rebuild else _read(_path())
+    if table is not None and not (np.array_equal(table['edges'], edges)
+                                  and tuple(table['horizons']) == HORIZONS):
+        table = None  # bucket layout changed
+    known = list(table['symbol']) if table is not None else []
+    symbols = list(dict.fromkeys(known + list(symbols if symbols is not None else DEFAULT_SYMBOLS)))
+    table = _extend(table, symbols, edges)
+
+    today = date.today()
+    first_day = today - timedelta(days=365 * config['GAP_STATS_YEARS'])
+    after = np.maximum(table['through'], int(np.datetime64(first_day, 'D').astype(np.int64)) - 1)
+    # A week of context before each symbol's first new day, for its previous close
+    starts = {s: date(1970, 1, 1) + timedelta(days=int(a) - 7) for s, a in zip(symbols, after)}
+    by_start = {}
+    for symbol, start in starts.items():
+        by_start.setdefault(start, []).append(symbol)
+
+    store = get_store()
+    failed = {}
+    for start, group in by_start.items():
+        failed.update(store.sync(group, start, today))
+    bars_by_symbol = {}
+    for symbol in symbols:
+        if symbol not in failed:
+            bars_by_symbol[symbol] = store.read(symbol, starts[symbol], today)
+
+    until = int(np.datetime64(today, 'D').astype(np.int64))
+    sums = compute(bars_by_symbol, symbols, after, until, edges)
+    for name in ('count', 'fill', 'continuation'):
+        table[name] = table[name] + sums[name]
+    table['through'] = sums['through']
+
+    _write(_path(), table)
+    return {
+        'symbols': len(symbols),
+        'gaps_added': int(sums['count'].sum()),
+        'failed': [{'symbol': s, 'error': e} for s, e in failed.items()],
+        'elapsed_s': round(time.perf_counter() - started, 2),
+    }
+
+
+def attach(rows: list[dict]) -> list[dict]:
+    """Add 'fill_stats' for each gap row's symbol, direction and size bucket (None if unknown)."""
+    loaded = _load()
+    if loaded is None or not rows:
+        for row in rows:
+            row['fill_stats'] = None
+        return rows
+
+    table, position = loaded
+    edges = table['edges']
+    sym_i = np.array([position.get(row['symbol'], -1) for row in rows])
+    gap = np.array([row['gap_percent'] for row in rows], dtype=np.float64)
+    down = (gap < 0).astype(np.intp)
+    bucket = np.searchsorted(edges, np.abs(gap), side='right') - 1
+    known = (sym_i >= 0) & (bucket >= 0)
+    sym_i, bucket = np.where(known, sym_i, 0), np.maximum(bucket, 0)
+
+    count = table['count'][sym_i, down, bucket]
+    fill = table['fill'][sym_i, down, bucket]
+    continuation = table['continuation'][sym_i, down, bucket]
+    labels = _bucket_labels(edges)
+    for i, row in enumerate(rows):
+        if not known[i]:
+            row['fill_stats'] = None
+            continue
+        n = int(count[i])
+        row['fill_stats'] = {
+            'bucket': labels[bucket[i]],
+            'samples': n,
+            'fill_same_day': round(float(fill[i, 0]) / n * 100, 1) if n else None,
+            'fill_within': {f'{h}d': round(float(fill[i, j + 1]) / n * 100, 1) if n else None
+                            for j, h in enumerate(HORIZONS)},
+            'avg_continuation': round(float(continuation[i]) / n, 2) if n else None,
+        }
+    return rows
+
+
+def info() -> dict | None:
+    """Summary of the current table: symbols, gaps counted and age."""
+    loaded = _load()
+    if loaded is None:
+        return None
+    table, _ = loaded
+    return {
+        'symbols': len(table['symbol']),
+        'gaps': int(table['count'].sum()),
+        'buckets': _bucket_labels(table['edges']),
+        'horizons': list(HORIZONS),
+        'updated_at': float(table['updated_at']),
+    }
+
+
+def _path() -> str:
+    """Tables are per provider, like the bar store they are computed from."""
+    return os.path.join(current_app.config['GAP_STATS_DIR'], f'{get_provider().name}.npz')
+
+
+def _load() -> tuple[dict, dict] | None:
+    """Return (table, symbol -> row) for the current table, reloading it when the file changes."""
+    global _loaded
+    path = _path()
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return None
+    if _loaded is None or _loaded[:2] != (path, mtime):
+        table = _read(path)
+        if table is None:
+            return None
+        _loaded = (path, mtime, table, {s: i for i, s in enumerate(table['symbol'])})
+    return _loaded[2], _loaded[3]
+
+
+def _read(path: str) -> dict | None:
+    try:
+        with np.load(path) as data:
+            table = {name: data[name] for name in data.files}
+    except (OSError, ValueError):
+        return None
+    table['symbol'] = table['symbol'].astype(object)
+    return table
+
+
+def _write(path: str, table: dict):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        np.savez(f, **{**table, 'symbol': table['symbol'].astype(str), 'updated_at': np.array(time.time())})
+    os.replace(tmp, path)
+
+
+def _extend(table: dict | None, symbols: list[str], edges: np.ndarray) -> dict:
+    """Return table with zeroed rows appended for symbols it does not have yet, in order."""
+    n_bucket = len(edges)
+    if table is None:
+        table = {
+            'symbol': np.empty(0, dtype=object),
+            'through': np.empty(0, dtype=np.int64),
+            'count': np.zeros((0, 2, n_bucket), dtype=np.int64),
+            'fill': np.zeros((0, 2, n_bucket, 1 + len(HORIZONS)), dtype=np.int64),
+            'continuation': np.zeros((0, 2, n_bucket)),
+            'edges': edges,
+            'horizons': np.array(HORIZONS),
+        }
+    table = {name: col for name, col in table.items() if name != 'updated_at'}
+    known = set(table['symbol'])
+    new = [s for s in symbols if s not in known]
+    if new:
+        table['symbol'] = np.concatenate([table['symbol'], np.array(new, dtype=object)])
+        table['through'] = np.concatenate([table['through'], np.full(len(new), -1, dtype=np.int64)])
+        for name in ('count', 'fill', 'continuation'):
+            old = table[name]
+            table[name] = np.concatenate([old, np.zeros((len(new),) + old.shape[1:], dtype=old.dtype)])
+    return table
+
+
+def _bucket_labels(edges: np.ndarray) -> list[str]:
+    bounds = [f'{e:g}' for e in edges]
+    return [f'{lo}-{hi}%' for lo, hi in zip(bounds, bounds[1:])] + [f'{bounds[-1]}%+']
@@ -0,0 +1,244 @@
+"""Market data providers.
+
+The scanner talks to a ``MarketDataProvider`` rather than to yfinance
+directly. Bars are returned as per-symbol dicts of column arrays (see
+``bar_store.COLUMNS``) with ``date`` as int64 days since the epoch.
+
+``ReplayProvider`` serves recorded or synthetic bars from local files,
+which makes the scanner benchmarkable and load-testable offline.
+"""
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from flask import current_app
+
+BAR_COLUMNS = ('date', 'open', 'high', 'low', 'close', 'volume')
+
+_providers = {}
+
+
+def empty_bars() -> dict:
+    return {name: np.empty(0) for name in BAR_COLUMNS}
+
+
+def _to_day(d: date) -> int:
+    return int(np.datetime64(d, 'D').astype(np.int64))
+
+
+class MarketDataProvider(ABC):
+    """Interface for bulk daily bars and bulk symbol metadata."""
+
+    name = 'base'
+
+    @abstractmethod
+    def get_bars(self, symbols: list[str], start: date, end: date, timeout: float = None) -> tuple[dict, dict]:
+        """Fetch daily bars within [start, end] for a batch of symbols.
+
+        Returns ({symbol: bars}, {symbol: error message}). Symbols with no
+        data may be omitted from both. Raises if the whole batch failed.
+        """
+
+    @abstractmethod
+    def get_metadata(self, symbols: list[str], max_workers: int = 8) -> dict:
+        """Return {symbol: {sector, industry, market_cap, avg_volume}}."""
+
+
+class YFinanceProvider(MarketDataProvider):
+    """Live data from Yahoo Finance.
+
+    Tickers are fetched one by one with ``Ticker.history``, as
+    ``yf.download`` does internally, so a ticker's failure is the exception
+    it raised rather than an entry in yfinance's private module-global
+    error table. Nothing shared is read back, so batches from the bar
+    store's worker pool run concurrently. ``timeout`` bounds the whole
+    batch: tickers still pending when it runs out are reported as failed.
+    """
+
+    name = 'yfinance'
+    max_threads = 8  # concurrent ticker requests per batch
+
+    def get_bars(self, symbols: list[str], start: date, end: date, timeout: float = None) -> tuple[dict, dict]:
+        if not symbols:
+            return {}, {}
+        timeout = timeout or 10
+        deadline = time.monotonic() + timeout
+        pool = ThreadPoolExecutor(max_workers=min(self.max_threads, len(symbols)))
+        futures = {s: pool.submit(self._fetch_history, s, start, end, timeout) for s in symbols}
+
+        result, errors = {}, {}
+        try:
+            for symbol, future in futures.items():
+                try:
+                    df = future.result(timeout=max(deadline - time.monotonic(), 0))
+                except TimeoutError:
+                    errors[symbol] = f'Timed out after {timeout:g}s'
+                    continue
+                except Exception as e:
+                    errors[symbol] = str(e) or type(e).__name__
+                    continue
+                if not df.empty:
+                    result[symbol] = _frame_to_bars(df)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)  # don't wait on hung requests
+        return result, errors
+
+    @staticmethod
+    def _fetch_history(symbol: str, start: date, end: date, timeout: float) -> pd.DataFrame:
+        return yf.Ticker(symbol).history(
+            start=start.strftime('%Y-%m-%d'),
+            end=(end + timedelta(days=1)).strftime('%Y-%m-%d'),
+            auto_adjust=True,
+            actions=False,
+            timeout=timeout,
+            raise_errors=True,
+        )
+
+    def get_metadata(self, symbols: list[str], max_workers: int = 8) -> dict:
+        if not symbols:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(symbols))) as pool:
+            return dict(zip(symbols, pool.map(self._fetch_info, symbols)))
+
+    @staticmethod
+    def _fetch_info(symbol: str) -> dict:
+        try:
+            info = yf.Ticker(symbol).info
+        except Exception:
+            info = {}
+        return {
+            'sector': info.get('sector', 'Unknown'),
+            'industry': info.get('industry'),
+            'market_cap': info.get('marketCap'),
+            'avg_volume': info.get('averageVolume'),
+        }
+
+
+class ReplayProvider(MarketDataProvider):
+    """Deterministic provider serving bars from local files.
+
+    ``root`` holds one file per symbol, either ``SYMBOL.npy`` in the bar
+    store layout or ``SYMBOL.csv`` with Date/Open/High/Low/Close/Volume
+    columns, plus an optional ``metadata.json`` mapping symbol to fields.
+    Files are loaded once and then served from memory.
+    """
+
+    name = 'replay'
+
+    def __init__(self, root: str):
+        self.root = root
+        self._bars = {}
+        self._metadata = None
+        self._lock = threading.Lock()
+
+    def _load(self, symbol: str) -> dict | None:
+        if symbol in self._bars:
+            return self._bars[symbol]
+
+        npy_path = os.path.join(self.root, f'{symbol}.npy')
+        csv_path = os.path.join(self.root, f'{symbol}.csv')
+        if os.path.exists(npy_path):
+            matrix = np.load(npy_path)
+            bars = {name: matrix[i] for i, name in enumerate(BAR_COLUMNS)}
+        elif os.path.exists(csv_path):
+            df = pd.read_csv(csv_path, index_col='Date', parse_dates=True)
+            bars = _frame_to_bars(df)
+        else:
+            bars = None
+
+        with self._lock:
+            self._bars[symbol] = bars
+        return bars
+
+    def get_bars(self, symbols: list[str], start: date, end: date, timeout: float = None) -> tuple[dict, dict]:
+        lo_day, hi_day = _to_day(start), _to_day(end)
+        result = {}
+        for symbol in symbols:
+            bars = self._load(symbol)
+            if bars is None:
+                continue
+            lo = np.searchsorted(bars['date'], lo_day)
+            hi = np.searchsorted(bars['date'], hi_day, side='right')
+            result[symbol] = {name: col[lo:hi] for name, col in bars.items()}
+        return result, {}
+
+    def get_metadata(self, symbols: list[str], max_workers: int = 8) -> dict:
+        if self._metadata is None:
+            try:
+                with open(os.path.join(self.root, 'metadata.json')) as f:
+                    self._metadata = json.load(f)
+            except (OSError, ValueError):
+                self._metadata = {}
+
+        unknown = {'sector': 'Unknown', 'industry': None, 'market_cap': None, 'avg_volume': None}
+        return {s: {**unknown, **self._metadata.get(s, {})} for s in symbols}
+
+
+PROVIDERS = {
+    YFinanceProvider.name: YFinanceProvider,
+    ReplayProvider.name: ReplayProvider,
+}
+
+
+def get_provider() -> MarketDataProvider:
+    """Return the provider selected by MARKET_DATA_PROVIDER."""
+    name = current_app.config['MARKET_DATA_PROVIDER']
+    if name not in PROVIDERS:
+        raise ValueError(f'Unknown market data provider: {name!r}')
+
+    key = (name, current_app.config['REPLAY_DATA_DIR'])
+    provider = _providers.get(key)
+    if provider is None:
+        if name == ReplayProvider.name:
+            provider = ReplayProvider(current_app.config['REPLAY_DATA_DIR'])
+        else:
+            provider = PROVIDERS[name]()
+        _providers[key] = provider
+    return provider
+
+
+def _frame_to_bars(df: pd.DataFrame) -> dict:
+    """Convert an OHLCV DataFrame indexed by date into bar column arrays."""
+    df = df.dropna(subset=['Close', 'Open'], how='all')
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return {
+        'date': index.values.astype('datetime64[D]').astype(np.int64),
+        'open': df['Open'].to_numpy(dtype=np.float64),
+        'high': df['High'].to_numpy(dtype=np.float64),
+        'low': df['Low'].to_numpy(dtype=np.float64),
+        'close': df['Close'].to_numpy(dtype=np.float64),
+        'volume': df['Volume'].to_numpy(dtype=np.float64),
+    }
+
+
+def generate_synthetic(root: str, symbols: list[str], start: date, end: date, seed: int = 0):
+    """Write deterministic random-walk bars for symbols into a replay directory."""
+    os.makedirs(root, exist_ok=True)
+    days = pd.bdate_range(start, end).values.astype('datetime64[D]').astype(np.int64)
+    rng = np.random.default_rng(seed)
+    sectors = ('Technology', 'Financial Services', 'Healthcare', 'Energy', 'Industrials')
+
+    metadata = {}
+    for i, symbol in enumerate(symbols):
+        n = len(days)
+        close = np.maximum(100 * np.exp(rng.normal(0, 0.02, n).cumsum()), 1.0)
+        prev = np.concatenate([[close[0]], close[:-1]])
+        opens = prev * (1 + rng.normal(0, 0.02, n))
+        high = np.maximum(opens, close) * (1 + rng.random(n) * 0.01)
+        low = np.minimum(opens, close) * (1 - rng.random(n) * 0.01)
+        volume = rng.integers(100_000, 10_000_000, n).astype(np.float64)
+        np.save(os.path.join(root, f'{symbol}.npy'),
+                np.vstack([days.astype(np.float64), opens, high, low, close, volume]))
+        metadata[symbol] = {'sector': sectors[i % len(sectors)], 'avg_volume': int(volume.mean())}
+
+    with open(os.path.join(root, 'metadata.json'), 'w') as f:
+        json.dump(metadata, f)
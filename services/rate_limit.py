@@ -0,0 +1,169 @@
+"""Rate limiting for third-party API quotas.
+
+A bucket holding ``capacity`` tokens that refills at ``rate`` tokens per
+second can spend at most ``capacity + rate * T`` tokens in any window of
+T seconds. ``TokenBucket.for_quota`` picks the rate so that bound equals
+the quota: callers can never exceed it, and a caller that always has
+work waiting runs right at it.
+
+A ``TokenBucket`` lives in one process. ``SharedQuota`` enforces the same
+quota across every process sharing a cache backend (gunicorn workers, a
+CLI run), with a local bucket pacing each process's own calls.
+"""
+import os
+import random
+import threading
+import time
+from collections import deque
+
+
+class TokenBucket:
+    """Thread-safe token bucket; ``acquire`` blocks until a token is free.
+
+    Every acquisition is recorded, so ``stats`` can show the busiest
+    ``period``-second window next to the quota.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1, period: float = 60, quota: int = None):
+        self.rate = rate
+        self.capacity = capacity
+        self.period = period
+        self.quota = quota
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._window = deque()  # acquisition times within the last period
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.max_in_window = 0
+        self.waited = 0.0
+        self._first = None
+        self._last = None
+
+    @classmethod
+    def for_quota(cls, calls: int, period: float = 60, burst: int = 1) -> 'TokenBucket':
+        """A bucket that never allows more than ``calls`` in any ``period`` seconds.
+
+        ``burst`` calls may go back to back; the remaining ``calls - burst``
+        refill evenly over the period.
+        """
+        if calls < 2:
+            raise ValueError('A quota needs at least 2 calls per period')
+        burst = max(1, min(burst, calls - 1))
+        return cls(rate=(calls - burst) / period, capacity=burst, period=period, quota=calls)
+
+    def acquire(self, timeout: float = None) -> bool:
+        """Take one token, waiting for it if needed. Returns False on timeout."""
+        start = time.monotonic()
+        with self._lock:  # held while sleeping, so waiters are served in turn
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    break
+                wait = (1 - self._tokens) / self.rate
+                if timeout is not None and now + wait - start > timeout:
+                    return False
+                time.sleep(wait)
+            self._tokens -= 1
+            self._record(now, now - start)
+        return True
+
+    def stats(self) -> dict:
+        """Acquisitions so far, the busiest window and the sustained rate. Rates are per period."""
+        with self._lock:
+            span = (self._last - self._first) if self.acquired > 1 else 0
+            # n calls spread over span seconds run at (n - capacity) per span: the first
+            # capacity calls are the initial burst, not throughput
+            sustained = (self.acquired - self.capacity) / span * self.period if span > 0 else None
+            return {
+                'quota': self.quota,
+                'period_s': self.period,
+                'acquired': self.acquired,
+                'max_in_window': self.max_in_window,
+                'sustained_rate': round(sustained, 2) if sustained is not None else None,
+                'utilization': round(sustained / self.quota * 100, 1) if sustained is not None and self.quota else None,
+                'waited_s': round(self.waited, 3),
+            }
+
+    def _record(self, now: float, waited: float):
+        self.acquired += 1
+        self.waited += waited
+        if self._first is None:
+            self._first = now
+        self._last = now
+        self._window.append(now)
+        while self._window[0] <= now - self.period:
+            self._window.popleft()
+        self.max_in_window = max(self.max_in_window, len(self._window))
+
+
+class SharedQuota:
+    """At most ``calls`` acquisitions per ``period`` seconds across all processes sharing ``cache``.
+
+    The quota is ``calls`` slot keys in a shared cache namespace. Acquiring
+    claims a free slot with ``add`` (SET NX) and a TTL of ``period``, so a
+    slot is only reused a full period after it was taken and no window of
+    ``period`` seconds holds more than ``calls`` acquisitions, however many
+    processes draw on it. A local ``TokenBucket`` for the same quota spaces
+    this process's calls out instead of bursting them.
+
+    If the cache backend fails (its ``errors`` counter rises during a
+    claim), calls fall back to the local bucket alone, like any cache
+    error. A refused ``add`` on a working cache means the slot is taken.
+    """
+
+    def __init__(self, cache, calls: int, period: float = 60, burst: int = 1):
+        self.cache = cache
+        self.calls = calls
+        self.period = period
+        self.local = TokenBucket.for_quota(calls, period, burst)
+        self.waited = 0.0  # waiting for a shared slot, on top of the local bucket's wait
+        self.unshared = 0  # calls let through on the local bucket alone
+        self._next = random.Random(os.getpid()).randrange(calls)  # processes start on different slots
+        self._lock = threading.Lock()
+
+    @property
+    def acquired(self) -> int:
+        return self.local.acquired
+
+    def acquire(self, timeout: float = None) -> bool:
+        """Take a local token, then a shared slot, waiting for each. Returns False on timeout."""
+        start = time.monotonic()
+        if not self.local.acquire(timeout):
+            return False
+        claimed_local = time.monotonic()
+        poll = self.period / self.calls  # a slot frees up about this often when the quota is saturated
+        while not self._claim():
+            remaining = None if timeout is None else timeout - (time.monotonic() - start)
+            if remaining is not None and remaining <= 0:
+                return False
+            time.sleep(poll if remaining is None else min(poll, remaining))
+        with self._lock:
+            self.waited += time.monotonic() - claimed_local
+        return True
+
+    def stats(self) -> dict:
+        """The local bucket's stats (this process only) plus shared waiting and fallbacks."""
+        stats = self.local.stats()
+        with self._lock:
+            stats['waited_s'] = round(stats['waited_s'] + self.waited, 3)
+            stats['shared'] = True
+            stats['unshared'] = self.unshared
+        return stats
+
+    def _claim(self) -> bool:
+        with self._lock:
+            first = self._next
+        errors = getattr(self.cache, 'errors', 0)  # the in-process LRUCache never fails
+        for i in range(self.calls):
+            slot = (first + i) % self.calls
+            if self.cache.add(('slot', slot), time.time(), ttl=self.period):
+                with self._lock:
+                    self._next = (slot + 1) % self.calls
+                return True
+        if getattr(self.cache, 'errors', 0) > errors:
+            with self._lock:
+                self.unshared += 1
+            return True
+        return False
@@ -0,0 +1,191 @@
+"""Background jobs that keep the default gap scan, sectors, gap statistics and catalysts warm.
+
+Every gunicorn worker starts its own scheduler, but each run takes an
+exclusive lock on a file in the instance folder and skips when another
+worker holds it or has just written a fresh snapshot. That keeps one scan
+per tick without electing a leader that could vanish on worker restarts.
+"""
+import atexit
+import os
+import time
+from datetime import datetime, timezone
+
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.combining import OrTrigger
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, fine for a single dev server
+    fcntl = None
+
+_scheduler = None
+
+
+def start_scheduler(app) -> BackgroundScheduler | None:
+    """Start the pre-market, intraday snapshot, metadata, gap statistics and catalyst jobs for this process."""
+    global _scheduler
+    if not app.config['SCHEDULER_ENABLED'] or _scheduler is not None:
+        return _scheduler
+
+    tz = app.config['SCHEDULER_TIMEZONE']
+    every = app.config['SCHEDULER_INTERVAL_MINUTES']
+    hour, minute = app.config['SCHEDULER_PREMARKET_TIME'].split(':')
+    catalyst_hour, catalyst_minute = app.config['SCHEDULER_CATALYST_TIME'].split(':')
+    stats_hour, stats_minute = app.config['SCHEDULER_GAP_STATS_TIME'].split(':')
+
+    scheduler = BackgroundScheduler(timezone=tz, job_defaults={'coalesce': True, 'max_instances': 1})
+    # Right away, so the first scans on a cold start already have sectors
+    scheduler.add_job(
+        run_symbol_meta_prefetch, IntervalTrigger(hours=app.config['SCHEDULER_SYMBOL_META_HOURS'], timezone=tz),
+        args=[app], id='symbol-meta', next_run_time=datetime.now(timezone.utc)
+    )
+    scheduler.add_job(
+        run_snapshot_scan, CronTrigger(day_of_week='mon-fri', hour=hour, minute=minute, timezone=tz),
+        args=[app], id='premarket-scan'
+    )
+    # Regular session, 09:30-16:00 Eastern
+    scheduler.add_job(
+        run_snapshot_scan, OrTrigger([
+            CronTrigger(day_of_week='mon-fri', hour=9, minute=f'30-59/{every}', timezone=tz),
+            CronTrigger(day_of_week='mon-fri', hour='10-15', minute=f'*/{every}', timezone=tz),
+            CronTrigger(day_of_week='mon-fri', hour=16, minute=0, timezone=tz),
+        ]),
+        args=[app], id='intraday-scan'
+    )
+    # Yesterday's bars are final, so gaps whose last horizon ended then can be counted
+    scheduler.add_job(
+        run_gap_stats_update, CronTrigger(day_of_week='mon-fri', hour=stats_hour, minute=stats_minute, timezone=tz),
+        args=[app], id='gap-stats'
+    )
+    # After the pre-market scan, so today's gappers are known
+    scheduler.add_job(
+        run_catalyst_ingest,
+        CronTrigger(day_of_week='mon-fri', hour=catalyst_hour, minute=catalyst_minute, timezone=tz),
+        args=[app], id='premarket-catalysts'
+    )
+    scheduler.start()
+    atexit.register(lambda: scheduler.shutdown(wait=False))
+
+    _scheduler = scheduler
+    return scheduler
+
+
+def run_snapshot_scan(app) -> bool:
+    """Refresh the scan snapshot unless another worker is doing or just did it.
+
+    Returns True if this call ran the scan.
+    """
+    from services import gap_scanner
+
+    with app.app_context():
+        path = app.config['SCAN_SNAPSHOT_PATH']
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f'{path}.lock', 'w') as lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return False
+
+            # Another worker finished this tick's scan before we got the lock
+            min_age = app.config['SCHEDULER_INTERVAL_MINUTES'] * 60 / 2
+            try:
+                if time.time() - os.stat(path).st_mtime < min_age:
+                    return False
+            except OSError:
+                pass
+
+            try:
+                info = gap_scanner.refresh_snapshot()
+            except Exception:
+                app.logger.exception('Scheduled gap scan failed')
+                return False
+            app.logger.info('Gap scan snapshot refreshed: %d gaps, %d failed',
+                            info['total_found'], len(info['failed']))
+            return True
+
+
+def run_symbol_meta_prefetch(app) -> dict | None:
+    """Prefetch metadata for the default universe and load this worker's sector map.
+
+    The lock is blocking: one worker fetches while the others wait, then
+    find the metadata fresh and only load it. Returns the prefetch summary,
+    or None on failure.
+    """
+    from services import gap_scanner
+    from services.symbols import DEFAULT_SYMBOLS
+
+    with app.app_context():
+        path = os.path.join(os.path.dirname(app.config['SCAN_SNAPSHOT_PATH']), 'symbol_meta.lock')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+
+            try:
+                result = gap_scanner.warm_sectors(DEFAULT_SYMBOLS)
+            except Exception:
+                app.logger.exception('Symbol metadata prefetch failed')
+                return None
+            if result['refreshed']:
+                app.logger.info('Symbol metadata prefetched for %d of %d symbols',
+                                result['refreshed'], result['symbols'])
+            return result
+
+
+def run_catalyst_ingest(app, symbols: list[str] = None) -> dict | None:
+    """Ingest catalysts for symbols (default: gappers and watchlist) unless another process is.
+
+    The lock covers the whole run, so two workers never fetch the same
+    symbols at once; the Finnhub quota itself is shared by every process
+    through the catalyst limiter. Returns the run metrics, or None if skipped.
+    """
+    from services import catalysts
+
+    with app.app_context():
+        path = os.path.join(os.path.dirname(app.config['SCAN_SNAPSHOT_PATH']), 'catalysts.lock')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return None
+
+            try:
+                run = catalysts.ingest(symbols if symbols is not None else catalysts.ingest_symbols())
+            except Exception:
+                app.logger.exception('Catalyst ingest failed')
+                return None
+            app.logger.info('Catalysts ingested for %d symbols: %d new, %d updated, %d errors',
+                            run['symbols'], run['inserted'], run['updated'], run['error_count'])
+            return run
+
+
+def run_gap_stats_update(app) -> dict | None:
+    """Add newly completed gaps to the fill statistics unless another process is.
+
+    Returns the update summary, or None if skipped.
+    """
+    from services import gap_stats
+
+    with app.app_context():
+        path = os.path.join(app.config['GAP_STATS_DIR'], 'update.lock')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return None
+
+            try:
+                result = gap_stats.update()
+            except Exception:
+                app.logger.exception('Gap statistics update failed')
+                return None
+            app.logger.info('Gap statistics updated: %d gaps added for %d symbols, %d failed',
+                            result['gaps_added'], result['symbols'], len(result['failed']))
+            return result
@@ -0,0 +1,164 @@
+"""Single-flight coalescing of identical concurrent computations.
+
+The first caller for a key becomes the leader and runs the computation,
+publishing its result in parts as they become available. Callers that
+arrive while it runs follow the same flight: they receive every part
+published so far and then each new one, so a streaming follower is no
+slower than the leader. If the leader gives up (a streaming client
+disconnected) or a follower times out, the follower gets back only what
+was published and finishes the rest itself.
+
+Each key records how many computations ran, how many callers were
+coalesced onto them and how long both took, so upstream call volume can
+be checked against concurrent demand.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class Flight:
+    """One in-progress computation that other callers can follow."""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.started = time.perf_counter()
+        self.parts = []
+        self.done = False
+        self.error = None  # exception the leader raised, re-raised in followers
+        self._cond = threading.Condition()
+
+    def publish(self, part):
+        with self._cond:
+            self.parts.append(part)
+            self._cond.notify_all()
+
+    def follow(self, timeout: float):
+        """Yield parts as the leader publishes them, until it finishes or timeout passes."""
+        deadline = time.monotonic() + timeout
+        seen = 0
+        while True:
+            with self._cond:
+                while seen == len(self.parts) and not self.done:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return
+                    self._cond.wait(remaining)
+                parts, done, error = self.parts[seen:], self.done, self.error
+            seen += len(parts)
+            yield from parts
+            if done:
+                if error is not None:
+                    raise error
+                return
+
+    def _finish(self, error: Exception = None):
+        with self._cond:
+            self.done = True
+            self.error = error
+            self._cond.notify_all()
+
+
+class SingleFlight:
+    """A table of in-flight computations keyed by normalized request parameters."""
+
+    def __init__(self, timeout: float = 120, max_keys: int = 256):
+        self.timeout = timeout
+        self.max_keys = max_keys
+        self._flights = {}
+        self._metrics = OrderedDict()  # label -> counters, least recently used first
+        self._lock = threading.Lock()
+
+    def join(self, key, label: str = None) -> tuple[Flight, bool]:
+        """Return (flight, is_leader). A leader must call ``finish`` exactly once."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Flight(label or repr(key)[:80])
+            self._record(flight.label, 'computations' if leader else 'coalesced')
+        return flight, leader
+
+    def finish(self, key, flight: Flight, error: Exception = None, abandoned: bool = False):
+        """Release followers. ``abandoned`` means the leader stopped early without an error."""
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            metrics = self._record(flight.label, 'abandoned' if abandoned else 'errors' if error else 'finished')
+            elapsed = (time.perf_counter() - flight.started) * 1000
+            metrics['total_ms'] += elapsed
+            metrics['max_ms'] = max(metrics['max_ms'], elapsed)
+            metrics['last_ms'] = elapsed
+        flight._finish(error)
+
+    def follow(self, flight: Flight):
+        """Yield a flight's parts as a follower, recording how long this caller waited."""
+        start, timed_out = time.perf_counter(), False
+        try:
+            yield from flight.follow(self.timeout)
+            timed_out = not flight.done  # not reached if the caller stopped early or the leader failed
+        finally:
+            with self._lock:
+                metrics = self._record(flight.label, 'timeouts' if timed_out else None)
+                metrics['wait_ms'] += (time.perf_counter() - start) * 1000
+
+    def do(self, key, fn, label: str = None):
+        """Run fn() once for all concurrent callers with the same key and return its result."""
+        flight, leader = self.join(key, label)
+        if not leader:
+            for result in self.follow(flight):
+                return result
+            return fn()  # leader gave up or timed out
+        try:
+            result = fn()
+        except Exception as e:
+            self.finish(key, flight, error=e)
+            raise
+        except BaseException:
+            self.finish(key, flight, abandoned=True)
+            raise
+        flight.publish(result)
+        self.finish(key, flight)
+        return result
+
+    def stats(self) -> dict:
+        """Per-key counters plus totals. Times are in milliseconds."""
+        with self._lock:
+            keys = {}
+            for label, m in self._metrics.items():
+                runs = m['finished'] + m['errors'] + m['abandoned']
+                keys[label] = {
+                    'computations': m['computations'],
+                    'coalesced': m['coalesced'],
+                    'errors': m['errors'],
+                    'abandoned': m['abandoned'],
+                    'timeouts': m['timeouts'],
+                    'avg_ms': round(m['total_ms'] / runs, 1) if runs else None,
+                    'max_ms': round(m['max_ms'], 1),
+                    'last_ms': round(m['last_ms'], 1),
+                    'avg_wait_ms': round(m['wait_ms'] / m['coalesced'], 1) if m['coalesced'] else None,
+                }
+            computations = sum(k['computations'] for k in keys.values())
+            coalesced = sum(k['coalesced'] for k in keys.values())
+            return {
+                'in_flight': len(self._flights),
+                'computations': computations,
+                'coalesced': coalesced,
+                'coalesced_rate': round(coalesced / (computations + coalesced) * 100, 1) if computations else 0,
+                'keys': keys,
+            }
+
+    def _record(self, label: str, counter: str = None) -> dict:
+        """Return the metrics for label (marking it recently used), optionally incrementing a counter."""
+        metrics = self._metrics.get(label)
+        if metrics is None:
+            metrics = self._metrics[label] = dict.fromkeys(
+                ('computations', 'coalesced', 'finished', 'errors', 'abandoned', 'timeouts',
+                 'total_ms', 'max_ms', 'last_ms', 'wait_ms'), 0
+            )
+            while len(self._metrics) > self.max_keys:
+                self._metrics.popitem(last=False)
+        self._metrics.move_to_end(label)
+        if counter:
+            metrics[counter] += 1
+        return metrics
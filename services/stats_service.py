@@ -1,18 +1,40 @@
-from datetime import datetime, timedelta, timezone
-from collections import defaultdict
-from models import Trade
+from datetime import date, datetime, timedelta, timezone
+import pandas as pd
+from flask import current_app
+from sqlalchemy import case, func, literal_column
+from models import db, Trade
+from services import data_version, trade_aggregates
+from services.cache import make_cache
+
+# P&L series bucket -> pandas frequency of bucket start dates
+PERIODS = {'daily': 'D', 'weekly': 'W-MON', 'monthly': 'MS'}
+
+# Dimensions accepted by get_breakdown
+DIMENSIONS = {
+    'gap_type': Trade.gap_type,
+    'catalyst_type': Trade.catalyst_type,
+    'setup_rating': Trade.setup_rating,
+    'direction': Trade.direction,
+    'symbol': Trade.symbol,
+    'trading_mode': Trade.trading_mode,
+    'source': Trade.source,
+}
+
+# P&L series keyed by (period, days, day, trades data version)
+_series_cache = None
 
 
 def get_summary() -> dict:
     """Calculate overall trading performance summary."""
-    trades = Trade.query.all()
-    closed = [t for t in trades if t.status == 'closed']
-    open_trades = [t for t in trades if t.status == 'open']
+    return summarize(trade_aggregates.get('all'))
 
-    if not closed:
+
+def summarize(agg) -> dict:
+    """Build the summary dict from TradeAggregate columns."""
+    if not agg.closed_count:
         return {
-            'total_trades': len(trades),
-            'open_trades': len(open_trades),
+            'total_trades': agg.trade_count,
+            'open_trades': agg.open_count,
             'closed_trades': 0,
             'win_rate': 0,
             'total_pnl': 0,
@@ -26,101 +48,177 @@ def get_summary() -> dict:
             'max_consecutive_losses': 0
         }
 
-    winners = [t for t in closed if t.pnl and t.pnl > 0]
-    losers = [t for t in closed if t.pnl and t.pnl < 0]
-    pnls = [t.pnl for t in closed if t.pnl is not None]
-
-    total_pnl = sum(pnls)
-    total_wins = sum(t.pnl for t in winners)
-    total_losses = abs(sum(t.pnl for t in losers)) if losers else 0
-
-    # Consecutive wins/losses
-    sorted_closed = sorted(closed, key=lambda t: t.exit_date or t.entry_date)
-    max_wins, max_losses, cur_wins, cur_losses = 0, 0, 0, 0
-    for t in sorted_closed:
-        if t.pnl and t.pnl > 0:
-            cur_wins += 1
-            cur_losses = 0
-            max_wins = max(max_wins, cur_wins)
-        elif t.pnl and t.pnl < 0:
-            cur_losses += 1
-            cur_wins = 0
-            max_losses = max(max_losses, cur_losses)
+    total_pnl = agg.total_pnl if agg.pnl_count else 0
+    total_wins = agg.total_wins if agg.winner_count else 0
+    total_losses = abs(agg.total_losses) if agg.loser_count else 0
 
     return {
-        'total_trades': len(trades),
-        'open_trades': len(open_trades),
-        'closed_trades': len(closed),
-        'win_rate': round(len(winners) / len(closed) * 100, 1) if closed else 0,
+        'total_trades': agg.trade_count,
+        'open_trades': agg.open_count,
+        'closed_trades': agg.closed_count,
+        'win_rate': round(agg.winner_count / agg.closed_count * 100, 1),
         'total_pnl': round(total_pnl, 2),
-        'avg_pnl': round(total_pnl / len(closed), 2) if closed else 0,
-        'best_trade': round(max(pnls), 2) if pnls else 0,
-        'worst_trade': round(min(pnls), 2) if pnls else 0,
-        'avg_winner': round(total_wins / len(winners), 2) if winners else 0,
-        'avg_loser': round(-total_losses / len(losers), 2) if losers else 0,
+        'avg_pnl': round(total_pnl / agg.closed_count, 2),
+        'best_trade': round(agg.best_pnl, 2) if agg.best_pnl is not None else 0,
+        'worst_trade': round(agg.worst_pnl, 2) if agg.worst_pnl is not None else 0,
+        'avg_winner': round(total_wins / agg.winner_count, 2) if agg.winner_count else 0,
+        'avg_loser': round(-total_losses / agg.loser_count, 2) if agg.loser_count else 0,
         'profit_factor': round(total_wins / total_losses, 2) if total_losses > 0 else 0,
-        'max_consecutive_wins': max_wins,
-        'max_consecutive_losses': max_losses
+        'max_consecutive_wins': agg.max_wins,
+        'max_consecutive_losses': agg.max_losses
     }
 
 
 def get_pnl_series(period: str = 'daily', days: int = 30) -> dict:
-    """Get P&L time series for charting."""
-    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
-    closed = Trade.query.filter(
+    """Get P&L time series for charting, bucketed by day, week (Monday) or month.
+
+    Results are cached per (period, days, day, trades data version), so any
+    trade change invalidates them.
+    """
+    today = datetime.now(timezone.utc).date()
+    key = (period, days, today, data_version.get('trades'))
+    series = get_series_cache().get(key)
+    if series is None:
+        series = _compute_pnl_series(period, today - timedelta(days=days), today)
+        get_series_cache().set(key, series)
+    return series
+
+
+def get_series_cache():
+    """Return the P&L series cache on the configured backend, sized from app config."""
+    global _series_cache
+    if _series_cache is None:
+        _series_cache = make_cache('pnl_series', current_app.config['STATS_CACHE_SIZE'])
+    return _series_cache
+
+
+def _compute_pnl_series(period: str, start: date, end: date) -> dict:
+    bucket = _bucket(Trade.exit_date, period).label('bucket')
+    rows = db.session.query(bucket, func.sum(Trade.pnl)).filter(
         Trade.status == 'closed',
-        Trade.exit_date >= cutoff
-    ).order_by(Trade.exit_date).all()
-
-    # Group by date
-    daily_pnl = defaultdict(float)
-    for t in closed:
-        if t.exit_date and t.pnl is not None:
-            date_key = t.exit_date.strftime('%Y-%m-%d')
-            daily_pnl[date_key] += t.pnl
-
-    # Build series with all dates
-    labels = []
-    daily_values = []
-    cumulative = []
-    running_total = 0
-
-    current = cutoff.date()
-    end = datetime.now(timezone.utc).date()
-    while current <= end:
-        date_str = current.strftime('%Y-%m-%d')
-        pnl = round(daily_pnl.get(date_str, 0), 2)
-        running_total = round(running_total + pnl, 2)
-
-        labels.append(date_str)
-        daily_values.append(pnl)
-        cumulative.append(running_total)
-        current += timedelta(days=1)
-
-    return {
-        'labels': labels,
-        'cumulative_pnl': cumulative,
-        'daily_pnl': daily_values
+        Trade.exit_date >= datetime.combine(start, datetime.min.time()),
+        Trade.pnl.isnot(None)
+    ).group_by(bucket).all()
+
+    # Gap-fill every bucket from the one containing start through today
+    if period == 'weekly':
+        start -= timedelta(days=start.weekday())
+    elif period == 'monthly':
+        start = start.replace(day=1)
+    index = pd.date_range(start, end, freq=PERIODS[period])
+    pnl = pd.Series({pd.Timestamp(b): total for b, total in rows}, dtype='float64')
+    pnl = pnl.reindex(index, fill_value=0.0).round(2)
+
+    series = {
+        'period': period,
+        'labels': list(index.strftime('%Y-%m' if period == 'monthly' else '%Y-%m-%d')),
+        'cumulative_pnl': pnl.cumsum().round(2).tolist(),
+        'period_pnl': pnl.tolist()
     }
+    if period == 'daily':
+        series['daily_pnl'] = series['period_pnl']  # the key clients used before periods existed
+    return series
+
+
+def _bucket(column, period: str):
+    """SQL expression truncating a datetime column to the start of its bucket."""
+    if _dialect() == 'postgresql':
+        if period == 'daily':
+            return func.date(column)
+        unit = literal_column("'week'" if period == 'weekly' else "'month'")  # inlined so GROUP BY matches
+        return func.date(func.date_trunc(unit, column))
+
+    # SQLite: 'weekday 0' moves forward to Sunday, so -6 days lands on Monday
+    if period == 'weekly':
+        return func.date(column, 'weekday 0', '-6 days')
+    if period == 'monthly':
+        return func.date(column, 'start of month')
+    return func.date(column)
 
 
 def get_by_gap_type() -> dict:
     """Get performance breakdown by gap type."""
     result = {}
     for gap_type in ('gap_up', 'gap_down'):
-        closed = Trade.query.filter_by(status='closed', gap_type=gap_type).all()
-        if not closed:
+        agg = trade_aggregates.get(gap_type)
+        if not agg.closed_count:
             result[gap_type] = {'count': 0, 'win_rate': 0, 'avg_pnl': 0, 'total_pnl': 0}
             continue
 
-        winners = [t for t in closed if t.pnl and t.pnl > 0]
-        pnls = [t.pnl for t in closed if t.pnl is not None]
-
         result[gap_type] = {
-            'count': len(closed),
-            'win_rate': round(len(winners) / len(closed) * 100, 1),
-            'avg_pnl': round(sum(pnls) / len(pnls), 2) if pnls else 0,
-            'total_pnl': round(sum(pnls), 2) if pnls else 0
+            'count': agg.closed_count,
+            'win_rate': round(agg.winner_count / agg.closed_count * 100, 1),
+            'avg_pnl': round(agg.total_pnl / agg.pnl_count, 2) if agg.pnl_count else 0,
+            'total_pnl': round(agg.total_pnl, 2) if agg.pnl_count else 0
         }
 
     return result
+
+
+def get_breakdown(dims: list[str]) -> list[dict]:
+    """Closed-trade performance grouped by any combination of DIMENSIONS.
+
+    Returns detail rows plus ROLLUP subtotals in one query. ``level`` is
+    the number of leading dims a row is grouped by (0 is the grand total);
+    rolled-up dims are None.
+    """
+    columns = [DIMENSIONS[d] for d in dims]
+    measures = (
+        func.count(Trade.id),
+        func.count(case((Trade.pnl > 0, 1))),
+        func.count(Trade.pnl),
+        func.sum(Trade.pnl),
+    )
+    query = db.session.query(*columns, *measures).filter(Trade.status == 'closed')
+
+    if not dims:
+        groups = [((), 0, tuple(query.one()))]
+    elif _dialect() == 'postgresql':
+        flags = [func.grouping(c) for c in columns]
+        rows = query.add_columns(*flags).group_by(func.rollup(*columns)).all()
+        n = len(dims)
+        groups = [(row[:n], n - sum(row[-n:]), tuple(row[n:-n])) for row in rows]
+    else:
+        rows = query.group_by(*columns).all()
+        groups = _rollup(rows, len(dims))
+
+    results = []
+    for keys, level, (count, winners, pnl_count, total_pnl) in groups:
+        result = {d: (keys[i] if i < level else None) for i, d in enumerate(dims)}
+        result.update({
+            'level': level,
+            'count': count,
+            'winners': winners,
+            'win_rate': round(winners / count * 100, 1) if count else 0,
+            'total_pnl': round(total_pnl, 2) if pnl_count else 0,
+            'avg_pnl': round(total_pnl / pnl_count, 2) if pnl_count else 0
+        })
+        results.append(result)
+
+    # Group members first, each subtotal right after its group
+    results.sort(key=lambda r: [(i >= r['level'], r[d] is None, r[d] if r[d] is not None else 0)
+                                for i, d in enumerate(dims)])
+    return results
+
+
+def _rollup(rows, n: int) -> list[tuple]:
+    """ROLLUP subtotals for databases without it (SQLite), from the detail rows.
+
+    Returns (keys, level, (count, winners, pnl_count, total_pnl)) per group.
+    """
+    groups = []
+    for level in range(n, -1, -1):
+        totals = {}
+        for row in rows:
+            key = tuple(row[:level])
+            count, winners, pnl_count, total_pnl = totals.get(key, (0, 0, 0, 0.0))
+            totals[key] = (count + row[n], winners + row[n + 1], pnl_count + row[n + 2],
+                           total_pnl + (row[n + 3] or 0.0))
+        if level == 0 and not totals:
+            totals[()] = (0, 0, 0, None)
+        groups.extend((key, level, measures) for key, measures in totals.items())
+    return groups
+
+
+def _dialect() -> str:
+    return db.session.get_bind().dialect.name
@@ -0,0 +1,111 @@
+"""Bulk symbol metadata (sector, industry, market cap, average volume).
+
+Metadata is fetched in bulk from the market data provider (through a
+bounded thread pool for yfinance) and persisted in the SymbolMeta table,
+so a restarted worker can load it in one query instead of looking
+symbols up one by one.
+"""
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from models import db, SymbolMeta
+from services.cache import make_cache
+from services.market_data import get_provider
+
+# Symbols with a refresh currently running in a background thread
+_inflight = set()
+_inflight_lock = threading.Lock()
+
+# Symbol batches claimed for refresh by any worker, so workers don't fetch the same batch
+_claims = None
+
+
+def fetch_metadata(symbols: list[str]) -> dict:
+    """Fetch metadata for symbols from the provider. Returns {symbol: fields}."""
+    return get_provider().get_metadata(symbols, max_workers=current_app.config['SYMBOL_META_WORKERS'])
+
+
+def refresh(symbols: list[str]) -> dict:
+    """Fetch metadata for symbols and bulk-upsert it into SymbolMeta."""
+    fetched = fetch_metadata(symbols)
+
+    now = datetime.now(timezone.utc)
+    existing = {m.symbol: m for m in SymbolMeta.query.filter(SymbolMeta.symbol.in_(list(fetched)))}
+    for symbol, fields in fetched.items():
+        meta = existing.get(symbol)
+        if meta is None:
+            meta = SymbolMeta(symbol=symbol)
+            db.session.add(meta)
+        for name, value in fields.items():
+            setattr(meta, name, value)
+        meta.updated_at = now
+    db.session.commit()
+    return fetched
+
+
+def refresh_in_background(symbols: list[str], on_done=None) -> bool:
+    """Refresh symbols in a daemon thread without blocking the caller.
+
+    Symbols already being refreshed in this process are skipped, and so is
+    a batch another worker claimed in the shared cache within the last
+    SYMBOL_META_RELOAD seconds (this worker picks up its results on the
+    next sector reload). ``on_done`` receives the fetched {symbol: fields}
+    dict. Returns True if a refresh was started.
+    """
+    with _inflight_lock:
+        pending = [s for s in dict.fromkeys(symbols) if s not in _inflight]
+        _inflight.update(pending)
+    if not pending:
+        return False
+
+    claim = tuple(sorted(pending))
+    if not _get_claims().add(claim, os.getpid(), ttl=current_app.config['SYMBOL_META_RELOAD']):
+        with _inflight_lock:
+            _inflight.difference_update(pending)
+        return False
+
+    app = current_app._get_current_object()
+
+    def run():
+        try:
+            with app.app_context():
+                fetched = refresh(pending)
+            if on_done:
+                on_done(fetched)
+        except Exception:
+            app.logger.exception('Symbol metadata refresh failed')
+            _get_claims().delete(claim)  # let the next request retry
+        finally:
+            with _inflight_lock:
+                _inflight.difference_update(pending)
+
+    threading.Thread(target=run, name='symbol-meta-refresh', daemon=True).start()
+    return True
+
+
+def load_sectors(symbols: list[str] = None) -> tuple[dict, list[str]]:
+    """Load sectors in one query.
+
+    Returns ({symbol: sector}, stale) where stale lists the requested
+    symbols that are missing or older than SYMBOL_META_MAX_AGE.
+    """
+    rows = db.session.query(SymbolMeta.symbol, SymbolMeta.sector, SymbolMeta.updated_at).all()
+
+    max_age = timedelta(seconds=current_app.config['SYMBOL_META_MAX_AGE'])
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - max_age
+    sectors, updated = {}, {}
+    for symbol, sector, updated_at in rows:
+        sectors[symbol] = sector or 'Unknown'
+        updated[symbol] = updated_at.replace(tzinfo=None)
+
+    stale = [s for s in (symbols or []) if s not in updated or updated[s] < cutoff]
+    return sectors, stale
+
+
+def _get_claims():
+    global _claims
+    if _claims is None:
+        _claims = make_cache('symbol_meta_claims', maxsize=256)
+    return _claims
@@ -0,0 +1,288 @@
+"""Materialized performance aggregates, overall and per gap type.
+
+One TradeAggregate row per scope holds the counts, P&L sums, extremes and
+win/loss streak state behind the performance summary, so reading it is a
+single-row lookup. Rows are updated in the same transaction as the trade
+change that affects them. Changes that cannot be applied incrementally
+(removing a closed trade, or closing one dated before the latest win/loss)
+recompute the affected scopes from the trades table instead.
+"""
+import math
+from datetime import datetime, timezone
+
+from sqlalchemy import case, func
+from models import db, Trade, TradeAggregate
+
+SCOPES = ('all', 'gap_up', 'gap_down')
+
+
+def get(scope: str = 'all') -> TradeAggregate:
+    """Return the aggregate row for scope, building all rows on first use."""
+    agg = TradeAggregate.query.filter_by(scope=scope).first()
+    if agg is None:
+        rebuild()
+        db.session.commit()
+        agg = TradeAggregate.query.filter_by(scope=scope).first()
+    return agg
+
+
+def trade_opened(trade):
+    """Count a newly added trade."""
+    def update(agg):
+        agg.trade_count += 1
+        if trade.status == 'open':
+            agg.open_count += 1
+        elif trade.status == 'closed':
+            agg.closed_count += 1
+            return _add_closed(agg, trade)
+        return True
+    _apply(trade, update)
+
+
+def trade_closed(trade, previous_status: str):
+    """Fold a just-closed trade into the totals and streak state."""
+    def update(agg):
+        if previous_status != 'open':
+            return False
+        agg.open_count -= 1
+        agg.closed_count += 1
+        return _add_closed(agg, trade)
+    _apply(trade, update)
+
+
+def trades_closed(trades: list):
+    """Fold a batch of trades that were all open into the totals.
+
+    ``trades`` may be any objects with the Trade attributes the update
+    reads (id, gap_type, pnl, entry_date, exit_date); the bulk close path
+    passes lightweight rows rather than ORM instances.
+    """
+    trades = sorted(trades, key=lambda t: ((t.exit_date or t.entry_date).replace(tzinfo=None), t.id))
+    db.session.flush()
+    rows = TradeAggregate.query.filter(TradeAggregate.scope.in_(SCOPES)).with_for_update().all()
+    if len(rows) < len(SCOPES):
+        rebuild()
+        return
+
+    for agg in rows:
+        members = trades if agg.scope == 'all' else [t for t in trades if t.gap_type == agg.scope]
+        if not members:
+            continue
+        agg.open_count -= len(members)
+        agg.closed_count += len(members)
+        if all(_add_closed(agg, t) for t in members):
+            _touch(agg)
+        else:
+            _recompute(agg)
+
+
+def trade_cancelled(trade, previous_status: str):
+    def update(agg):
+        if previous_status == 'open':
+            agg.open_count -= 1
+        return previous_status != 'closed'
+    _apply(trade, update)
+
+
+def trade_deleted(trade):
+    """Remove a trade that has been deleted in the current session."""
+    def update(agg):
+        agg.trade_count -= 1
+        if trade.status == 'open':
+            agg.open_count -= 1
+        return trade.status != 'closed'
+    _apply(trade, update)
+
+
+def compute(scope: str) -> dict:
+    """Compute a scope's aggregate columns from the trades table."""
+    criteria = [] if scope == 'all' else [Trade.gap_type == scope]
+    totals = _totals(*criteria)
+    max_wins, max_losses = _max_streaks(*criteria)
+    return {
+        **totals,
+        'max_wins': max_wins,
+        'max_losses': max_losses,
+        **_current_streak(*criteria),
+    }
+
+
+def rebuild():
+    """Recompute every scope from scratch. The caller commits."""
+    for scope in SCOPES:
+        agg = TradeAggregate.query.filter_by(scope=scope).with_for_update().first()
+        if agg is None:
+            agg = TradeAggregate(scope=scope, version=0)
+            db.session.add(agg)
+        _recompute(agg)
+
+
+def verify() -> dict:
+    """Compare stored rows with a fresh computation.
+
+    Returns {scope: {column: (stored, computed)}} for columns that differ
+    (a missing row shows up as a 'scope' difference); an empty dict means
+    the table is consistent.
+    """
+    drift = {}
+    for scope in SCOPES:
+        agg = TradeAggregate.query.filter_by(scope=scope).first()
+        if agg is None:
+            drift[scope] = {'scope': (None, scope)}
+            continue
+        stored = agg.to_dict()
+        diffs = {}
+        for name, value in compute(scope).items():
+            if name == 'last_decided_at' and value is not None:
+                value = value.isoformat()
+            if not _same(stored[name], value):
+                diffs[name] = (stored[name], value)
+        if diffs:
+            drift[scope] = diffs
+    return drift
+
+
+def _apply(trade, update):
+    """Run update on the 'all' and gap-type rows, recomputing where it returns False."""
+    db.session.flush()
+    rows = TradeAggregate.query.filter(
+        TradeAggregate.scope.in_(('all', trade.gap_type))
+    ).with_for_update().all()
+    if len(rows) < 2:
+        rebuild()  # first write; the rebuild already reflects the flushed change
+        return
+
+    for agg in rows:
+        if update(agg):
+            _touch(agg)
+        else:
+            _recompute(agg)
+
+
+def _add_closed(agg, trade) -> bool:
+    pnl = trade.pnl
+    if pnl is None:
+        return True
+
+    agg.pnl_count += 1
+    agg.total_pnl += pnl
+    agg.best_pnl = pnl if agg.best_pnl is None else max(agg.best_pnl, pnl)
+    agg.worst_pnl = pnl if agg.worst_pnl is None else min(agg.worst_pnl, pnl)
+    if pnl > 0:
+        agg.winner_count += 1
+        agg.total_wins += pnl
+    elif pnl < 0:
+        agg.loser_count += 1
+        agg.total_losses += pnl
+    else:
+        return True
+
+    # Streaks run in close-date order; an earlier-dated close reorders them
+    closed_at = (trade.exit_date or trade.entry_date).replace(tzinfo=None)
+    if agg.last_decided_at is not None and (closed_at, trade.id) < (agg.last_decided_at, agg.last_decided_id):
+        return False
+
+    if pnl > 0:
+        agg.current_wins += 1
+        agg.current_losses = 0
+        agg.max_wins = max(agg.max_wins, agg.current_wins)
+    else:
+        agg.current_losses += 1
+        agg.current_wins = 0
+        agg.max_losses = max(agg.max_losses, agg.current_losses)
+    agg.last_decided_at, agg.last_decided_id = closed_at, trade.id
+    return True
+
+
+def _recompute(agg):
+    for name, value in compute(agg.scope).items():
+        setattr(agg, name, value)
+    _touch(agg)
+
+
+def _touch(agg):
+    agg.version = (agg.version or 0) + 1
+    agg.updated_at = datetime.now(timezone.utc)
+
+
+def _same(a, b) -> bool:
+    if isinstance(a, float) or isinstance(b, float):
+        return a is not None and b is not None and math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6)
+    return a == b
+
+
+def _totals(*criteria) -> dict:
+    """Counts and P&L sums for trades matching criteria, in a single aggregate query."""
+    closed = Trade.status == 'closed'
+    won = closed & (Trade.pnl > 0)
+    lost = closed & (Trade.pnl < 0)
+    row = db.session.query(
+        func.count(Trade.id).label('trade_count'),
+        func.count(case((Trade.status == 'open', 1))).label('open_count'),
+        func.count(case((closed, 1))).label('closed_count'),
+        func.count(case((won, 1))).label('winner_count'),
+        func.count(case((lost, 1))).label('loser_count'),
+        func.count(case((closed, Trade.pnl))).label('pnl_count'),
+        func.sum(case((closed, Trade.pnl))).label('total_pnl'),
+        func.sum(case((won, Trade.pnl))).label('total_wins'),
+        func.sum(case((lost, Trade.pnl))).label('total_losses'),
+        func.max(case((closed, Trade.pnl))).label('best_pnl'),
+        func.min(case((closed, Trade.pnl))).label('worst_pnl'),
+    ).filter(*criteria).one()
+
+    totals = row._asdict()
+    for name in ('total_pnl', 'total_wins', 'total_losses'):
+        totals[name] = totals[name] or 0.0
+    return totals
+
+
+def _decided(*criteria):
+    """Closed winning/losing trades with their outcome and streak ordering key."""
+    won = case((Trade.pnl > 0, 1), else_=0).label('won')
+    closed_at = func.coalesce(Trade.exit_date, Trade.entry_date)
+    query = db.session.query(won, closed_at.label('closed_at'), Trade.id).filter(
+        Trade.status == 'closed', Trade.pnl != 0, *criteria
+    )
+    return query, won, (closed_at, Trade.id)
+
+
+def _max_streaks(*criteria) -> tuple[int, int]:
+    """Longest runs of consecutive winning and losing closed trades.
+
+    Trades are ordered by close date (entry date if never exited), then id.
+    Runs are found with the gaps-and-islands trick: within a run, the
+    overall row number and the row number among same-outcome trades
+    advance together.
+    """
+    query, won, order = _decided(*criteria)
+    decided = query.with_entities(
+        won,
+        (func.row_number().over(order_by=order)
+         - func.row_number().over(partition_by=won, order_by=order)).label('island')
+    ).subquery()
+
+    runs = db.session.query(
+        decided.c.won, func.count().label('length')
+    ).group_by(decided.c.won, decided.c.island).subquery()
+
+    longest = dict(db.session.query(runs.c.won, func.max(runs.c.length)).group_by(runs.c.won).all())
+    return longest.get(1, 0), longest.get(0, 0)
+
+
+def _current_streak(*criteria) -> dict:
+    """The run the latest win/loss belongs to, walking back from the newest."""
+    query, _, (closed_at, trade_id) = _decided(*criteria)
+    state = {'current_wins': 0, 'current_losses': 0, 'last_decided_at': None, 'last_decided_id': None}
+
+    length, outcome = 0, None
+    for won, at, id_ in query.order_by(closed_at.desc(), trade_id.desc()).yield_per(100):
+        if outcome is None:
+            outcome = won
+            state['last_decided_at'], state['last_decided_id'] = at, id_
+        elif won != outcome:
+            break
+        length += 1
+
+    if outcome is not None:
+        state['current_wins' if outcome else 'current_losses'] = length
+    return state
@@ -0,0 +1,194 @@
+"""Bulk trade import and streamed export (CSV, NDJSON, JSON).
+
+Imports validate rows batch by batch, compute P&L for closed rows with
+``compute_pnl_bulk`` and insert each batch with one executemany. The
+whole import is one transaction, together with the aggregates rebuild,
+so a failure never leaves half a statement in the journal.
+"""
+import csv
+import io
+import json
+from datetime import datetime, timezone
+
+from flask import current_app
+from models import db, list_columns, row_dicts, Trade
+from services import data_version, trade_aggregates
+from services.trade_service import compute_pnl_bulk
+
+FORMATS = ('csv', 'ndjson', 'json')
+
+# Columns written by exports; imports accept the same names
+EXPORT_FIELDS = (
+    'id', 'symbol', 'direction', 'entry_price', 'exit_price', 'quantity', 'entry_date', 'exit_date',
+    'status', 'pnl', 'pnl_percent', 'notes', 'gap_type', 'gap_percent', 'setup_rating', 'ib_order_id',
+    'catalyst_id', 'catalyst_type', 'stop_loss', 'take_profit', 'source', 'trading_mode',
+)
+
+
+def read_rows(stream, fmt: str):
+    """Yield raw row dicts from a binary request stream."""
+    if fmt == 'json':
+        data = json.load(stream)
+        yield from (data['trades'] if isinstance(data, dict) else data)
+        return
+
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='' if fmt == 'csv' else None)
+    if fmt == 'csv':
+        for row in csv.DictReader(text):
+            yield {k.strip(): (v.strip() or None) if isinstance(v, str) else v for k, v in row.items() if k}
+    else:
+        for line in text:
+            if line.strip():
+                yield json.loads(line)
+
+
+def import_trades(rows, dry_run: bool = False) -> dict:
+    """Validate and insert rows in batches.
+
+    Returns {'imported', 'failed', 'errors'} where errors lists
+    {'row': n, 'errors': [...]} for rows that were skipped (1-based,
+    capped at IMPORT_MAX_ERRORS entries).
+    """
+    batch_size = current_app.config['IMPORT_BATCH_SIZE']
+    max_errors = current_app.config['IMPORT_MAX_ERRORS']
+    imported, failed, errors = 0, 0, []
+
+    batch = []
+    for n, raw in enumerate(rows, start=1):
+        if isinstance(raw, dict):
+            fields, row_errors = _validate(raw)
+        else:
+            fields, row_errors = None, ['row must be an object']
+        if row_errors:
+            failed += 1
+            if len(errors) < max_errors:
+                errors.append({'row': n, 'errors': row_errors})
+            continue
+
+        batch.append(fields)
+        if len(batch) >= batch_size:
+            imported += _insert_batch(batch, dry_run)
+            batch = []
+    imported += _insert_batch(batch, dry_run)
+
+    if dry_run or not imported:
+        db.session.rollback()
+    else:
+        trade_aggregates.rebuild()
+        data_version.bump('trades')
+        db.session.commit()
+    return {'imported': imported, 'failed': failed, 'errors': errors}
+
+
+def export_rows(query, fmt: str):
+    """Yield a filtered journal as CSV or NDJSON text chunks.
+
+    Trades are read through a server-side cursor in chunks of
+    EXPORT_CHUNK_SIZE, so memory stays flat however large the journal is.
+    """
+    chunk_size = current_app.config['EXPORT_CHUNK_SIZE']
+    dumps = current_app.json.dumps
+    columns = query.with_entities(*list_columns(Trade)).order_by(Trade.entry_date, Trade.id)
+    result = db.session.execute(columns.statement.execution_options(yield_per=chunk_size))
+
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+        writer.writeheader()
+        for partition in result.partitions():
+            writer.writerows(row_dicts(Trade, partition))
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    else:
+        for partition in result.partitions():
+            yield ''.join(dumps(d) + '\n' for d in row_dicts(Trade, partition))
+
+
+def _validate(raw: dict) -> tuple[dict | None, list[str]]:
+    """Normalize one import row into Trade column values, mirroring create_trade's checks."""
+    missing = [f for f in ('symbol', 'direction', 'entry_price', 'quantity', 'gap_type') if not raw.get(f)]
+    if missing:
+        return None, [f'Missing required fields: {", ".join(missing)}']
+
+    errors = []
+    if raw['direction'] not in ('long', 'short'):
+        errors.append('direction must be "long" or "short"')
+    if raw['gap_type'] not in ('gap_up', 'gap_down'):
+        errors.append('gap_type must be "gap_up" or "gap_down"')
+
+    fields = {
+        'symbol': str(raw['symbol']).upper().strip(),
+        'direction': raw['direction'],
+        'entry_price': _number(raw['entry_price'], 'entry_price', errors),
+        'exit_price': _number(raw.get('exit_price'), 'exit_price', errors),
+        'quantity': _number(raw['quantity'], 'quantity', errors, integer=True),
+        'entry_date': _date(raw.get('entry_date'), 'entry_date', errors) or datetime.now(timezone.utc),
+        'exit_date': _date(raw.get('exit_date'), 'exit_date', errors),
+        'status': raw.get('status') or ('closed' if raw.get('exit_price') not in (None, '') else 'open'),
+        'pnl': None,
+        'pnl_percent': None,
+        'gap_type': raw['gap_type'],
+        'gap_percent': _number(raw.get('gap_percent'), 'gap_percent', errors),
+        'setup_rating': _number(raw.get('setup_rating'), 'setup_rating', errors, integer=True),
+        'notes': raw.get('notes'),
+        'catalyst_type': raw.get('catalyst_type'),
+        'stop_loss': _number(raw.get('stop_loss'), 'stop_loss', errors),
+        'take_profit': _number(raw.get('take_profit'), 'take_profit', errors),
+        'source': raw.get('source') or 'import',
+        'trading_mode': raw.get('trading_mode') or 'paper',
+    }
+
+    if fields['entry_price'] is not None and fields['entry_price'] <= 0:
+        errors.append('entry_price must be positive')
+    if fields['exit_price'] is not None and fields['exit_price'] <= 0:
+        errors.append('exit_price must be positive')
+    if fields['status'] not in ('open', 'closed', 'cancelled'):
+        errors.append('status must be "open", "closed" or "cancelled"')
+    elif fields['status'] == 'closed':
+        if fields['exit_price'] is None:
+            errors.append('closed trades need an exit_price')
+        fields['exit_date'] = fields['exit_date'] or datetime.now(timezone.utc)
+
+    return (None, errors) if errors else (fields, [])
+
+
+def _number(value, name: str, errors: list, integer: bool = False):
+    if value is None or value == '':
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        errors.append(f'{name} must be a number')
+        return None
+    if integer:
+        if not number.is_integer():
+            errors.append(f'{name} must be a whole number')
+            return None
+        return int(number)
+    return number
+
+
+def _date(value, name: str, errors: list):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        errors.append(f'{name} must be ISO format')
+        return None
+
+
+def _insert_batch(batch: list[dict], dry_run: bool) -> int:
+    closed = [row for row in batch if row['status'] == 'closed']
+    if closed:
+        pnls, pnl_percents = compute_pnl_bulk(
+            [r['direction'] for r in closed], [r['entry_price'] for r in closed],
+            [r['exit_price'] for r in closed], [r['quantity'] for r in closed]
+        )
+        for row, pnl, pnl_percent in zip(closed, pnls, pnl_percents):
+            row['pnl'], row['pnl_percent'] = pnl, pnl_percent
+
+    if batch and not dry_run:
+        db.session.execute(Trade.__table__.insert(), batch)
+    return len(batch)
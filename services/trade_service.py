@@ -1,4 +1,16 @@
+import base64
+import json
 from datetime import datetime, timezone
+from types import SimpleNamespace
+import numpy as np
+from flask import current_app
+from sqlalchemy import and_, bindparam, or_
+from models import db, column_dicts, Trade
+from services import data_version, trade_aggregates
+from services.cache import make_cache
+
+# Filtered trade counts keyed by (status, symbol, trades data version)
+_count_cache = None
 
 
 def compute_pnl(direction: str, entry_price: float, exit_price: float, quantity: int) -> tuple[float, float]:
@@ -18,12 +30,206 @@ def compute_pnl(direction: str, entry_price: float, exit_price: float, quantity:
     return round(pnl, 2), round(pnl_percent, 2)
 
 
+def compute_pnl_bulk(directions, entry_prices, exit_prices, quantities) -> tuple[list[float], list[float]]:
+    """Vectorized ``compute_pnl`` over parallel sequences.
+
+    The arithmetic is the same IEEE operations as ``compute_pnl`` and the
+    final rounding uses Python's ``round`` so results match it exactly.
+    Returns (pnls, pnl_percents). Raises ValueError unless every entry
+    price is positive, since P&L percent is relative to it.
+    """
+    short = np.asarray(directions) == 'short'
+    entry = np.asarray(entry_prices, dtype=np.float64)
+    if not np.all(entry > 0):
+        raise ValueError('entry_price must be positive')
+    exit_ = np.asarray(exit_prices, dtype=np.float64)
+    quantity = np.asarray(quantities, dtype=np.float64)
+
+    pnl = np.where(short, (entry - exit_) * quantity, (exit_ - entry) * quantity)
+    pnl_percent = ((exit_ - entry) / entry) * 100
+    pnl_percent = np.where(short, -pnl_percent, pnl_percent)
+
+    return [round(v, 2) for v in pnl.tolist()], [round(v, 2) for v in pnl_percent.tolist()]
+
+
+def add_trade(trade):
+    """Add a new trade to the session and count it in the performance aggregates."""
+    db.session.add(trade)
+    trade_aggregates.trade_opened(trade)
+    return trade
+
+
 def close_trade(trade, exit_price: float, exit_date: datetime = None):
     """Close a trade by setting exit price, computing P&L, and updating status."""
+    previous_status = trade.status
     trade.exit_price = exit_price
-    trade.exit_date = exit_date or datetime.now(timezone.utc)
+    trade.exit_date = _naive_utc(exit_date or datetime.now(timezone.utc))
     trade.status = 'closed'
     trade.pnl, trade.pnl_percent = compute_pnl(
         trade.direction, trade.entry_price, exit_price, trade.quantity
     )
+    trade_aggregates.trade_closed(trade, previous_status)
     return trade
+
+
+def _naive_utc(value: datetime) -> datetime:
+    """Stored without a zone like every DateTime column: aware values are converted to UTC first."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def close_trades(items: list[dict]) -> tuple[list[dict], list[dict]]:
+    """Close many open trades at once.
+
+    ``items`` holds {'id', 'exit_price', 'exit_date'?} dicts. Targets are
+    loaded in one query and P&L is computed with ``compute_pnl_bulk``. One
+    UPDATE ... RETURNING claims the rows that are still open, and one
+    executemany UPDATE writes their exits, so a trade another request
+    closed in the meantime is reported as an error rather than counted in
+    the aggregates twice. Returns (closed, errors) where errors lists
+    {'id', 'error'} for items that were skipped. The caller commits.
+    """
+    columns = (Trade.id, Trade.direction, Trade.entry_price, Trade.quantity, Trade.status,
+               Trade.gap_type, Trade.entry_date)
+    ids = [item['id'] for item in items]
+    targets = {row.id: row for row in db.session.query(*columns).filter(Trade.id.in_(ids))}
+
+    now = datetime.now(timezone.utc)
+    valid, errors, seen = [], [], set()
+    for item in items:
+        target = targets.get(item['id'])
+        if item['id'] in seen:
+            errors.append({'id': item['id'], 'error': 'duplicate id in batch'})
+            continue
+        seen.add(item['id'])
+        if target is None:
+            errors.append({'id': item['id'], 'error': 'not found'})
+        elif target.status != 'open':
+            errors.append({'id': item['id'], 'error': f'trade is {target.status}'})
+        elif not target.entry_price > 0:
+            errors.append({'id': item['id'], 'error': 'entry_price must be positive'})
+        else:
+            valid.append((item, target))
+    if not valid:
+        return [], errors
+
+    table = Trade.__table__
+    claimed = set(db.session.scalars(
+        table.update()
+        .where(table.c.id.in_([target.id for _, target in valid]), table.c.status == 'open')
+        .values(status='closed')
+        .returning(table.c.id)
+    ))
+    errors += [{'id': target.id, 'error': 'trade is no longer open'} for _, target in valid if target.id not in claimed]
+    valid = [(item, target) for item, target in valid if target.id in claimed]
+    if not valid:
+        return [], errors
+
+    pnls, pnl_percents = compute_pnl_bulk(
+        [t.direction for _, t in valid], [t.entry_price for _, t in valid],
+        [item['exit_price'] for item, _ in valid], [t.quantity for _, t in valid]
+    )
+    closed = [{
+        'id': target.id,
+        'exit_price': item['exit_price'],
+        'exit_date': _naive_utc(item.get('exit_date') or now),
+        'pnl': pnl,
+        'pnl_percent': pnl_percent,
+    } for (item, target), pnl, pnl_percent in zip(valid, pnls, pnl_percents)]
+
+    db.session.execute(
+        table.update()
+        .where(table.c.id == bindparam('trade_id'))
+        .values(exit_price=bindparam('exit_price'), exit_date=bindparam('exit_date'),
+                pnl=bindparam('pnl'), pnl_percent=bindparam('pnl_percent')),
+        [{'trade_id': row['id'], **{k: v for k, v in row.items() if k != 'id'}} for row in closed]
+    )
+
+    trade_aggregates.trades_closed([
+        SimpleNamespace(id=target.id, gap_type=target.gap_type, entry_date=target.entry_date,
+                        exit_date=row['exit_date'], pnl=row['pnl'])
+        for (_, target), row in zip(valid, closed)
+    ])
+    return closed, errors
+
+
+def update_trades(items: list[dict], fields: tuple = ('notes', 'setup_rating')) -> int:
+    """Set editable fields on many trades with one executemany UPDATE per field set.
+
+    Returns the number of rows updated. The caller commits.
+    """
+    table = Trade.__table__
+    updated = 0
+    groups = {}
+    for item in items:
+        names = tuple(f for f in fields if f in item)
+        if names:
+            groups.setdefault(names, []).append(item)
+
+    for names, group in groups.items():
+        result = db.session.execute(
+            table.update().where(table.c.id == bindparam('trade_id')).values({n: bindparam(n) for n in names}),
+            [{'trade_id': item['id'], **{n: item[n] for n in names}} for item in group]
+        )
+        updated += result.rowcount
+    return updated
+
+
+def cancel_trade(trade):
+    previous_status = trade.status
+    trade.status = 'cancelled'
+    trade_aggregates.trade_cancelled(trade, previous_status)
+    return trade
+
+
+def remove_trade(trade):
+    db.session.delete(trade)
+    trade_aggregates.trade_deleted(trade)
+
+
+def trades_after(query, cursor: str, limit: int) -> tuple[list[dict], str | None]:
+    """Keyset page of trades, newest first, after an opaque cursor ('' for the first page).
+
+    Returns (trade dicts, next_cursor) where next_cursor is None on the
+    last page. Raises ValueError for a malformed cursor.
+    """
+    if cursor:
+        entry_date, trade_id = decode_cursor(cursor)
+        query = query.filter(
+            Trade.entry_date <= entry_date,
+            or_(Trade.entry_date < entry_date, and_(Trade.entry_date == entry_date, Trade.id < trade_id))
+        )
+    trades = column_dicts(query.order_by(Trade.entry_date.desc(), Trade.id.desc()).limit(limit + 1), Trade)
+
+    if len(trades) <= limit:
+        return trades, None
+    trades = trades[:limit]
+    return trades, encode_cursor(trades[-1])
+
+
+def encode_cursor(trade: dict) -> str:
+    raw = json.dumps([trade['entry_date'], trade['id']]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        entry_date, trade_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return datetime.fromisoformat(entry_date), int(trade_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f'Invalid cursor: {cursor!r}') from e
+
+
+def count_trades(query, status: str, symbol: str | None) -> int:
+    """COUNT for a filtered trade query, cached until the next trade change."""
+    global _count_cache
+    if _count_cache is None:
+        _count_cache = make_cache('trade_counts', current_app.config['STATS_CACHE_SIZE'])
+
+    key = (status, (symbol or '').upper(), data_version.get('trades'))
+    total = _count_cache.get(key)
+    if total is None:
+        total = query.order_by(None).count()
+        _count_cache.set(key, total)
+    return total
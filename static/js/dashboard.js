@@ -8,7 +8,7 @@ document.getElementById('scannerForm').addEventListener('submit', async (e) => {
     const date = document.getElementById('dateInput').value;
 
     // Build query string
-    let url = `${BASE_PATH}/api/scanner/gaps?min_gap=${minGap}&direction=${direction}`;
+    let url = `${BASE_PATH}/api/scanner/gaps?min_gap=${minGap}&direction=${direction}&stream=ndjson`;
     if (symbols) url += `&symbols=${encodeURIComponent(symbols)}`;
     if (date) url += `&date=${date}`;
 
@@ -17,28 +17,57 @@ document.getElementById('scannerForm').addEventListener('submit', async (e) => {
     document.getElementById('scannerResults').classList.add('d-none');
     document.getElementById('scannerNoResults').classList.add('d-none');
 
+    // Rows arrive chunk by chunk; keep them sorted by absolute gap as they come in
+    const gaps = [];
     try {
         const res = await fetch(url);
-        const json = await res.json();
-        const data = json.data;
-
-        document.getElementById('scannerLoading').classList.add('d-none');
-
-        if (data.total_found === 0) {
-            document.getElementById('scannerNoResults').classList.remove('d-none');
-            return;
-        }
-
-        document.getElementById('resultCount').textContent = data.total_found;
-        document.getElementById('scanDate').textContent = data.scan_date;
-        renderGaps(data.gaps);
-        document.getElementById('scannerResults').classList.remove('d-none');
+        if (!res.ok) throw new Error((await res.json()).message);
+        await readFrames(res, frame => {
+            if (frame.type === 'gap') {
+                gaps.push(frame.data);
+            } else if (frame.type === 'error') {
+                throw new Error(frame.data.error);
+            } else if (frame.type === 'summary') {
+                document.getElementById('scannerLoading').classList.add('d-none');
+                document.getElementById('scanDate').textContent = frame.data.scan_date;
+                if (frame.data.failed.length) {
+                    const failed = frame.data.failed.map(f => f.symbol).join(', ');
+                    showFlash(`Could not fetch: ${failed}`, 'warning');
+                }
+                if (frame.data.total_found === 0) {
+                    document.getElementById('scannerResults').classList.add('d-none');
+                    document.getElementById('scannerNoResults').classList.remove('d-none');
+                }
+            }
+        }, () => {
+            if (gaps.length === 0) return;
+            gaps.sort((a, b) => Math.abs(b.gap_percent) - Math.abs(a.gap_percent));
+            document.getElementById('resultCount').textContent = gaps.length;
+            renderGaps(gaps);
+            document.getElementById('scannerResults').classList.remove('d-none');
+        });
     } catch (err) {
         document.getElementById('scannerLoading').classList.add('d-none');
         showFlash('Scanner error: ' + err.message, 'danger');
     }
 });
 
+// Read an NDJSON response, calling onFrame per line and onBatch after each network read
+async function readFrames(res, onFrame, onBatch) {
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+        const { done, value } = await reader.read();
+        if (value) buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = done ? '' : lines.pop();
+        lines.filter(line => line.trim()).forEach(line => onFrame(JSON.parse(line)));
+        onBatch();
+        if (done) break;
+    }
+}
+
 function renderGaps(gaps) {
     const tbody = document.getElementById('resultsBody');
     tbody.innerHTML = gaps.map(g => {
@@ -1,61 +1,95 @@
 // Trade Journal CRUD
 const API_URL = `${BASE_PATH}/api/trades`;
 
+const PAGE_SIZE = 50;
+let nextCursor = null;
+let loadingPage = false;
+let loadSeq = 0;
+
+// Reload the journal from the first page (filters changed or a trade was edited)
 async function loadTrades() {
+    nextCursor = null;
+    await loadPage('', true);
+}
+
+async function loadPage(cursor, reset) {
+    const seq = ++loadSeq;
+    loadingPage = true;
+
     const status = document.getElementById('statusFilter').value;
     const symbol = document.getElementById('symbolFilter').value.trim();
-    let url = `${API_URL}/?status=${status}`;
-    if (symbol) url += `&symbol=${symbol}`;
-
-    const res = await fetch(url);
-    const json = await res.json();
-    renderTrades(json.data.trades);
+    let url = `${API_URL}/?status=${status}&per_page=${PAGE_SIZE}&cursor=${encodeURIComponent(cursor)}`;
+    if (symbol) url += `&symbol=${encodeURIComponent(symbol)}`;
+
+    try {
+        const res = await fetch(url);
+        const json = await res.json();
+        if (seq !== loadSeq) return;  // superseded by a newer load
+        nextCursor = json.data.next_cursor;
+        renderTrades(json.data.trades, !reset);
+    } finally {
+        if (seq === loadSeq) loadingPage = false;
+    }
 }
 
-function renderTrades(trades) {
+// Infinite scroll: fetch the next page when the sentinel below the table comes into view
+new IntersectionObserver(entries => {
+    if (entries[0].isIntersecting && nextCursor && !loadingPage) {
+        loadPage(nextCursor, false);
+    }
+}, { rootMargin: '200px' }).observe(document.getElementById('tradesSentinel'));
+
+function renderTrades(trades, append = false) {
     const tbody = document.getElementById('tradesBody');
     const empty = document.getElementById('tradesEmpty');
 
-    if (trades.length === 0) {
+    if (!append && trades.length === 0) {
         tbody.innerHTML = '';
         empty.classList.remove('d-none');
         return;
     }
 
     empty.classList.add('d-none');
-    tbody.innerHTML = trades.map(t => {
-        const pnlClass = t.pnl > 0 ? 'pnl-positive' : t.pnl < 0 ? 'pnl-negative' : '';
-        const pnlText = t.pnl !== null ? `$${t.pnl.toFixed(2)}` : '-';
-        const gapClass = t.gap_type === 'gap_up' ? 'gap-up' : 'gap-down';
-        const gapArrow = t.gap_type === 'gap_up' ? '&#9650;' : '&#9660;';
-        const stars = t.setup_rating ? '&#9733;'.repeat(t.setup_rating) : '-';
-
-        return `
-        <tr data-testid="trade-row-${t.id}">
-            <td><strong>${t.symbol}</strong></td>
-            <td><span class="badge ${t.direction === 'long' ? 'bg-success' : 'bg-danger'}">${t.direction}</span></td>
-            <td class="${gapClass}" data-testid="trade-gap-${t.id}">${gapArrow} ${t.gap_percent ? t.gap_percent.toFixed(1) + '%' : '-'}</td>
-            <td>$${t.entry_price.toFixed(2)}</td>
-            <td>${t.exit_price ? '$' + t.exit_price.toFixed(2) : '-'}</td>
-            <td>${t.quantity}</td>
-            <td class="${pnlClass}" data-testid="trade-pnl-${t.id}">${pnlText}</td>
-            <td>
-                <span class="badge ${t.status === 'open' ? 'bg-primary' : t.status === 'closed' ? 'bg-secondary' : 'bg-warning'}">
-                    ${t.status}
-                </span>
-            </td>
-            <td>${stars}</td>
-            <td>${new Date(t.entry_date).toLocaleDateString()}</td>
-            <td>
-                ${t.status === 'open' ? `
-                    <button class="btn btn-sm btn-outline-success me-1" data-testid="trade-close-${t.id}"
-                            onclick="openCloseTrade(${t.id}, '${t.symbol}')">Close</button>
-                ` : ''}
-                <button class="btn btn-sm btn-outline-danger" data-testid="trade-delete-${t.id}"
-                        onclick="deleteTrade(${t.id})">Del</button>
-            </td>
-        </tr>`;
-    }).join('');
+    const html = trades.map(tradeRow).join('');
+    if (append) {
+        tbody.insertAdjacentHTML('beforeend', html);
+    } else {
+        tbody.innerHTML = html;
+    }
+}
+
+function tradeRow(t) {
+    const pnlClass = t.pnl > 0 ? 'pnl-positive' : t.pnl < 0 ? 'pnl-negative' : '';
+    const pnlText = t.pnl !== null ? `$${t.pnl.toFixed(2)}` : '-';
+    const gapClass = t.gap_type === 'gap_up' ? 'gap-up' : 'gap-down';
+    const gapArrow = t.gap_type === 'gap_up' ? '&#9650;' : '&#9660;';
+    const stars = t.setup_rating ? '&#9733;'.repeat(t.setup_rating) : '-';
+
+    return `
+    <tr data-testid="trade-row-${t.id}">
+        <td><strong>${t.symbol}</strong></td>
+        <td><span class="badge ${t.direction === 'long' ? 'bg-success' : 'bg-danger'}">${t.direction}</span></td>
+        <td class="${gapClass}" data-testid="trade-gap-${t.id}">${gapArrow} ${t.gap_percent ? t.gap_percent.toFixed(1) + '%' : '-'}</td>
+        <td>$${t.entry_price.toFixed(2)}</td>
+        <td>${t.exit_price ? '$' + t.exit_price.toFixed(2) : '-'}</td>
+        <td>${t.quantity}</td>
+        <td class="${pnlClass}" data-testid="trade-pnl-${t.id}">${pnlText}</td>
+        <td>
+            <span class="badge ${t.status === 'open' ? 'bg-primary' : t.status === 'closed' ? 'bg-secondary' : 'bg-warning'}">
+                ${t.status}
+            </span>
+        </td>
+        <td>${stars}</td>
+        <td>${new Date(t.entry_date).toLocaleDateString()}</td>
+        <td>
+            ${t.status === 'open' ? `
+                <button class="btn btn-sm btn-outline-success me-1" data-testid="trade-close-${t.id}"
+                        onclick="openCloseTrade(${t.id}, '${t.symbol}')">Close</button>
+            ` : ''}
+            <button class="btn btn-sm btn-outline-danger" data-testid="trade-delete-${t.id}"
+                    onclick="deleteTrade(${t.id})">Del</button>
+        </td>
+    </tr>`;
 }
 
 function resetTradeForm() {
@@ -3,13 +3,16 @@ let cumulativeChart = null;
 let dailyChart = null;
 let gapTypeChart = null;
 
+const PERIOD_LABELS = { daily: 'Daily', weekly: 'Weekly', monthly: 'Monthly' };
+
 async function loadStats() {
     const days = document.getElementById('periodFilter').value;
+    const period = document.getElementById('bucketFilter').value;
 
     // Fetch all stats in parallel
     const [summaryRes, seriesRes, gapTypeRes] = await Promise.all([
         fetch(`${BASE_PATH}/api/stats/summary`),
-        fetch(`${BASE_PATH}/api/stats/pnl-series?days=${days}`),
+        fetch(`${BASE_PATH}/api/stats/pnl-series?days=${days}&period=${period}`),
         fetch(`${BASE_PATH}/api/stats/by-gap-type`)
     ]);
 
@@ -76,15 +79,16 @@ function renderDailyChart(series) {
     const ctx = document.getElementById('dailyPnlChart').getContext('2d');
     if (dailyChart) dailyChart.destroy();
 
-    const colors = series.daily_pnl.map(v => v >= 0 ? '#198754' : '#dc3545');
+    document.getElementById('bucketTitle').textContent = PERIOD_LABELS[series.period];
+    const colors = series.period_pnl.map(v => v >= 0 ? '#198754' : '#dc3545');
 
     dailyChart = new Chart(ctx, {
         type: 'bar',
         data: {
             labels: series.labels,
             datasets: [{
-                label: 'Daily P&L',
-                data: series.daily_pnl,
+                label: PERIOD_LABELS[series.period] + ' P&L',
+                data: series.period_pnl,
                 backgroundColor: colors
             }]
         },
@@ -122,8 +126,9 @@ function renderGapTypeChart(gapTypes) {
     });
 }
 
-// Period filter
+// Period filters
 document.getElementById('periodFilter').addEventListener('change', loadStats);
+document.getElementById('bucketFilter').addEventListener('change', loadStats);
 
 // Load on page ready
 loadStats();
@@ -0,0 +1,42 @@
+import pytest
+
+import config
+from app import create_app
+from redis_stub import RedisStub
+
+
+@pytest.fixture
+def make_app(tmp_path, monkeypatch):
+    """Return a factory for testing apps whose instance files live in tmp_path.
+
+    ``database`` is 'memory' or a file name inside tmp_path.
+    """
+    def factory(database: str = 'memory', **overrides):
+        uri = 'sqlite:///:memory:' if database == 'memory' else f'sqlite:///{tmp_path / database}'
+        monkeypatch.setattr(config.TestConfig, 'SQLALCHEMY_DATABASE_URI', uri)
+        for name, value in {
+            'BAR_STORE_DIR': str(tmp_path / 'bars'),
+            'REPLAY_DATA_DIR': str(tmp_path / 'replay'),
+            'CACHE_PATH': str(tmp_path / 'cache.db'),
+            'SCAN_SNAPSHOT_PATH': str(tmp_path / 'scan_snapshot.npz'),
+            'GAP_STATS_DIR': str(tmp_path / 'gap_stats'),
+            **overrides,
+        }.items():
+            monkeypatch.setattr(config.TestConfig, name, value)
+        return create_app('testing')
+
+    return factory
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app()
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture
+def redis_stub():
+    stub = RedisStub().start()
+    yield stub
+    stub.stop()
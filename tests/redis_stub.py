@@ -0,0 +1,120 @@
+"""A small in-process Redis stand-in speaking RESP over TCP.
+
+Implements the commands RedisCache sends: GET, SET with PX and NX, DEL,
+SCAN, AUTH and SELECT. ``maxkeys`` emulates ``maxmemory`` with
+``allkeys-lru``: the least recently used key is evicted when full.
+"""
+import fnmatch
+import socket
+import socketserver
+import threading
+import time
+from collections import OrderedDict
+
+
+class RedisStub:
+    def __init__(self, maxkeys: int = None, password: str = None):
+        self.maxkeys = maxkeys
+        self.password = password
+        self.data = OrderedDict()  # key -> (value, expires_at | None)
+        self.commands = []
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                stub.connections.append(self.connection)
+                authed = stub.password is None
+                while True:
+                    try:
+                        args = _read_command(self.rfile)
+                    except (EOFError, ConnectionError, OSError):
+                        return
+                    name = args[0].decode().upper()
+                    if name == 'AUTH':
+                        authed = args[1].decode() == stub.password
+                        self.wfile.write(b'+OK\r\n' if authed else b'-WRONGPASS invalid password\r\n')
+                        continue
+                    if not authed:
+                        self.wfile.write(b'-NOAUTH Authentication required.\r\n')
+                        continue
+                    self.wfile.write(stub.dispatch(name, args[1:]))
+
+        self.connections = []
+        self.server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.url = f'redis://127.0.0.1:{self.port}/0'
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self) -> 'RedisStub':
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.drop_connections()
+
+    def drop_connections(self):
+        """Close every client connection, as a server restart would."""
+        for conn in self.connections:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+                conn.close()
+            except OSError:
+                pass
+        self.connections.clear()
+
+    def dispatch(self, name: str, args: list[bytes]) -> bytes:
+        with self.lock:
+            self.commands.append(name)
+            self._expire()
+            if name == 'SELECT':
+                return b'+OK\r\n'
+            if name == 'GET':
+                entry = self.data.get(args[0])
+                if entry is None:
+                    return b'$-1\r\n'
+                self.data.move_to_end(args[0])
+                return _bulk(entry[0])
+            if name == 'SET':
+                key, value, options = args[0], args[1], [a.decode().upper() for a in args[2:]]
+                if 'NX' in options and key in self.data:
+                    return b'$-1\r\n'
+                expires_at = None
+                if 'PX' in options:
+                    expires_at = time.monotonic() + int(options[options.index('PX') + 1]) / 1000
+                self.data[key] = (value, expires_at)
+                self.data.move_to_end(key)
+                while self.maxkeys is not None and len(self.data) > self.maxkeys:
+                    self.data.popitem(last=False)
+                return b'+OK\r\n'
+            if name == 'DEL':
+                return b':%d\r\n' % sum(self.data.pop(key, None) is not None for key in args)
+            if name == 'SCAN':
+                pattern = args[args.index(b'MATCH') + 1].decode() if b'MATCH' in args else '*'
+                keys = [k for k in self.data if fnmatch.fnmatchcase(k.decode(), pattern)]
+                return b'*2\r\n' + _bulk(b'0') + b'*%d\r\n' % len(keys) + b''.join(_bulk(k) for k in keys)
+            return b'-ERR unknown command\r\n'
+
+    def _expire(self):
+        now = time.monotonic()
+        for key in [k for k, (_, expires_at) in self.data.items() if expires_at is not None and expires_at <= now]:
+            del self.data[key]
+
+
+def _bulk(value: bytes) -> bytes:
+    return b'$%d\r\n%s\r\n' % (len(value), value)
+
+
+def _read_command(rfile) -> list[bytes]:
+    line = rfile.readline()
+    if not line:
+        raise EOFError
+    count = int(line[1:-2])
+    args = []
+    for _ in range(count):
+        length = int(rfile.readline()[1:-2])
+        args.append(rfile.read(length + 2)[:-2])
+    return args
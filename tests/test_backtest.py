@@ -0,0 +1,132 @@
+import numpy as np
+import pytest
+
+from services import backtest
+from services.trade_service import compute_pnl
+
+
+def _legacy_backtest(symbols: list[str], bars: dict, rule: dict) -> list[tuple]:
+    """Per-gap, per-bar Python loop with the same rules as backtest.run."""
+    hold, trades = rule['hold_days'], []
+    for position, symbol in enumerate(symbols):
+        b = bars[symbol]
+        opens, highs, lows, closes = (b[name].tolist() for name in ('open', 'high', 'low', 'close'))
+        for i in range(1, len(opens) - hold):
+            gap = (opens[i] - closes[i - 1]) / closes[i - 1] * 100
+            if not np.isfinite(gap) or not np.isfinite(closes[i + hold]) or abs(gap) < rule['min_gap']:
+                continue
+            if rule['gap_type'] != 'both' and (gap > 0) != (rule['gap_type'] == 'gap_up'):
+                continue
+            short = (gap > 0) == (rule['side'] == 'fade')
+            sign = -1.0 if short else 1.0
+            entry = round(opens[i], 2)
+            if entry <= 0:
+                continue
+            stop = round(entry * (1 - sign * rule['stop_pct'] / 100), 2) if rule['stop_pct'] is not None else None
+            target = round(entry * (1 + sign * rule['target_pct'] / 100), 2) if rule['target_pct'] is not None else None
+
+            exit_price, exit_k, reason = closes[i + hold], hold, 'close'
+            for k in range(hold + 1):
+                o = opens[i + k]
+                adverse, favorable = (highs[i + k], lows[i + k]) if short else (lows[i + k], highs[i + k])
+                if stop is not None and sign * (adverse - stop) <= 0:
+                    exit_price, exit_k, reason = (o if k > 0 and sign * (o - stop) <= 0 else stop), k, 'stop'
+                    break
+                if target is not None and sign * (favorable - target) >= 0:
+                    exit_price, exit_k, reason = (o if k > 0 and sign * (o - target) >= 0 else target), k, 'target'
+                    break
+            exit_price = round(exit_price, 2)
+            direction = 'short' if short else 'long'
+            pnl, _ = compute_pnl(direction, entry, exit_price, rule['quantity'])
+            trades.append((b['date'][i], position, symbol, direction, entry, exit_price,
+                           b['date'][i + exit_k], reason, pnl))
+    trades.sort(key=lambda t: (t[0], t[1]))
+    return [(symbol, str(entered), str(exited), direction, entry, exit_, reason, pnl)
+            for entered, _, symbol, direction, entry, exit_, exited, reason, pnl in trades]
+
+
+def _vectorized(rule: dict, symbols: list[str], bars: dict) -> list[tuple]:
+    dates = np.concatenate([b['date'] for b in bars.values()])
+    result = backtest.run(rule, backtest.flatten(symbols, bars, dates.min(), dates.max()))
+    return [(t['symbol'], t['entry_date'][:10], t['exit_date'][:10], t['direction'], t['entry_price'],
+             t['exit_price'], t['exit_reason'], t['pnl']) for t in result['trades']]
+
+
+def _random_bars(n_symbols: int, n_days: int, seed: int = 0) -> tuple[list[str], dict]:
+    """Random-walk bars that gap a few percent at the open, with the odd NaN close."""
+    rng = np.random.default_rng(seed)
+    dates = np.arange(np.datetime64('2024-01-01'), np.datetime64('2024-01-01') + n_days)
+    symbols = [f'S{i:02d}' for i in range(n_symbols)]
+    bars = {}
+    for symbol in symbols:
+        close = 50 * np.exp(rng.normal(0, 0.02, n_days).cumsum())
+        opens = np.r_[50, close[:-1]] * (1 + rng.normal(0, 0.03, n_days))
+        close[rng.random(n_days) < 0.02] = np.nan
+        bars[symbol] = {
+            'date': dates, 'open': opens, 'close': close,
+            'high': np.fmax(opens, close) * (1 + rng.random(n_days) * 0.03),
+            'low': np.fmin(opens, close) * (1 - rng.random(n_days) * 0.03),
+        }
+    return symbols, bars
+
+
+# One symbol fading three gaps up (short at the open, stop 2%, target 3%, two sessions)
+#   day 1: gaps to 105, never reaches 107.10 or 101.85, exits at day 3's close of 104
+#   day 5: gaps to 104, trades up through the 106.08 stop the same day
+#   day 7: gaps to 104, day 8 opens at 100, below the 100.88 target, and fills at that open
+PRICES = [  # open, high, low, close
+    (100, 100.5, 99.5, 100), (105, 106, 104, 105), (105, 106, 104.5, 105), (105, 105.5, 104.5, 104),
+    (104, 104.5, 103.5, 100), (104, 108, 103.5, 107), (107, 107.5, 106.5, 100), (104, 104.5, 103, 103),
+    (100, 100.5, 99.5, 100), (100, 100.5, 99.5, 100),
+]
+RULE = {'gap_type': 'gap_up', 'side': 'fade', 'stop_pct': 2.0, 'target_pct': 3.0, 'hold_days': 2}
+
+
+def _scripted_bars() -> dict:
+    opens, highs, lows, closes = (np.array(column, dtype=np.float64) for column in zip(*PRICES))
+    dates = np.arange(np.datetime64('2024-03-01'), np.datetime64('2024-03-01') + len(PRICES))
+    return {'GAP': {'date': dates, 'open': opens, 'high': highs, 'low': lows, 'close': closes}}
+
+
+def test_exits_at_the_stop_the_target_and_the_end_of_the_holding_period():
+    bars = _scripted_bars()
+    trades = _vectorized(RULE, ['GAP'], bars)
+
+    assert [(entered, exited, exit_, reason, pnl) for _, entered, exited, _, _, exit_, reason, pnl in trades] == [
+        ('2024-03-02', '2024-03-04', 104.0, 'close', 100.0),
+        ('2024-03-06', '2024-03-06', 106.08, 'stop', -208.0),
+        ('2024-03-08', '2024-03-09', 100.0, 'target', 400.0),
+    ]
+    assert trades == _legacy_backtest(['GAP'], bars, backtest.validate_rule(RULE))
+
+
+@pytest.mark.parametrize('overrides', [
+    {},
+    {'stop_pct': 2.0, 'target_pct': 3.0, 'hold_days': 3},
+    {'gap_type': 'both', 'side': 'follow', 'stop_pct': None, 'hold_days': 1},
+    {'gap_type': 'gap_down', 'stop_pct': None, 'target_pct': 1.0, 'hold_days': 5},
+])
+def test_run_matches_the_per_bar_loop(overrides):
+    symbols, bars = _random_bars(20, 120)
+    rule = backtest.validate_rule(overrides)
+
+    trades = _vectorized(rule, symbols, bars)
+
+    assert trades == _legacy_backtest(symbols, bars, rule)
+    assert len(trades) > 20
+
+
+def test_sweep_reports_each_rules_run_summary(app, monkeypatch):
+    symbols, bars = _random_bars(10, 60)
+    dates = np.concatenate([b['date'] for b in bars.values()])
+    flat = backtest.flatten(symbols, bars, dates.min(), dates.max())
+    monkeypatch.setattr(backtest, 'load_bars', lambda *args, **kwargs: flat)
+    grid = {'stop_pct': [1.0, None], 'hold_days': [0, 2]}
+
+    result = backtest.sweep({'target_pct': 3.0}, grid, symbols=symbols, max_workers=2)
+
+    assert len(result['runs']) == 4
+    for entry in result['runs']:
+        assert entry['summary'] == backtest.run({'target_pct': 3.0, **entry['params']}, flat)['summary']
+    pnls = [entry['summary']['total_pnl'] for entry in result['runs']]
+    assert pnls == sorted(pnls, reverse=True)
@@ -0,0 +1,82 @@
+import json
+import threading
+import time
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+
+from services import bar_store
+from services.bar_store import MARKET_TZ, BarStore
+
+
+def _bars(start: date, n: int) -> dict:
+    days = np.arange(np.datetime64(start, 'D'), np.datetime64(start, 'D') + n).astype(np.int64).astype(np.float64)
+    bars = {name: np.full(n, 100.0) for name in ('open', 'high', 'low', 'close', 'volume')}
+    return {'date': days, **bars}
+
+
+def _at(day: date, hour: int, minute: int = 0) -> datetime:
+    return datetime(day.year, day.month, day.day, hour, minute, tzinfo=MARKET_TZ)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BarStore(str(tmp_path), provider=None, live_ttl=60)
+
+
+def _synced(store: BarStore, symbol: str, first: date, last: date, at: datetime):
+    with open(store._meta_path(symbol), 'w') as f:
+        json.dump({'first': first.isoformat(), 'last': last.isoformat(), 'synced_at': at.timestamp()}, f)
+
+
+def test_concurrent_writes_of_one_symbol_keep_both_ranges(store, monkeypatch):
+    save = bar_store._atomic_save
+
+    def slow_save(path, write):
+        if path.endswith('.npy'):
+            time.sleep(0.1)  # both writers have loaded the stored bars by now, unless the lock serializes them
+        save(path, write)
+
+    monkeypatch.setattr(bar_store, '_atomic_save', slow_save)
+    writes = [(date(2024, 1, 1), 10), (date(2024, 3, 1), 5)]
+    threads = [threading.Thread(target=store.write, args=('AAPL', _bars(start, n), start, start.replace(day=n)))
+               for start, n in writes]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    bars = store.read('AAPL')
+    assert len(bars['date']) == 15
+    assert bars['date'][[0, 10]].tolist() == [date(2024, 1, 1), date(2024, 3, 1)]
+    coverage = store.coverage('AAPL')
+    assert (coverage['first'], coverage['last']) == (date(2024, 1, 1), date(2024, 3, 5))
+
+
+TUESDAY, FRIDAY, SATURDAY = date(2024, 3, 5), date(2024, 3, 8), date(2024, 3, 9)
+
+
+@pytest.mark.parametrize('last, synced_at, now, expected', [
+    # In session: refetch today's bar once the live TTL expires
+    (TUESDAY, _at(TUESDAY, 11), _at(TUESDAY, 11, 0), None),
+    (TUESDAY, _at(TUESDAY, 11), _at(TUESDAY, 11, 2), (TUESDAY, TUESDAY)),
+    # Synced before the close: fetch the final bar once after it
+    (TUESDAY, _at(TUESDAY, 15, 59), _at(TUESDAY, 16, 1), (TUESDAY, TUESDAY)),
+    # Synced after the close, or on a weekend: final, however long ago
+    (TUESDAY, _at(TUESDAY, 16, 5), _at(TUESDAY, 23), None),
+    (FRIDAY, _at(FRIDAY, 17), _at(SATURDAY, 12), None),
+    (SATURDAY, _at(SATURDAY, 9), _at(SATURDAY, 18), None),
+])
+def test_missing_range_refetches_the_tail_only_while_a_session_can_change_it(store, last, synced_at, now, expected):
+    _synced(store, 'AAPL', date(2024, 1, 2), last, synced_at)
+
+    assert store.missing_range('AAPL', date(2024, 1, 2), last, now=now) == expected
+
+
+def test_missing_range_fetches_days_past_the_coverage(store):
+    _synced(store, 'AAPL', date(2024, 1, 2), FRIDAY, _at(FRIDAY, 17))
+
+    assert store.missing_range('AAPL', date(2024, 1, 2), SATURDAY, now=_at(SATURDAY, 12)) == (SATURDAY, SATURDAY)
+    assert store.missing_range('AAPL', date(2023, 12, 1), FRIDAY, now=_at(SATURDAY, 12)) == (
+        date(2023, 12, 1), date(2024, 1, 1))
@@ -0,0 +1,109 @@
+import socket
+import time
+
+from services.cache import RedisCache, SQLiteCache
+
+
+def _closed_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_redis_cache_get_set_add_delete(redis_stub):
+    cache = RedisCache(redis_stub.url, 'scans')
+    assert cache.get(('AAPL', 2.0)) is None
+
+    cache.set(('AAPL', 2.0), {'rows': [1, 2, 3]})
+    assert cache.get(('AAPL', 2.0)) == {'rows': [1, 2, 3]}
+    assert cache.add(('AAPL', 2.0), 'other') is False
+    assert cache.add('claim', 1) is True
+
+    cache.delete(('AAPL', 2.0))
+    assert cache.get(('AAPL', 2.0), 'miss') == 'miss'
+    stats = cache.stats()
+    assert (stats['backend'], stats['hits'], stats['misses']) == ('redis', 1, 2)
+
+
+def test_redis_cache_namespaces_and_clear(redis_stub):
+    scans, stats = RedisCache(redis_stub.url, 'scans'), RedisCache(redis_stub.url, 'stats')
+    scans.set('key', 'scan')
+    stats.set('key', 'stat')
+    assert scans.get('key') == 'scan' and stats.get('key') == 'stat'
+
+    scans.clear()
+    assert scans.get('key') is None
+    assert stats.get('key') == 'stat'
+
+
+def test_redis_cache_ttl_expiry(redis_stub):
+    cache = RedisCache(redis_stub.url, 'scans')
+    cache.set('live', 'today', ttl=0.05)
+    cache.set('past', 'yesterday')
+    assert cache.get('live') == 'today'
+
+    time.sleep(0.1)
+    assert cache.get('live') is None
+    assert cache.get('past') == 'yesterday'
+    assert cache.add('live', 'again', ttl=0.05) is True
+
+
+def test_redis_cache_server_eviction_is_a_miss(redis_stub):
+    redis_stub.maxkeys = 2
+    cache = RedisCache(redis_stub.url, 'scans')
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1  # b is now least recently used
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+
+
+def test_redis_cache_auth_and_select(redis_stub):
+    redis_stub.password = 'secret'
+    cache = RedisCache(f'redis://:secret@127.0.0.1:{redis_stub.port}/3', 'scans')
+    cache.set('key', 'value')
+
+    assert cache.get('key') == 'value'
+    assert redis_stub.commands[:2] == ['SELECT', 'SET']
+
+
+def test_redis_cache_reconnects_after_the_server_drops_the_connection(redis_stub):
+    cache = RedisCache(redis_stub.url, 'scans')
+    cache.set('key', 'value')
+    redis_stub.drop_connections()
+
+    assert cache.get('key') == 'value'
+
+
+def test_redis_cache_connection_error_is_a_miss(caplog):
+    cache = RedisCache(f'redis://127.0.0.1:{_closed_port()}/0', 'scans', timeout=0.5)
+
+    assert cache.get('key', 'default') == 'default'
+    assert cache.add('key', 'value') is False
+    cache.set('key', 'value')
+    cache.delete('key')
+    cache.clear()
+    assert cache.stats()['misses'] == 1
+    assert cache.stats()['errors'] == 5
+    assert 'Shared cache read failed' in caplog.text
+
+    # Later calls skip the dead server instead of waiting on another connect
+    started = time.monotonic()
+    assert cache.get('key') is None
+    assert time.monotonic() - started < 0.1
+
+
+def test_sqlite_byte_budget_never_evicts_pinned_entries(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    slots = SQLiteCache(path, 'finnhub_quota', maxsize=4, max_bytes=10_000, pinned=True)
+    scans = SQLiteCache(path, 'scans', maxsize=100, max_bytes=10_000)
+    for slot in range(4):
+        assert slots.add(('slot', slot), 1.0, ttl=60)
+    for i in range(20):
+        scans.set(i, b'x' * 2_000)
+
+    assert all(slots.get(('slot', slot)) == 1.0 for slot in range(4))
+    assert scans.stats()['bytes'] <= 10_000
+    assert scans.get(19) is not None and scans.get(0) is None
@@ -0,0 +1,204 @@
+import json
+import multiprocessing
+import threading
+import time
+import urllib.request
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from models import db, Catalyst
+from services import catalysts
+from services.cache import SQLiteCache
+from services.rate_limit import SharedQuota
+
+TODAY = date(2024, 3, 4)
+
+
+class FinnhubStub:
+    """Serves company news, filings and the earnings calendar, recording each request's time."""
+
+    def __init__(self):
+        self.calls = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                stub.calls.append(time.time())
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                symbol = query.get('symbol', '')
+                if query.get('token') != 'test-key':
+                    return self._reply(401, {'error': 'Invalid API key'})
+                if url.path.endswith('/company-news'):
+                    body = [{'id': 100 + i, 'headline': f'{symbol} headline {i}', 'url': f'https://news/{symbol}/{i}',
+                             'summary': f'{symbol} summary {i}', 'datetime': 1709510400 - i * 3600}
+                            for i in range(3)]
+                elif url.path.endswith('/stock/filings'):
+                    body = [{'accessNumber': f'{symbol}-1', 'form': '8-K', 'filedDate': '2024-03-01 00:00:00',
+                             'reportUrl': f'https://sec/{symbol}'}]
+                elif url.path.endswith('/calendar/earnings'):
+                    body = {'earningsCalendar': [{'symbol': 'AAA', 'date': '2024-03-07', 'hour': 'amc',
+                                                  'quarter': 1, 'year': 2024, 'epsEstimate': 1.5}]}
+                else:
+                    return self._reply(404, {'error': 'not found'})
+                self._reply(200, body)
+
+            def _reply(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/api/v1'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def finnhub_stub():
+    stub = FinnhubStub()
+    yield stub
+    stub.server.shutdown()
+    stub.server.server_close()
+
+
+@pytest.fixture
+def catalyst_app(make_app, finnhub_stub, monkeypatch):
+    for name in ('_limiter', '_responses', '_runs'):
+        monkeypatch.setattr(catalysts, name, None)
+    app = make_app(FINNHUB_API_KEY='test-key', FINNHUB_BASE_URL=finnhub_stub.url, FINNHUB_CALLS_PER_MINUTE=600)
+    with app.app_context():
+        yield app
+
+
+def test_ingest_against_stub_server(catalyst_app, finnhub_stub):
+    run = catalysts.ingest(['aaa', 'BBB'], today=TODAY)
+
+    assert (run['requests'], run['fetched'], run['cached'], run['error_count']) == (5, 5, 0, 0)
+    assert (run['inserted'], run['updated']) == (9, 0)  # 2 x (3 news + 1 filing) + 1 earnings
+    assert run['limiter']['shared'] is True
+    news = Catalyst.query.filter_by(symbol='AAA', catalyst_type='news').order_by(Catalyst.external_id).first()
+    assert (news.url, news.summary) == ('https://news/AAA/0', 'AAA summary 0')
+
+    rerun = catalysts.ingest(['AAA', 'BBB'], today=TODAY)
+    assert (rerun['fetched'], rerun['cached'], rerun['inserted']) == (0, 5, 0)
+    assert len(finnhub_stub.calls) == 5
+    assert db.session.query(Catalyst).count() == 9
+
+
+def test_ingest_reports_endpoint_errors(catalyst_app, finnhub_stub):
+    catalyst_app.config['FINNHUB_API_KEY'] = 'wrong-key'
+    run = catalysts.ingest(['AAA'], today=TODAY)
+
+    assert run['error_count'] == 3 and run['inserted'] == 0
+    assert {e['endpoint'] for e in run['errors']} == {'earnings_calendar', 'company_news', 'filings'}
+
+
+def test_attach_bounds_each_row_by_its_own_window(app):
+    def add(symbol, day, score, headline):
+        catalyst = Catalyst(symbol=symbol, catalyst_type='news', headline=headline, catalyst_score=score,
+                            event_date=datetime(2024, 3, day, 12))
+        db.session.add(catalyst)
+        return catalyst
+
+    add('AAA', 2, 50, 'early')
+    add('AAA', 4, 40, 'before gap')
+    add('AAA', 20, 90, 'late')
+    add('BBB', 19, 70, 'bbb before gap')
+    linked = add('BBB', 2, 10, 'linked')
+    db.session.commit()
+
+    rows = catalysts.attach([
+        {'symbol': 'AAA', 'date': '2024-03-05'},
+        {'symbol': 'AAA', 'date': '2024-03-06'},  # overlaps the row above
+        {'symbol': 'BBB', 'date': '2024-03-20', 'catalyst_id': linked.id},
+        {'symbol': 'CCC', 'date': '2024-03-20'},
+    ], date_key='date')
+
+    headlines = [[c['headline'] for c in row['catalysts']] for row in rows]
+    assert headlines == [['early', 'before gap'], ['before gap'], ['linked', 'bbb before gap'], []]
+
+
+def _max_in_window(times: list[float], period: float) -> int:
+    times, best, j = sorted(times), 0, 0
+    for i, t in enumerate(times):
+        while times[j] <= t - period:
+            j += 1
+        best = max(best, i - j + 1)
+    return best
+
+
+def _worker(cache_path: str, url: str, calls: int, period: float, n: int, acquired):
+    """One process drawing on the shared quota; each acquisition makes one stub request."""
+    quota = SharedQuota(SQLiteCache(cache_path, 'finnhub_quota', maxsize=calls, pinned=True), calls, period=period)
+    for _ in range(n):
+        quota.acquire()
+        acquired.put(time.time())
+        urllib.request.urlopen(f'{url}/company-news?symbol=AAA&token=test-key').read()
+
+
+def test_shared_quota_holds_across_processes(finnhub_stub, tmp_path):
+    calls, period = 6, 1.0
+    cache_path = str(tmp_path / 'cache.db')
+    context = multiprocessing.get_context('fork')
+    acquired = context.SimpleQueue()
+    workers = [context.Process(target=_worker, args=(cache_path, finnhub_stub.url, calls, period, 9, acquired))
+               for _ in range(3)]
+    started = time.monotonic()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=60)
+        assert worker.exitcode == 0
+
+    assert len(finnhub_stub.calls) == 27
+    # Requests reach the stub with some jitter, so check when each call was let through
+    assert _max_in_window([acquired.get() for _ in range(27)], period) <= calls
+    # Each process alone may run at the full quota; together they must not exceed it
+    assert time.monotonic() - started >= (27 - calls) / calls * period
+
+
+def test_shared_quota_on_redis(redis_stub):
+    from services.cache import RedisCache
+
+    first, second = (SharedQuota(RedisCache(redis_stub.url, 'finnhub_quota'), 4, period=0.5) for _ in range(2))
+    assert all(q.acquire(timeout=1) for q in (first, second, first, second))
+    assert not first.acquire(timeout=0.1)
+    assert second.acquire(timeout=1)  # a slot frees up once its period has passed
+
+
+def test_shared_quota_falls_back_to_local_pacing_when_the_cache_fails():
+    class BrokenCache:
+        errors = 0
+
+        def add(self, key, value, ttl=None):
+            self.errors += 1
+            return False
+
+    quota = SharedQuota(BrokenCache(), 100, period=1)
+    assert quota.acquire(timeout=1) and quota.acquire(timeout=1)
+    assert quota.stats()['unshared'] == 2
+
+
+def test_shared_quota_waits_when_slots_are_taken_on_a_working_cache():
+    class FullCache:
+        """Every slot is taken when claimed, then expires before anyone looks again."""
+        errors = 0
+
+        def add(self, key, value, ttl=None):
+            return False
+
+        def get(self, key, default=None):
+            return default
+
+    quota = SharedQuota(FullCache(), 100, period=1)
+    assert not quota.acquire(timeout=0.2)
+    assert quota.stats()['unshared'] == 0
@@ -0,0 +1,55 @@
+import pytest
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def _revalidate(client, url: str, tag: str):
+    return client.get(url, headers={'If-None-Match': tag})
+
+
+@pytest.mark.parametrize('url', ['/api/trades/', '/api/stats/summary', '/api/stats/pnl-series'])
+def test_trade_reads_revalidate_until_a_trade_write(client, url):
+    first = client.get(url)
+    tag = first.headers['ETag']
+    assert first.status_code == 200 and first.headers['Cache-Control'] == 'no-cache'
+
+    cached = _revalidate(client, url, tag)
+    assert (cached.status_code, cached.get_data(), cached.headers['ETag']) == (304, b'', tag)
+
+    client.post('/api/trades/', json={
+        'symbol': 'AAPL', 'direction': 'long', 'entry_price': 100, 'quantity': 10, 'gap_type': 'gap_up',
+    })
+    fresh = _revalidate(client, url, tag)
+    assert fresh.status_code == 200
+    assert fresh.headers['ETag'] != tag
+    assert _revalidate(client, url, fresh.headers['ETag']).status_code == 304
+
+
+def test_watchlist_revalidates_until_a_watchlist_write(client):
+    tag = client.get('/api/watchlist/').headers['ETag']
+    assert _revalidate(client, '/api/watchlist/', tag).status_code == 304
+
+    # A trade write leaves the watchlist's ETag alone
+    client.post('/api/trades/', json={
+        'symbol': 'AAPL', 'direction': 'long', 'entry_price': 100, 'quantity': 10, 'gap_type': 'gap_up',
+    })
+    assert _revalidate(client, '/api/watchlist/', tag).status_code == 304
+
+    item = client.post('/api/watchlist/', json={'symbol': 'MSFT'}).get_json()['data']
+    fresh = _revalidate(client, '/api/watchlist/', tag)
+    assert fresh.status_code == 200 and fresh.headers['ETag'] != tag
+    assert [row['symbol'] for row in fresh.get_json()['data']] == ['MSFT']
+
+    tag = fresh.headers['ETag']
+    client.put(f'/api/watchlist/{item["id"]}', json={'notes': 'earnings'})
+    assert _revalidate(client, '/api/watchlist/', tag).status_code == 200
+
+
+def test_failed_write_keeps_the_etag(client):
+    tag = client.get('/api/trades/').headers['ETag']
+
+    assert client.post('/api/trades/', json={'symbol': 'AAPL'}).status_code == 400
+    assert _revalidate(client, '/api/trades/', tag).status_code == 304
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services import gap_engine
+
+
+def _bars(n_symbols: int, n_days: int, seed: int = 0) -> tuple[list[str], dict]:
+    """Random-walk bars with missing days and NaN prices, plus hand-picked edge cases."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2024-01-02', periods=n_days).values.astype('datetime64[D]')
+    symbols = [f'S{i:03d}' for i in range(n_symbols)]
+
+    bars = {}
+    for symbol in symbols:
+        close = 50 + rng.normal(0, 1, n_days).cumsum()
+        opens = close * (1 + rng.normal(0, 0.03, n_days))
+        opens[rng.random(n_days) < 0.1] = np.nan
+        keep = rng.random(n_days) > 0.15
+        bars[symbol] = {
+            'date': dates[keep], 'open': opens[keep], 'high': np.maximum(opens, close)[keep] + 0.5,
+            'low': np.minimum(opens, close)[keep] - 0.5, 'close': close[keep],
+            'volume': rng.integers(1e5, 1e7, n_days).astype(np.float64)[keep],
+        }
+
+    def only(days, opens, closes):
+        n = len(days)
+        return {'date': dates[days], 'open': np.array(opens, dtype=float), 'high': np.full(n, 60.0),
+                'low': np.full(n, 40.0), 'close': np.array(closes, dtype=float), 'volume': np.full(n, 1e6)}
+
+    bars['LASTNAN'] = only([0, 1, 2], [50, 51, np.nan], [50, 52, 53])  # today's open missing
+    bars['ONEBAR'] = only([2], [50], [51])
+    bars['EARLY'] = only([0, 1], [50, 55], [50, 56])  # no bars in the last days
+    bars['ZEROCLOSE'] = only([0, 1], [1, 2], [0, 2])
+    symbols += ['LASTNAN', 'ONEBAR', 'EARLY', 'ZEROCLOSE', 'ABSENT']
+    return symbols, bars
+
+
+def _legacy_scan(bars: dict, symbols: list[str], min_gap: float, direction: str) -> list[dict]:
+    """The per-symbol loop gap_scanner.scan_gaps ran over ``yf.download`` frames."""
+    data = pd.concat({
+        symbol: pd.DataFrame({'Open': b['open'], 'Close': b['close'], 'Volume': b['volume']},
+                             index=pd.DatetimeIndex(b['date']))
+        for symbol, b in bars.items()
+    }, axis=1, sort=True)
+    results = []
+    for symbol in symbols:
+        if symbol not in bars:
+            continue
+        df = data[symbol].dropna(subset=['Close', 'Open'])
+        if len(df) < 2:
+            continue
+        prev_close, today_open = float(df.iloc[-2]['Close']), float(df.iloc[-1]['Open'])
+        if prev_close == 0:
+            continue
+        gap_percent = (today_open - prev_close) / prev_close * 100
+        if direction == 'up' and gap_percent <= 0 or direction == 'down' and gap_percent >= 0:
+            continue
+        if abs(gap_percent) < min_gap:
+            continue
+        results.append({
+            'symbol': symbol,
+            'prev_close': round(prev_close, 2),
+            'open': round(today_open, 2),
+            'current': round(float(df.iloc[-1]['Close']), 2),
+            'gap_percent': round(gap_percent, 2),
+            'gap_amount': round(today_open - prev_close, 2),
+            'direction': 'up' if gap_percent > 0 else 'down',
+            'volume': int(df.iloc[-1]['Volume']),
+            'sector': None,
+        })
+    results.sort(key=lambda x: abs(x['gap_percent']), reverse=True)
+    return results
+
+
+@pytest.mark.parametrize('min_gap, direction', [(0.0, 'both'), (2.0, 'both'), (0.5, 'up'), (1.0, 'down')])
+def test_vectorized_scan_matches_the_per_symbol_loop(min_gap, direction):
+    symbols, bars = _bars(200, 8)
+    _, matrices = gap_engine.align(bars, symbols)
+    table = gap_engine.compute_gaps(symbols, matrices)
+
+    rows = gap_engine.to_rows(table, gap_engine.filter_mask(table, min_gap, direction))
+
+    assert rows == _legacy_scan(bars, symbols, min_gap, direction)
+    assert rows
+
+
+def test_edge_cases_use_each_symbols_last_two_valid_bars():
+    symbols, bars = _bars(0, 3)
+    _, matrices = gap_engine.align(bars, symbols)
+    table = gap_engine.compute_gaps(symbols, matrices)
+
+    rows = {row['symbol']: row for row in gap_engine.to_rows(table, gap_engine.filter_mask(table, 0, 'both'))}
+    assert sorted(rows) == ['EARLY', 'LASTNAN']
+    assert (rows['LASTNAN']['prev_close'], rows['LASTNAN']['open']) == (50.0, 51.0)
+    assert rows['EARLY']['gap_percent'] == 10.0
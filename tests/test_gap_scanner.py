@@ -0,0 +1,164 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from services import bar_store, gap_scanner, symbol_meta
+from services.bar_store import BarStore
+from services.market_data import MarketDataProvider
+
+SYMBOLS = ['AAA', 'BBB', 'CCC', 'DDD']
+SCAN_DATE = '2024-03-08'
+
+
+class CountingProvider(MarketDataProvider):
+    """Three days of bars gapping up 5% on the last. Requests for ``held`` symbols wait for ``gate``."""
+
+    name = 'counting'
+
+    def __init__(self):
+        self.calls = []
+        self.held = set(SYMBOLS)
+        self.gate = threading.Event()
+
+    def get_bars(self, symbols, start, end, timeout=None):
+        self.calls.append(list(symbols))
+        if self.held & set(symbols):
+            assert self.gate.wait(5)
+        days = np.arange(np.datetime64('2024-03-06'), np.datetime64('2024-03-09')).astype(np.int64)
+        bars = {
+            'date': days.astype(np.float64), 'open': np.array([100.0, 100.0, 105.0]), 'high': np.full(3, 106.0),
+            'low': np.full(3, 99.0), 'close': np.full(3, 100.0), 'volume': np.full(3, 1e6),
+        }
+        return {symbol: bars for symbol in symbols}, {}
+
+    def get_metadata(self, symbols, max_workers=8):
+        return {}
+
+
+@pytest.fixture
+def scanner_app(make_app, monkeypatch):
+    # Threads need a file database; one worker fetches the two chunks in order
+    app = make_app('app.db', SCAN_CHUNK_SIZE=2, SCAN_MAX_WORKERS=1, SCAN_CHUNK_RETRIES=0, SCAN_COALESCE_TIMEOUT=30)
+    for name in ('_flights', '_scan_cache', '_sector_cache_loaded_at'):
+        monkeypatch.setattr(gap_scanner, name, None)
+    monkeypatch.setattr(symbol_meta, 'refresh_in_background', lambda symbols, on_done=None: False)
+    return app
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    provider = CountingProvider()
+    monkeypatch.setattr(bar_store, 'get_provider', lambda: provider)
+    return provider
+
+
+def _start_scan(app, results: list) -> threading.Thread:
+    def run():
+        with app.app_context():
+            start = time.monotonic()
+            results.append((gap_scanner.scan_gaps(symbols=SYMBOLS, min_gap=1, date=SCAN_DATE),
+                            time.monotonic() - start))
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def _wait_for(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out waiting for the scan'
+        time.sleep(0.01)
+
+
+def _stats(app) -> dict:
+    with app.app_context():
+        return gap_scanner.get_flights().stats()
+
+
+def test_identical_concurrent_scans_fetch_once(scanner_app, provider):
+    results = []
+    threads = [_start_scan(scanner_app, results)]
+    _wait_for(lambda: provider.calls)  # the leader is fetching the first chunk
+    threads += [_start_scan(scanner_app, results) for _ in range(3)]
+    _wait_for(lambda: _stats(scanner_app)['coalesced'] == 3)
+    provider.gate.set()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    assert provider.calls == [['AAA', 'BBB'], ['CCC', 'DDD']]
+    scans = [scan for scan, _ in results]
+    assert all(scan == scans[0] for scan in scans)
+    assert [gap['symbol'] for gap in scans[0]['gaps']] == SYMBOLS
+    assert scans[0]['gaps'][0]['gap_percent'] == 5.0
+    stats = _stats(scanner_app)
+    assert (stats['in_flight'], stats['computations'], stats['coalesced']) == (0, 1, 3)
+
+
+def test_failing_leader_releases_followers(scanner_app, provider, monkeypatch):
+    read = BarStore.read
+
+    def failing_read(self, symbol, start=None, end=None):
+        if symbol == 'CCC':
+            raise RuntimeError('bar store unavailable')
+        return read(self, symbol, start, end)
+
+    monkeypatch.setattr(BarStore, 'read', failing_read)
+    results = []
+    threads = [_start_scan(scanner_app, results)]
+    _wait_for(lambda: provider.calls)
+    threads.append(_start_scan(scanner_app, results))
+    _wait_for(lambda: _stats(scanner_app)['coalesced'] == 1)
+    provider.gate.set()  # the leader publishes the first chunk, then fails on the second
+    for thread in threads:
+        thread.join(timeout=10)
+
+    assert not any(thread.is_alive() for thread in threads)
+    assert [scan['error'] for scan, _ in results] == ['bar store unavailable'] * 2
+    assert all(elapsed < 5 for _, elapsed in results)  # well short of SCAN_COALESCE_TIMEOUT
+    stats = _stats(scanner_app)
+    (key,) = stats['keys'].values()
+    assert (stats['in_flight'], key['errors'], key['coalesced']) == (0, 1, 1)
+
+    # The failed flight is gone: the next scan leads its own
+    monkeypatch.setattr(BarStore, 'read', read)
+    with scanner_app.app_context():
+        scan = gap_scanner.scan_gaps(symbols=SYMBOLS, min_gap=1, date=SCAN_DATE)
+    assert [gap['symbol'] for gap in scan['gaps']] == SYMBOLS
+    assert _stats(scanner_app)['computations'] == 2
+
+
+def test_follower_finishes_an_abandoned_scan(scanner_app, provider):
+    with scanner_app.app_context():
+        provider.held = {'CCC', 'DDD'}
+        stream = gap_scanner.iter_scan_gaps(symbols=SYMBOLS, min_gap=1, date=SCAN_DATE)
+        first = next(stream)  # the first chunk is fetched; the second waits on the gate
+        assert first['type'] == 'gap'
+
+        results = []
+        thread = _start_scan(scanner_app, results)
+        _wait_for(lambda: _stats(scanner_app)['coalesced'] == 1)
+        stream.close()  # the streaming client went away
+    provider.gate.set()
+    thread.join(timeout=10)
+
+    assert not thread.is_alive()
+    ((scan, elapsed),) = results
+    assert [gap['symbol'] for gap in scan['gaps']] == SYMBOLS
+    assert elapsed < 5
+    (key,) = _stats(scanner_app)['keys'].values()
+    assert (key['abandoned'], key['coalesced']) == (1, 1)
+
+
+@pytest.mark.parametrize('stream', [None, 'ndjson', 'sse'])
+@pytest.mark.parametrize('date', ['2024-13-01', '03/08/2024', 'yesterday'])
+def test_malformed_scan_date_is_rejected_before_scanning(app, monkeypatch, stream, date):
+    monkeypatch.setattr(gap_scanner, '_iter_shared_chunks', lambda *args: pytest.fail('scan started'))
+    params = {'symbols': 'AAA', 'date': date, **({'stream': stream} if stream else {})}
+
+    response = app.test_client().get('/api/scanner/gaps', query_string=params)
+
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'validation_error', 'message': 'date must be YYYY-MM-DD'}
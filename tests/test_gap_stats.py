@@ -0,0 +1,81 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from services import bar_store, gap_stats
+from services.market_data import MarketDataProvider
+
+
+class SyntheticProvider(MarketDataProvider):
+    """Serves fixed random-walk bars, with missing days and a late listing, within each request's range."""
+
+    name = 'synthetic'
+
+    def __init__(self, symbols: list[str], seed: int = 0):
+        rng = np.random.default_rng(seed)
+        days = np.arange(np.datetime64('2024-01-01'), np.datetime64('2024-07-01'))
+        days = days[np.is_busday(days)]
+        self.bars = {}
+        for symbol in symbols:
+            close = 50 + rng.normal(0, 1, len(days)).cumsum()
+            opens = close * (1 + rng.normal(0, 0.03, len(days)))
+            keep = rng.random(len(days)) > 0.1
+            if symbol == 'LATE':
+                keep &= days >= np.datetime64('2024-04-01')
+            self.bars[symbol] = {
+                'date': days[keep], 'open': opens[keep], 'close': close[keep], 'volume': np.full(keep.sum(), 1e6),
+                'high': np.maximum(opens, close)[keep] + rng.random(keep.sum()),
+                'low': np.minimum(opens, close)[keep] - rng.random(keep.sum()),
+            }
+
+    def get_bars(self, symbols, start, end, timeout=None):
+        fetched = {}
+        for symbol in symbols:
+            bars = self.bars[symbol]
+            keep = (bars['date'] >= np.datetime64(start)) & (bars['date'] <= np.datetime64(end))
+            fetched[symbol] = {name: col[keep] for name, col in bars.items()}
+            fetched[symbol]['date'] = fetched[symbol]['date'].astype(np.int64).astype(np.float64)
+        return fetched, {}
+
+    def get_metadata(self, symbols, max_workers=8):
+        return {}
+
+
+@pytest.fixture
+def provider(app, monkeypatch):
+    provider = SyntheticProvider(['AAA', 'BBB', 'LATE', 'NEW'])
+    monkeypatch.setattr(bar_store, 'get_provider', lambda: provider)
+    monkeypatch.setattr(gap_stats, 'get_provider', lambda: provider)
+    return provider
+
+
+def _update_as_of(monkeypatch, today: date, symbols: list[str]) -> dict:
+    class Today(date):
+        @classmethod
+        def today(cls):
+            return today
+
+    monkeypatch.setattr(gap_stats, 'date', Today)
+    return gap_stats.update(symbols)
+
+
+def test_incremental_updates_match_one_full_compute(app, provider, monkeypatch):
+    added = [
+        _update_as_of(monkeypatch, date(2024, 2, 14), ['AAA', 'BBB', 'LATE'])['gaps_added'],
+        _update_as_of(monkeypatch, date(2024, 4, 10), [])['gaps_added'],
+        _update_as_of(monkeypatch, date(2024, 5, 1), ['NEW'])['gaps_added'],  # a symbol joins midway
+        _update_as_of(monkeypatch, date(2024, 7, 3), [])['gaps_added'],
+    ]
+    table = gap_stats._read(gap_stats._path())
+
+    symbols = ['AAA', 'BBB', 'LATE', 'NEW']
+    edges = np.asarray(app.config['GAP_STATS_BUCKETS'], dtype=np.float64)
+    until = int(np.datetime64('2024-07-03', 'D').astype(np.int64))
+    full = gap_stats.compute(provider.bars, symbols, np.full(len(symbols), -1), until, edges)
+
+    assert list(table['symbol']) == symbols
+    assert all(added) and sum(added) == full['count'].sum()
+    for name in ('count', 'fill', 'through'):
+        np.testing.assert_array_equal(table[name], full[name], err_msg=name)
+    np.testing.assert_allclose(table['continuation'], full['continuation'])
@@ -0,0 +1,74 @@
+import os
+import subprocess
+import sys
+
+from sqlalchemy import inspect, text
+
+import migrations
+from models import db, SchemaMigration
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Indexes and columns the migrations add to databases created before them
+MIGRATED_INDEXES = {
+    'trades': ['ix_trades_entry_date', 'ix_trades_status_entry_date', 'ix_trades_status_exit_date',
+               'ix_trades_status_gap_type', 'ix_trades_symbol_entry_date'],
+    'watchlist': ['ix_watchlist_is_active_added_date'],
+    'catalysts': ['ux_catalysts_symbol_source_external_id', 'ix_catalysts_symbol_event_date'],
+}
+MIGRATED_COLUMNS = {'catalysts': ['external_id', 'url', 'summary']}
+
+
+def _downgrade_to_baseline():
+    """Turn the current database back into the schema that predates MIGRATIONS."""
+    for indexes in MIGRATED_INDEXES.values():
+        for name in indexes:
+            db.session.execute(text(f'DROP INDEX {name}'))
+    for table, columns in MIGRATED_COLUMNS.items():
+        for column in columns:
+            db.session.execute(text(f'ALTER TABLE {table} DROP COLUMN {column}'))
+    db.session.execute(text('DELETE FROM schema_migrations'))
+    db.session.execute(text('DELETE FROM data_versions'))
+    db.session.commit()
+
+
+def test_hot_queries_use_indexes(app):
+    assert migrations.full_scans() == {}
+
+
+def test_full_scan_is_reported_when_an_index_is_missing(app):
+    db.session.execute(text('DROP INDEX ix_watchlist_is_active_added_date'))
+    db.session.commit()
+
+    assert list(migrations.full_scans()) == ['active watchlist']
+
+
+def test_upgrade_adds_indexes_and_columns_to_an_old_database(app):
+    _downgrade_to_baseline()
+    assert migrations.full_scans()
+
+    assert migrations.upgrade() == [version for version, _, _ in migrations.MIGRATIONS]
+    assert migrations.full_scans() == {}
+    columns = {c['name'] for c in inspect(db.engine).get_columns('catalysts')}
+    assert set(MIGRATED_COLUMNS['catalysts']) <= columns
+    assert migrations.upgrade() == []
+
+
+def test_concurrent_upgrades_from_several_workers(make_app, tmp_path):
+    app = make_app('app.db')
+    with app.app_context():
+        _downgrade_to_baseline()
+        db.session.remove()
+        db.engine.dispose()
+
+    env = {**os.environ, 'DATABASE_URL': f'sqlite:///{tmp_path / "app.db"}', 'SCHEDULER_ENABLED': 'false'}
+    code = 'from app import create_app; create_app("production")'
+    workers = [subprocess.Popen([sys.executable, '-c', code], cwd=ROOT, env=env,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE) for _ in range(6)]
+    for worker in workers:
+        _, stderr = worker.communicate(timeout=120)
+        assert worker.returncode == 0, stderr.decode()
+
+    with app.app_context():
+        assert db.session.query(SchemaMigration).count() == len(migrations.MIGRATIONS)
+        assert migrations.full_scans() == {}
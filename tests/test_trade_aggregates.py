@@ -0,0 +1,88 @@
+import pytest
+
+from services import trade_aggregates
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def _open(client, gap_type: str = 'gap_up', day: int = 2) -> int:
+    response = client.post('/api/trades/', json={
+        'symbol': 'AAPL', 'direction': 'long', 'entry_price': 100, 'quantity': 10, 'gap_type': gap_type,
+        'entry_date': f'2024-01-{day:02d}T09:30:00',
+    })
+    assert response.status_code == 201
+    return response.get_json()['data']['id']
+
+
+def _close(client, trade_id: int, exit_price: float, day: int):
+    response = client.put(f'/api/trades/{trade_id}', json={
+        'exit_price': exit_price, 'exit_date': f'2024-01-{day:02d}T15:59:00',
+    })
+    assert response.status_code == 200
+
+
+def _streaks(scope: str = 'all') -> tuple:
+    agg = trade_aggregates.get(scope)
+    return agg.current_wins, agg.current_losses, agg.max_wins, agg.max_losses
+
+
+def test_aggregates_stay_consistent_through_every_trade_change(client, monkeypatch):
+    recomputed = []
+    real_recompute = trade_aggregates._recompute
+    monkeypatch.setattr(trade_aggregates, '_recompute', lambda agg: recomputed.append(agg.scope) or real_recompute(agg))
+
+    ids = [_open(client, 'gap_up' if i % 2 else 'gap_down') for i in range(7)]
+    assert trade_aggregates.verify() == {}
+    assert trade_aggregates.get().open_count == 7
+
+    _close(client, ids[0], 110, day=10)
+    _close(client, ids[1], 105, day=11)
+    _close(client, ids[2], 90, day=12)
+    assert _streaks() == (0, 1, 2, 1)
+    assert trade_aggregates.verify() == {}
+
+    # Closed before the latest win/loss: the streaks are recomputed in close-date order
+    recomputed.clear()
+    _close(client, ids[3], 120, day=5)
+    assert set(recomputed) == {'all', 'gap_up'}
+    assert _streaks() == (0, 1, 3, 1)
+    assert trade_aggregates.verify() == {}
+
+    client.put(f'/api/trades/{ids[4]}', json={'status': 'cancelled'})
+    assert trade_aggregates.get().open_count == 2
+    assert trade_aggregates.verify() == {}
+
+    client.delete(f'/api/trades/{ids[0]}')
+    assert _streaks() == (0, 1, 2, 1)
+    assert trade_aggregates.get().trade_count == 6
+    assert trade_aggregates.verify() == {}
+
+    recomputed.clear()
+    response = client.put('/api/trades/batch', json={'trades': [
+        {'id': ids[6], 'exit_price': 95, 'exit_date': '2024-01-14T15:59:00'},
+        {'id': ids[5], 'exit_price': 80, 'exit_date': '2024-01-13T15:59:00'},
+    ]})
+    assert len(response.get_json()['data']['closed']) == 2
+    assert recomputed == []  # both close after the latest decided trade, so they fold in incrementally
+    assert _streaks() == (0, 3, 2, 3)
+    assert _streaks('gap_up') == (0, 1, 2, 1)
+    assert _streaks('gap_down') == (0, 2, 0, 2)
+    assert trade_aggregates.verify() == {}
+    agg = trade_aggregates.get()
+    assert (agg.open_count, agg.closed_count, agg.winner_count, agg.loser_count) == (0, 5, 2, 3)
+    assert agg.total_pnl == pytest.approx(50 + 200 - 100 - 50 - 200)
+
+
+def test_deleting_an_open_trade_updates_counts_without_recompute(client, monkeypatch):
+    ids = [_open(client) for _ in range(2)]
+    _close(client, ids[0], 110, day=10)
+    monkeypatch.setattr(trade_aggregates, '_recompute', lambda agg: pytest.fail('unexpected recompute'))
+
+    client.delete(f'/api/trades/{ids[1]}')
+
+    agg = trade_aggregates.get()
+    assert (agg.trade_count, agg.open_count, agg.closed_count) == (1, 0, 1)
+    assert trade_aggregates.verify() == {}
@@ -0,0 +1,150 @@
+from datetime import datetime
+
+import pytest
+
+from models import db, Trade
+from services import trade_aggregates, trade_service
+
+
+def _open_trades(n: int) -> list[int]:
+    trades = [Trade(symbol='AAPL', direction='long', entry_price=100.0, quantity=10, gap_type='gap_up',
+                    entry_date=datetime(2024, 1, 2 + i)) for i in range(n)]
+    for trade in trades:
+        trade_service.add_trade(trade)
+    db.session.commit()
+    return [trade.id for trade in trades]
+
+
+def test_close_trades_counts_each_trade_once_when_another_request_closes_it_first(app, monkeypatch):
+    first, second = _open_trades(2)
+    real_query = db.session.query
+
+    class RacingQuery:
+        """Lets another request close ``second`` right after the targets are loaded."""
+
+        def __init__(self, query):
+            self.query = query
+
+        def filter(self, *criteria):
+            rows = self.query.filter(*criteria).all()
+            monkeypatch.setattr(db.session, 'query', real_query)
+            trade_service.close_trades([{'id': second, 'exit_price': 90.0}])
+            return rows
+
+    monkeypatch.setattr(db.session, 'query', lambda *columns: RacingQuery(real_query(*columns)))
+    closed, errors = trade_service.close_trades([
+        {'id': first, 'exit_price': 110.0}, {'id': second, 'exit_price': 120.0},
+    ])
+    db.session.commit()
+
+    assert [row['id'] for row in closed] == [first]
+    assert errors == [{'id': second, 'error': 'trade is no longer open'}]
+    assert db.session.get(Trade, second).exit_price == 90.0
+    assert trade_aggregates.get('all').closed_count == 2
+    assert trade_aggregates.verify() == {}
+
+
+def test_batch_close_returns_exit_dates_like_trade_to_dict(app):
+    first, second = _open_trades(2)
+    response = app.test_client().put('/api/trades/batch', json={'trades': [
+        {'id': first, 'exit_price': 110.0},
+        {'id': second, 'exit_price': 95.0, 'exit_date': '2024-02-01T15:30:00+00:00'},
+    ]})
+
+    closed = {row['id']: row for row in response.get_json()['data']['closed']}
+    for trade_id in (first, second):
+        trade = db.session.get(Trade, trade_id)
+        db.session.refresh(trade)
+        assert closed[trade_id]['exit_date'] == trade.to_dict()['exit_date']
+    assert closed[second]['exit_date'] == '2024-02-01T15:30:00'
+
+
+def test_exit_dates_with_an_offset_are_stored_in_utc(app):
+    first, second, naive = _open_trades(3)
+    client = app.test_client()
+    response = client.put('/api/trades/batch', json={'trades': [
+        {'id': first, 'exit_price': 110.0, 'exit_date': '2024-01-02T10:00:00-05:00'},
+        {'id': naive, 'exit_price': 110.0, 'exit_date': '2024-01-02T10:00:00'},
+    ]})
+    assert [row['exit_date'] for row in response.get_json()['data']['closed']] == [
+        '2024-01-02T15:00:00', '2024-01-02T10:00:00',
+    ]
+    single = client.put(f'/api/trades/{second}', json={'exit_price': 95.0, 'exit_date': '2024-01-03T09:30:00+09:00'})
+    assert single.get_json()['data']['exit_date'] == '2024-01-03T00:30:00'
+
+    stored = dict(db.session.query(Trade.id, Trade.exit_date))
+    assert stored == {first: datetime(2024, 1, 2, 15), second: datetime(2024, 1, 3, 0, 30),
+                      naive: datetime(2024, 1, 2, 10)}
+    assert trade_aggregates.verify() == {}
+
+
+def test_compute_pnl_bulk_rejects_non_positive_entry_prices():
+    with pytest.raises(ValueError):
+        trade_service.compute_pnl_bulk(['long', 'short'], [100.0, 0.0], [110.0, 1.0], [1, 1])
+    assert trade_service.compute_pnl_bulk(['short'], [100.0], [90.0], [10]) == ([100.0], [10.0])
+
+
+def test_batch_update_skips_notes_for_trades_it_could_not_close(app):
+    done, open_trade = _open_trades(2)
+    trade_service.close_trades([{'id': done, 'exit_price': 105.0}])
+    db.session.commit()
+    client = app.test_client()
+    tag = client.get('/api/trades/').headers['ETag']
+
+    response = client.put('/api/trades/batch', json={'trades': [
+        {'id': 9999, 'exit_price': 110.0, 'notes': 'unknown'},
+        {'id': done, 'exit_price': 120.0, 'notes': 'closed twice'},
+        {'id': open_trade, 'exit_price': 'n/a', 'notes': 'bad price'},
+    ]})
+    data = response.get_json()['data']
+    assert (data['closed'], data['updated']) == ([], 0)
+    assert [error['id'] for error in data['errors']] == [open_trade, 9999, done]
+    assert db.session.get(Trade, done).notes is None and db.session.get(Trade, open_trade).notes is None
+    assert client.get('/api/trades/', headers={'If-None-Match': tag}).status_code == 304
+
+    response = client.put('/api/trades/batch', json={'trades': [
+        {'id': done, 'exit_price': 120.0, 'notes': 'closed twice'},
+        {'id': open_trade, 'exit_price': 115.0, 'notes': 'closed'},
+    ]})
+    data = response.get_json()['data']
+    assert ([row['id'] for row in data['closed']], data['updated']) == ([open_trade], 1)
+    assert data['errors'] == [{'id': done, 'error': 'trade is closed'}]
+    db.session.expire_all()
+    assert (db.session.get(Trade, done).notes, db.session.get(Trade, open_trade).notes) == (None, 'closed')
+    assert trade_aggregates.verify() == {}
+
+
+def _page_through(client, per_page: int, **params) -> list[list[int]]:
+    pages, cursor = [], ''
+    while cursor is not None:
+        data = client.get('/api/trades/', query_string={'cursor': cursor, 'per_page': per_page, **params}).get_json()
+        pages.append([trade['id'] for trade in data['data']['trades']])
+        cursor = data['data']['next_cursor']
+    return pages
+
+
+def test_cursor_pages_cover_trades_sharing_an_entry_date_once(app):
+    same_day = [Trade(symbol='AAPL', direction='long', entry_price=100.0, quantity=1, gap_type='gap_up',
+                      entry_date=datetime(2024, 1, 5, 9, 30)) for _ in range(7)]
+    others = [Trade(symbol='MSFT', direction='long', entry_price=100.0, quantity=1, gap_type='gap_up',
+                    entry_date=datetime(2024, 1, day)) for day in (2, 8)]
+    for trade in same_day + others:
+        trade_service.add_trade(trade)
+    db.session.commit()
+    expected = [others[1].id] + sorted((t.id for t in same_day), reverse=True) + [others[0].id]
+    client = app.test_client()
+
+    pages = _page_through(client, 3)
+    assert [len(page) for page in pages] == [3, 3, 3]  # an exact multiple still ends with next_cursor=None
+    assert sum(pages, []) == expected
+
+    assert sum(_page_through(client, 4, symbol='AAPL'), []) == expected[1:-1]
+    assert _page_through(client, 50) == [expected]
+
+
+@pytest.mark.parametrize('cursor', ['not a cursor', 'eyJhIjogMX0', 'WyJ4IiwgMV0', 'WzEsIDJd', 'WyIyMDI0LTAxLTA1Il0'])
+def test_malformed_cursor_is_a_validation_error(app, cursor):
+    response = app.test_client().get('/api/trades/', query_string={'cursor': cursor})
+
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'validation_error', 'message': 'Invalid cursor'}
@@ -2,8 +2,9 @@ import sys
 import traceback
 
 try:
-    from app import create_app
+    from app import create_app, start_background_jobs
     app = create_app('production')
+    start_background_jobs(app)
     print("App created successfully", file=sys.stderr, flush=True)
 except Exception as e:
     print(f"STARTUP ERROR: {e}", file=sys.stderr, flush=True)